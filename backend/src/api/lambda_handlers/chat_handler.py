@@ -1,20 +1,166 @@
 import json
+import logging
 import os
-import boto3
-from typing import Dict, Any
+from typing import Dict, Any, List
 
-from ...services.chat_service import ChatService
+from ...services.chat_service import ChatService, RETRIEVAL_MODES, MAX_TOP_K, latency_metrics
+from ...services.chat_service_pool import ChatServicePool
+from ...services.embedding_service import EmbeddingService
+from ...services.llm_service import LLMService
+from ...services.llm_dispatcher import LLMDispatcher, SATURATED_CODE
+from ...services.query_cache import DynamoCacheBackend, QueryCache
+from ...services.context_builder import ContextBuilder
+from ...services.history_writer import HistoryWriter
+from ...models.query import LatencyMetrics, RetrievedChunk
 from ...models.rag_session import RagStatus
+from ...utils.s3_client import S3Client
+from ...utils.error_handling import AppError
+from ...utils.metrics import StageTimer
 
 # Environment variables
 RAG_BUCKET = os.environ.get("RAG_BUCKET")
 QUERY_TABLE = os.environ.get("QUERY_TABLE")
 CHAT_TABLE = os.environ.get("CHAT_TABLE")
+# Base URL of the Ollama server
+OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
+# Seconds to wait for a connection to Ollama, and for each streamed chunk
+LLM_CONNECT_TIMEOUT_S = float(os.environ.get("LLM_CONNECT_TIMEOUT_S", "3.05"))
+LLM_READ_TIMEOUT_S = float(os.environ.get("LLM_READ_TIMEOUT_S", "20"))
+# Upper bound on one whole generation, kept below the 60s Lambda timeout
+LLM_MAX_GENERATION_S = float(os.environ.get("LLM_MAX_GENERATION_S", "45"))
+# Retries on connection failures and 502/503/504 before any token is streamed
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "2"))
+# Generations allowed in flight against Ollama from this process
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "2"))
+# Requests allowed to wait for a generation slot, and how long each may wait
+LLM_MAX_QUEUE = int(os.environ.get("LLM_MAX_QUEUE", "16"))
+LLM_QUEUE_TIMEOUT_S = float(os.environ.get("LLM_QUEUE_TIMEOUT_S", "10"))
+# Token budget for retrieved context in each prompt; Ollama's num_ctx is sized from it
+CONTEXT_MAX_TOKENS = int(os.environ.get("CONTEXT_MAX_TOKENS", "1024"))
+# Default retrieval for queries: "hybrid" (BM25 + vectors), "dense" or "lexical"
+RETRIEVAL_MODE = os.environ.get("RETRIEVAL_MODE", "hybrid")
+# Chunks less similar to the query than this (cosine), or further than the
+# gap below the best chunk, are left out of the prompt; empty disables
+RETRIEVAL_MIN_SIMILARITY = os.environ.get("RETRIEVAL_MIN_SIMILARITY", "0.2")
+RETRIEVAL_MAX_SCORE_GAP = os.environ.get("RETRIEVAL_MAX_SCORE_GAP", "0.15")
+# Retry-After (s) sent with 429 responses when the LLM is saturated
+LLM_RETRY_AFTER_S = os.environ.get("LLM_RETRY_AFTER_S", "2")
+# Memory kept free of loaded sessions for the runtime, embedding model,
+# query cache and in-flight requests (MB)
+CHAT_POOL_HEADROOM_MB = int(os.environ.get("CHAT_POOL_HEADROOM_MB", "384"))
+# Memory budget for sessions kept loaded between requests (MB); by default
+# the Lambda function's memory less the headroom, or 512 outside Lambda
+LAMBDA_MEMORY_MB = os.environ.get("AWS_LAMBDA_FUNCTION_MEMORY_SIZE")
+CHAT_POOL_MAX_MB = int(os.environ.get("CHAT_POOL_MAX_MB") or (
+    max(0, int(LAMBDA_MEMORY_MB) - CHAT_POOL_HEADROOM_MB) if LAMBDA_MEMORY_MB else 512
+))
+# Loaded sessions are refreshed after this long, to pick up rebuilds
+CHAT_POOL_MAX_AGE_S = float(os.environ.get("CHAT_POOL_MAX_AGE_S", "300"))
+# Optional DynamoDB table shared by all containers for cached embeddings and
+# answers; unset by default, as it adds a get_item (and a put_item for each
+# new entry) to every query the in-process cache misses
+QUERY_CACHE_TABLE = os.environ.get("QUERY_CACHE_TABLE")
+# Cached query embeddings: lifetime (s) and in-process capacity
+QUERY_EMBEDDING_CACHE_TTL_S = float(os.environ.get("QUERY_EMBEDDING_CACHE_TTL_S", "3600"))
+QUERY_EMBEDDING_CACHE_MAX = int(os.environ.get("QUERY_EMBEDDING_CACHE_MAX", "10000"))
+# Cached answers: lifetime (s; 0 disables answer caching) and in-process capacity
+ANSWER_CACHE_TTL_S = float(os.environ.get("ANSWER_CACHE_TTL_S", "600"))
+ANSWER_CACHE_MAX = int(os.environ.get("ANSWER_CACHE_MAX", "2000"))
+# Largest number of queries accepted by one POST /chat/query/batch request
+CHAT_BATCH_MAX_QUERIES = int(os.environ.get("CHAT_BATCH_MAX_QUERIES", "100"))
+# LLM generations run in parallel for one batch request
+CHAT_BATCH_LLM_CONCURRENCY = int(os.environ.get("CHAT_BATCH_LLM_CONCURRENCY", "4"))
+# Query and chat history (QUERY_TABLE, CHAT_TABLE) is written behind the
+# answers in batches of up to this many records (at most 25), and at most
+# this many seconds (s) later while the process runs; see HistoryWriter
+HISTORY_BATCH_SIZE = int(os.environ.get("HISTORY_BATCH_SIZE", "25"))
+HISTORY_FLUSH_INTERVAL_S = float(os.environ.get("HISTORY_FLUSH_INTERVAL_S", "1"))
+# Timeout (s) of each history write; the flush before a response makes one
+# attempt per batch and leaves what fails to the next invocation
+HISTORY_WRITE_TIMEOUT_S = float(os.environ.get("HISTORY_WRITE_TIMEOUT_S", "0.5"))
+
+logger = logging.getLogger(__name__)
+
+# Initialize outside handler for warm starts: one model, LLM client and S3
+# client shared by every session, and a pool of loaded sessions
+context_builder = ContextBuilder(max_tokens=CONTEXT_MAX_TOKENS)
+llm_service = LLMService(
+    OLLAMA_HOST,
+    num_ctx=context_builder.num_ctx,
+    connect_timeout_s=LLM_CONNECT_TIMEOUT_S,
+    read_timeout_s=LLM_READ_TIMEOUT_S,
+    max_generation_s=LLM_MAX_GENERATION_S,
+    max_retries=LLM_MAX_RETRIES
+)
+# Every generation goes through admission control in front of Ollama
+llm_dispatcher = LLMDispatcher(
+    llm_service,
+    max_concurrency=LLM_MAX_CONCURRENCY,
+    max_queue=LLM_MAX_QUEUE,
+    queue_timeout_s=LLM_QUEUE_TIMEOUT_S
+)
+embedding_service = EmbeddingService()
+s3_client = S3Client(RAG_BUCKET) if RAG_BUCKET else None
+query_cache = QueryCache(
+    embedding_ttl_s=QUERY_EMBEDDING_CACHE_TTL_S,
+    embedding_max_entries=QUERY_EMBEDDING_CACHE_MAX,
+    answer_ttl_s=ANSWER_CACHE_TTL_S,
+    answer_max_entries=ANSWER_CACHE_MAX,
+    shared=DynamoCacheBackend(QUERY_CACHE_TABLE) if QUERY_CACHE_TABLE else None
+)
+history_writer = HistoryWriter(
+    QUERY_TABLE,
+    CHAT_TABLE,
+    max_batch=HISTORY_BATCH_SIZE,
+    flush_interval_s=HISTORY_FLUSH_INTERVAL_S,
+    timeout_s=HISTORY_WRITE_TIMEOUT_S
+) if QUERY_TABLE or CHAT_TABLE else None
+
+def load_chat_service(session_id: str) -> ChatService:
+    chat_service = ChatService(
+        session_id,
+        RAG_BUCKET,
+        llm_service=llm_dispatcher,
+        embedding_service=embedding_service,
+        s3_client=s3_client,
+        query_cache=query_cache,
+        context_builder=context_builder,
+        retrieval_mode=RETRIEVAL_MODE,
+        min_similarity=float(RETRIEVAL_MIN_SIMILARITY) if RETRIEVAL_MIN_SIMILARITY else None,
+        max_score_gap=float(RETRIEVAL_MAX_SCORE_GAP) if RETRIEVAL_MAX_SCORE_GAP else None,
+        history_writer=history_writer
+    )
+    # Download and load times, once per session load rather than per query
+    chat_service.load_timer.emit("SessionLoad")
+    return chat_service
+
+chat_pool = ChatServicePool(
+    load_chat_service,
+    max_bytes=CHAT_POOL_MAX_MB * 1024 * 1024,
+    max_age_s=CHAT_POOL_MAX_AGE_S
+)
+# The model loads lazily on the first query unless preloaded here, during
+# Lambda init; either way it is loaded once per process
+EMBEDDING_MODEL_PRELOAD = os.environ.get("EMBEDDING_MODEL_PRELOAD", "false").lower() == "true"
+if EMBEDDING_MODEL_PRELOAD:
+    embedding_service.preload()
+# "lazy" imports boto3 and creates the S3 and DynamoDB clients on the first
+# request that needs them; "eager" does it here, during Lambda init (e.g.
+# with provisioned concurrency, where init time is not seen by requests)
+COLD_START_MODE = os.environ.get("COLD_START_MODE", "lazy")
+if COLD_START_MODE == "eager":
+    if s3_client is not None:
+        s3_client.preload()
+    if query_cache.shared is not None:
+        query_cache.shared.client
+    if history_writer is not None:
+        history_writer.client
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Lambda handler for Chat operations.
     - POST /chat/query: Process a user query (Aggregated response for REST API)
+    - POST /chat/query/batch: Process many queries against one session
     - GET /chat/{session_id}/history: Get chat history
     
     Note: Standard REST API Gateway buffers responses, so true SSE streaming 
@@ -26,24 +172,37 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     path = event.get('path', '')
     http_method = event.get('httpMethod', '')
     
-    if path.endswith('/query') and http_method == 'POST':
-        return handle_query_request(event)
-    elif '/history' in path and http_method == 'GET':
-        return handle_history_request(event)
-    else:
-        return {
-            'statusCode': 404,
-            'headers': {
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({'error': 'Not Found'})
-        }
+    try:
+        if path.endswith('/query/batch') and http_method == 'POST':
+            return handle_batch_query_request(event)
+        elif path.endswith('/query') and http_method == 'POST':
+            return handle_query_request(event)
+        elif '/history' in path and http_method == 'GET':
+            return handle_history_request(event)
+        else:
+            return {
+                'statusCode': 404,
+                'headers': {
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({'error': 'Not Found'})
+            }
+    finally:
+        # Lambda may freeze the process once the handler returns, stopping
+        # the writer's thread: write this invocation's history first, in
+        # one batched call rather than a put per record during the query.
+        # Best-effort, as the response waits for it: no retries, and no
+        # wait behind a write the thread already has in progress
+        if history_writer is not None:
+            history_writer.flush(max_retries=0, wait=False)
 
 def handle_query_request(event: Dict[str, Any]) -> Dict[str, Any]:
     try:
         body = json.loads(event.get('body', '{}'))
         session_id = body.get('session_id')
         query_text = body.get('query')
+        retrieval_mode = body.get('retrieval_mode')
+        top_k = body.get('top_k')
         
         if not session_id or not query_text:
             return {
@@ -53,16 +212,26 @@ def handle_query_request(event: Dict[str, Any]) -> Dict[str, Any]:
                 },
                 'body': json.dumps({'error': 'Missing session_id or query'})
             }
+        if retrieval_mode is not None and retrieval_mode not in RETRIEVAL_MODES:
+            return invalid_retrieval_mode_response()
+        if top_k is not None and not valid_top_k(top_k):
+            return invalid_top_k_response()
             
-        # Initialize Service
-        chat_service = ChatService(session_id, RAG_BUCKET)
-        
-        # Process Query
-        # Note: ChatService returns a generator for streaming. 
-        # We consume it here for the REST API response.
-        response_chunks = []
-        for chunk in chat_service.process_query(query_text):
-            response_chunks.append(chunk)
+        # Reuse the session if this container already loaded it
+        with chat_pool.lease(session_id) as chat_service:
+            # Process Query
+            # Note: ChatService returns a generator for streaming. 
+            # We consume it here for the REST API response.
+            response_chunks = []
+            retrieved: List[RetrievedChunk] = []
+            timer = StageTimer()
+            for chunk in chat_service.process_query(
+                query_text, retrieval_mode, top_k=top_k, retrieved=retrieved, timer=timer
+            ):
+                response_chunks.append(chunk)
+        latency = latency_metrics(timer)
+        emit_query_metrics(timer, latency)
+        log_component_stats()
             
         full_response = "".join(response_chunks)
         
@@ -72,7 +241,9 @@ def handle_query_request(event: Dict[str, Any]) -> Dict[str, Any]:
             "response": full_response,
             "metadata": {
                 "streaming_supported": False, # Flag for frontend
-                "model": chat_service.llm_service.model
+                "model": chat_service.llm_service.model,
+                "retrieved_chunks": serialize_chunks(retrieved),
+                "latency_ms": json.loads(latency.json())
             }
         }
         
@@ -86,6 +257,9 @@ def handle_query_request(event: Dict[str, Any]) -> Dict[str, Any]:
         }
         
     except Exception as e:
+        if isinstance(e, AppError) and e.code == SATURATED_CODE:
+            print(f"Rejected query: {e.message} {json.dumps(llm_dispatcher.stats())}")
+            return saturated_response(e)
         print(f"Error processing query: {str(e)}")
         return {
             'statusCode': 500,
@@ -95,6 +269,132 @@ def handle_query_request(event: Dict[str, Any]) -> Dict[str, Any]:
             'body': json.dumps({'error': str(e)})
         }
 
+def saturated_response(error: AppError) -> Dict[str, Any]:
+    return {
+        'statusCode': 429,
+        'headers': {
+            'Access-Control-Allow-Origin': '*',
+            'Retry-After': LLM_RETRY_AFTER_S
+        },
+        'body': json.dumps({'error': error.message, 'code': error.code})
+    }
+
+def invalid_retrieval_mode_response() -> Dict[str, Any]:
+    return {
+        'statusCode': 400,
+        'headers': {
+            'Access-Control-Allow-Origin': '*'
+        },
+        'body': json.dumps({
+            'error': f"retrieval_mode must be one of {', '.join(RETRIEVAL_MODES)}"
+        })
+    }
+
+def valid_top_k(top_k: Any) -> bool:
+    return isinstance(top_k, int) and not isinstance(top_k, bool) and 1 <= top_k <= MAX_TOP_K
+
+def invalid_top_k_response() -> Dict[str, Any]:
+    return {
+        'statusCode': 400,
+        'headers': {
+            'Access-Control-Allow-Origin': '*'
+        },
+        'body': json.dumps({'error': f'top_k must be an integer from 1 to {MAX_TOP_K}'})
+    }
+
+def emit_query_metrics(timer: StageTimer, latency: LatencyMetrics):
+    """Per-stage query timings as CloudWatch metrics (Operation=ChatQuery)."""
+    extra = {}
+    if latency.tokens_per_second is not None:
+        extra["TokensPerSecond"] = latency.tokens_per_second
+    timer.emit("ChatQuery", extra=extra, units={"TokensPerSecond": "Count/Second"})
+
+def log_component_stats():
+    """
+    Session pool, query cache and LLM dispatcher counters, at debug level:
+    per query they are noise in the logs, and the per-query metrics are
+    already emitted by emit_query_metrics.
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Chat pool: {json.dumps(chat_pool.stats())}")
+        logger.debug(f"Query cache: {json.dumps(query_cache.stats())}")
+        logger.debug(f"LLM dispatcher: {json.dumps(llm_dispatcher.stats())}")
+
+def serialize_chunks(chunks: List[RetrievedChunk]) -> List[Dict[str, Any]]:
+    return [json.loads(chunk.json()) for chunk in chunks]
+
+def handle_batch_query_request(event: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        body = json.loads(event.get('body', '{}'))
+        session_id = body.get('session_id')
+        queries = body.get('queries')
+        retrieval_mode = body.get('retrieval_mode')
+        top_k = body.get('top_k')
+        
+        if not session_id or not isinstance(queries, list) or not queries \
+                or not all(isinstance(q, str) and q for q in queries):
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({'error': 'Missing session_id or queries'})
+            }
+        if len(queries) > CHAT_BATCH_MAX_QUERIES:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'error': f'At most {CHAT_BATCH_MAX_QUERIES} queries per batch'
+                })
+            }
+        if retrieval_mode is not None and retrieval_mode not in RETRIEVAL_MODES:
+            return invalid_retrieval_mode_response()
+        if top_k is not None and not valid_top_k(top_k):
+            return invalid_top_k_response()
+
+        with chat_pool.lease(session_id) as chat_service:
+            batch = chat_service.process_queries(
+                queries,
+                max_concurrency=CHAT_BATCH_LLM_CONCURRENCY,
+                retrieval_mode=retrieval_mode,
+                top_k=top_k
+            )
+        for result in batch["results"]:
+            result["retrieved_chunks"] = serialize_chunks(result["retrieved_chunks"])
+        log_component_stats()
+        print(f"Batch of {len(queries)} queries: {json.dumps(batch['timings_ms'])}")
+
+        response_data = {
+            "session_id": session_id,
+            "results": batch["results"],
+            "timings_ms": batch["timings_ms"],
+            "metadata": {
+                "model": chat_service.llm_service.model
+            }
+        }
+        
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps(response_data)
+        }
+        
+    except Exception as e:
+        print(f"Error processing batch query: {str(e)}")
+        return {
+            'statusCode': 500,
+            'headers': {
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({'error': str(e)})
+        }
+
 def handle_history_request(event: Dict[str, Any]) -> Dict[str, Any]:
     try:
         # Extract session_id from path parameters
@@ -1,19 +1,80 @@
 import json
 import os
 from datetime import datetime
+from uuid import UUID
 
 # Import services - assuming Lambda layer or packages are correct
 from ...services.rag_builder import RagBuilderService
+from ...services.batch_rag_builder import BatchRagBuilder
+from ...services.embedding_service import EmbeddingService
+from ...services.embedding_cache import EmbeddingCache
+from ...services.wikipedia_fetcher import WikipediaFetcher
+from ...services.article_cache import ArticleCache
 from ...models.rag_session import RagSession
+from ...utils.validation import is_valid_wikipedia_url
+from ...utils.metrics import put_stage_metrics
 
 # Initialize outside handler for warm starts
 RAG_BUCKET = os.environ.get("RAG_BUCKET")
-builder_service = RagBuilderService(RAG_BUCKET)
+# Cap on resident index memory per build (MB); unset means unbounded
+RAG_INDEX_MAX_MB = os.environ.get("RAG_INDEX_MAX_MB")
+# Opt-in on-disk embedding cache, e.g. /tmp/embedding_cache.sqlite3
+EMBEDDING_CACHE_PATH = os.environ.get("EMBEDDING_CACHE_PATH")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.environ.get("EMBEDDING_CACHE_MAX_ENTRIES", "100000"))
+# Opt-in article cache, revalidated by revision id once the TTL has passed
+ARTICLE_CACHE_PATH = os.environ.get("ARTICLE_CACHE_PATH")
+ARTICLE_CACHE_TTL_S = float(os.environ.get("ARTICLE_CACHE_TTL_S", "3600"))
+# Compression of the uploaded artifact bundle: "none" or "zlib"
+BUNDLE_COMPRESSION = os.environ.get("BUNDLE_COMPRESSION", "none")
+# flat, sqfp16, sq8, hnsw, ivf, ivf_sq8 or ivfpq; unset picks one by chunk count
+INDEX_TYPE = os.environ.get("INDEX_TYPE") or None
+builder_service = RagBuilderService(
+    RAG_BUCKET,
+    max_index_bytes=int(RAG_INDEX_MAX_MB) * 1024 * 1024 if RAG_INDEX_MAX_MB else None,
+    embedding_service=EmbeddingService(
+        cache=EmbeddingCache(EMBEDDING_CACHE_PATH, max_entries=EMBEDDING_CACHE_MAX_ENTRIES)
+    ) if EMBEDDING_CACHE_PATH else None,
+    wiki_fetcher=WikipediaFetcher(
+        cache=ArticleCache(ARTICLE_CACHE_PATH),
+        cache_ttl_s=ARTICLE_CACHE_TTL_S
+    ) if ARTICLE_CACHE_PATH else None,
+    bundle_compression=BUNDLE_COMPRESSION,
+    index_type=INDEX_TYPE
+)
+# The model loads lazily on the first build unless preloaded here, during
+# Lambda init; either way it is loaded once per process
+EMBEDDING_MODEL_PRELOAD = os.environ.get("EMBEDDING_MODEL_PRELOAD", "false").lower() == "true"
+if EMBEDDING_MODEL_PRELOAD:
+    builder_service.embedding_service.preload()
+# "lazy" imports the text splitter, wikipediaapi and boto3 on the first build;
+# "eager" does it here, during Lambda init (e.g. with provisioned concurrency,
+# where init time is not seen by requests)
+COLD_START_MODE = os.environ.get("COLD_START_MODE", "lazy")
+if COLD_START_MODE == "eager":
+    builder_service.preload()
+
+# Batch builds run on a copy of builder_service; the batch builder is
+# created on first use, its encoding pool on its first large encode
+MAX_BATCH_URLS = int(os.environ.get("MAX_BATCH_URLS", "50"))
+BATCH_FETCH_WORKERS = int(os.environ.get("BATCH_FETCH_WORKERS", "8"))
+# Encoding processes; empty for the core count, up to MAX_DEFAULT_EMBED_WORKERS
+BATCH_EMBED_WORKERS = os.environ.get("BATCH_EMBED_WORKERS")
+batch_builder = None
+
+def get_batch_builder() -> BatchRagBuilder:
+    global batch_builder
+    if batch_builder is None:
+        batch_builder = BatchRagBuilder(
+            builder_service,
+            fetch_workers=BATCH_FETCH_WORKERS,
+            embed_workers=int(BATCH_EMBED_WORKERS) if BATCH_EMBED_WORKERS else None
+        )
+    return batch_builder
 
 def handler(event, context):
     """
     Lambda handler for RAG building operations.
-    Supports POST /rag/build
+    Supports POST /rag/build and POST /rag/build/batch
     """
     print(f"Received event: {json.dumps(event)}")
     
@@ -22,6 +83,8 @@ def handler(event, context):
     
     if path.endswith('/rag/build') and http_method == 'POST':
         return handle_build_request(event)
+    elif path.endswith('/rag/build/batch') and http_method == 'POST':
+        return handle_batch_build_request(event)
     elif path.endswith('/status') and http_method == 'GET':
         # TODO: Implement status check (requires DynamoDB integration)
         return {
@@ -51,9 +114,26 @@ def handle_build_request(event):
                 'body': json.dumps({'error': 'Missing url parameter'})
             }
             
+        session_id = body.get('session_id')
+        if session_id:
+            try:
+                UUID(session_id)
+            except (TypeError, ValueError):
+                return {
+                    'statusCode': 400,
+                    'headers': {
+                        'Access-Control-Allow-Origin': '*'
+                    },
+                    'body': json.dumps({'error': 'Invalid session_id'})
+                }
+            
         # Run sync build for now (Phase 1 simplicity)
         # In production, this might trigger an async Step Function
-        session = builder_service.build_rag_session(source_url)
+        # Passing an existing session_id rebuilds that session incrementally
+        session = builder_service.build_rag_session(
+            source_url, session_id=session_id
+        )
+        emit_build_metrics(session)
         
         return {
             'statusCode': 200,
@@ -73,3 +153,72 @@ def handle_build_request(event):
             },
             'body': json.dumps({'error': str(e)})
         }
+
+def emit_build_metrics(session: RagSession):
+    """Per-stage build timings as CloudWatch metrics (Operation=RagBuild)."""
+    put_stage_metrics(
+        "RagBuild",
+        session.metadata.stage_timings_ms or {},
+        session.metadata.processing_time_ms,
+        extra={"Chunks": session.chunk_count},
+        units={"Chunks": "Count"}
+    )
+
+def handle_batch_build_request(event):
+    try:
+        body = json.loads(event.get('body', '{}'))
+        urls = body.get('urls')
+
+        if not isinstance(urls, list) or not urls:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({'error': 'Missing urls parameter'})
+            }
+
+        if len(urls) > MAX_BATCH_URLS:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({'error': f'Too many urls (max {MAX_BATCH_URLS})'})
+            }
+
+        invalid_urls = [
+            url for url in urls
+            if not isinstance(url, str) or not is_valid_wikipedia_url(url)
+        ]
+        if invalid_urls:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({'error': 'Invalid Wikipedia URL', 'urls': invalid_urls})
+            }
+
+        job = get_batch_builder().build_many(urls)
+        for session in job.sessions:
+            emit_build_metrics(session)
+
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': job.json()
+        }
+
+    except Exception as e:
+        print(f"Error processing batch request: {str(e)}")
+        return {
+            'statusCode': 500,
+            'headers': {
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({'error': str(e)})
+        }
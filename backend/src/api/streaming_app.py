@@ -0,0 +1,194 @@
+"""
+ASGI entry point that streams chat answers as Server-Sent Events.
+
+API Gateway REST integrations buffer the whole Lambda response, so
+chat_handler can only return an answer once generation has finished.
+This app serves the same ChatService generator token by token, for a
+container, a Lambda Function URL behind the Lambda Web Adapter, or local
+development:
+
+    cd backend && PYTHONPATH=src uvicorn src.api.streaming_app:app --port 8000
+
+It shares chat_handler's warm services: the session pool, query cache,
+embedding model and LLM client.
+"""
+import json
+import time
+import uuid
+from contextlib import ExitStack, asynccontextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from .lambda_handlers import chat_handler
+from ..models.query import RetrievedChunk
+from ..services.chat_service import RETRIEVAL_MODES, latency_metrics
+from ..services.llm_dispatcher import SATURATED_CODE
+from ..utils.error_handling import AppError, format_error_response
+from ..utils.metrics import put_metric, StageTimer
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # History is written behind the answers; write what is left on shutdown
+    if chat_handler.history_writer is not None:
+        await run_in_threadpool(chat_handler.history_writer.close)
+
+
+app = FastAPI(title="Wikipedia RAG streaming API", lifespan=lifespan)
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+
+
+def format_event(data: Any, event: str = None) -> str:
+    """
+    Encodes one SSE message.
+
+    Data is JSON unless it is the literal "[DONE]" sentinel that
+    frontend/src/services/sse_handler.js stops on.
+    """
+    payload = data if data == "[DONE]" else json.dumps(data)
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {payload}\n\n"
+
+
+class ReleasingStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that calls release once the response is over, however
+    it ends. A generator's own finally only runs once it has been started,
+    which it never is when the client disconnects before the first chunk,
+    and Starlette skips background tasks on a disconnect.
+    """
+
+    def __init__(self, content: Iterator[str], release: Callable[[], None], **kwargs):
+        super().__init__(content, **kwargs)
+        self.release = release
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # Runs even when cancelled; Starlette has waited for any chunk
+            # being read on a worker thread, so the iterator is not running
+            self.release()
+
+
+def stream_answer(
+    chunks: Iterator[str],
+    first_chunk: Optional[str],
+    session_id: str,
+    retrieved: List[RetrievedChunk],
+    timer: StageTimer,
+    started: float,
+    ttft_ms: float
+) -> Iterator[str]:
+    """
+    Yields the SSE messages for one query: metadata with the retrieved
+    chunks, one chunk event per LLM chunk, and a done event with
+    time-to-first-token, total latency and the ChatService stage timings.
+    """
+    query_id = str(uuid.uuid4())
+    yield format_event({
+        "query_id": query_id,
+        "session_id": session_id,
+        "retrieved_chunks": chat_handler.serialize_chunks(retrieved),
+    }, "metadata")
+    if first_chunk is not None:
+        yield format_event({"content": first_chunk}, "chunk")
+    for chunk in chunks:
+        yield format_event({"content": chunk}, "chunk")
+    total_ms = (time.perf_counter() - started) * 1000
+
+    latency_ms = {"ttft": round(ttft_ms), "total": round(total_ms)}
+    print(f"Streamed query {query_id}: {json.dumps(latency_ms)}")
+    put_metric("TimeToFirstToken", ttft_ms)
+    put_metric("StreamTotalLatency", total_ms)
+    stages = latency_metrics(timer)
+    chat_handler.emit_query_metrics(timer, stages)
+    latency_ms["stages"] = json.loads(stages.json())
+    yield format_event({"query_id": query_id, "latency_ms": latency_ms}, "done")
+    yield format_event("[DONE]")
+
+
+@app.post("/chat/query/stream")
+async def query_stream(request: Request):
+    started = time.perf_counter()
+    try:
+        body: Dict[str, Any] = await request.json()
+    except ValueError:
+        return JSONResponse({"error": "Invalid JSON body"}, status_code=400)
+    session_id = body.get("session_id")
+    query_text = body.get("query")
+    if not session_id or not query_text:
+        return JSONResponse({"error": "Missing session_id or query"}, status_code=400)
+    retrieval_mode = body.get("retrieval_mode")
+    if retrieval_mode is not None and retrieval_mode not in RETRIEVAL_MODES:
+        return JSONResponse(
+            {"error": f"retrieval_mode must be one of {', '.join(RETRIEVAL_MODES)}"},
+            status_code=400
+        )
+    top_k = body.get("top_k")
+    if top_k is not None and not chat_handler.valid_top_k(top_k):
+        return JSONResponse(
+            {"error": f"top_k must be an integer from 1 to {chat_handler.MAX_TOP_K}"},
+            status_code=400
+        )
+
+    # Load (or lease) the session and wait for the first chunk before the
+    # stream starts, so a missing session or a saturated LLM is still
+    # reported with a proper status code
+    leases = ExitStack()
+    try:
+        chat_service = await run_in_threadpool(
+            leases.enter_context, chat_handler.chat_pool.lease(session_id)
+        )
+        retrieved: List[RetrievedChunk] = []
+        timer = StageTimer()
+        chunks = chat_service.process_query(
+            query_text, retrieval_mode, top_k=top_k, retrieved=retrieved, timer=timer
+        )
+        first_chunk = await run_in_threadpool(next, chunks, None)
+    except Exception as e:
+        leases.close()
+        if isinstance(e, AppError) and e.code == SATURATED_CODE:
+            return JSONResponse(
+                format_error_response(e),
+                status_code=429,
+                headers={"Retry-After": chat_handler.LLM_RETRY_AFTER_S}
+            )
+        if isinstance(e, (AppError, ValueError)):
+            return JSONResponse(format_error_response(e), status_code=400)
+        print(f"Error processing query for session {session_id}: {str(e)}")
+        return JSONResponse(format_error_response(e), status_code=500)
+    ttft_ms = (time.perf_counter() - started) * 1000
+
+    def release():
+        # Closing the LLM stream frees its slot; both closes are idempotent
+        chunks.close()
+        leases.close()
+
+    # A sync iterator: Starlette pulls each chunk on a worker thread, so the
+    # blocking LLM read never stalls the event loop. The session lease and
+    # LLM slot are released when the response ends, including when the
+    # client disconnects before or part way through the stream
+    return ReleasingStreamingResponse(
+        stream_answer(chunks, first_chunk, session_id, retrieved, timer, started, ttft_ms),
+        release,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/health")
+async def health():
+    return {
+        "status": "ok",
+        "chat_pool": chat_handler.chat_pool.stats(),
+        "llm_dispatcher": chat_handler.llm_dispatcher.stats(),
+        "history_writer": chat_handler.history_writer.stats()
+        if chat_handler.history_writer is not None else None,
+    }
@@ -0,0 +1,21 @@
+from datetime import datetime
+from typing import List
+from uuid import UUID, uuid4
+from pydantic import BaseModel, Field
+
+from models.rag_session import RagSession
+
+class BatchBuildJob(BaseModel):
+    job_id: UUID = Field(default_factory=uuid4)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    total: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    elapsed_ms: int = 0
+    sessions: List[RagSession] = Field(default_factory=list)
+
+    class Config:
+        json_encoders = {
+            datetime: lambda v: v.isoformat(),
+            UUID: lambda v: str(v)
+        }
@@ -6,12 +6,18 @@ from pydantic import BaseModel, Field
 class RetrievedChunk(BaseModel):
     chunk_id: UUID
     position: int
-    similarity_score: float
+    # Cosine similarity to the query; None for chunks found only by BM25
+    similarity_score: Optional[float] = None
 
 class LatencyMetrics(BaseModel):
     retrieval: int
     llm_inference: int
     total: int
+    # Finer stages; None where a stage did not run, e.g. for a cached answer
+    query_embed: Optional[int] = None
+    search: Optional[int] = None
+    time_to_first_token: Optional[int] = None
+    tokens_per_second: Optional[float] = None
 
 class QueryMetadata(BaseModel):
     model: str = "llama3.2:3b-instruct"
@@ -15,9 +15,17 @@ class RagMetadata(BaseModel):
     language: str = "en"
     content_size: int
     processing_time_ms: Optional[int] = None
+    # Time per build stage, e.g. {"fetch": 120, "split": 4, "embed": 850, ...}
+    stage_timings_ms: Optional[Dict[str, int]] = None
     model_version: str = "all-MiniLM-L6-v2"
     error_message: Optional[str] = None
     error_code: Optional[str] = None
+    # Set on incremental rebuilds of an existing session
+    reused_chunk_count: Optional[int] = None
+    removed_chunk_count: Optional[int] = None
+    # Exported index type and its parameters (see services.index_factory)
+    index_type: Optional[str] = None
+    index_params: Optional[Dict[str, Any]] = None
 
 class RagSession(BaseModel):
     session_id: UUID = Field(default_factory=uuid4)
@@ -0,0 +1,88 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, NamedTuple, Optional
+
+
+class CachedArticle(NamedTuple):
+    title: str
+    revision_id: int
+    content: str
+    checked_at: float
+
+
+class ArticleCache:
+    """
+    On-disk cache of fetched Wikipedia articles.
+
+    Each entry holds the article text together with the revision id it
+    was fetched at and when that revision was last confirmed current, so
+    WikipediaFetcher can skip the download while the revision is
+    unchanged. Least recently checked entries are evicted beyond
+    max_entries.
+    """
+
+    def __init__(self, path: str = "/tmp/article_cache.sqlite3", max_entries: int = 1000):
+        self.path = path
+        self.max_entries = max_entries
+        # Served within the TTL / revalidated by revision id / fully downloaded
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS articles ("
+            " title_key TEXT PRIMARY KEY,"
+            " title TEXT NOT NULL,"
+            " revision_id INTEGER NOT NULL,"
+            " content TEXT NOT NULL,"
+            " checked_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, title_key: str) -> Optional[CachedArticle]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT title, revision_id, content, checked_at FROM articles WHERE title_key = ?",
+                (title_key,)
+            ).fetchone()
+        return CachedArticle(*row) if row else None
+
+    def put(self, title_key: str, title: str, revision_id: int, content: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO articles "
+                "(title_key, title, revision_id, content, checked_at) VALUES (?, ?, ?, ?, ?)",
+                (title_key, title, revision_id, content, time.time())
+            )
+            self._conn.execute(
+                "DELETE FROM articles WHERE title_key IN "
+                "(SELECT title_key FROM articles ORDER BY checked_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def touch(self, title_key: str):
+        """Marks the cached revision as confirmed current as of now."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE articles SET checked_at = ? WHERE title_key = ?",
+                (time.time(), title_key)
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "revalidations": self.revalidations,
+            "misses": self.misses,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,208 @@
+import hashlib
+import json
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+from typing import Any, BinaryIO, Dict, Tuple
+
+from utils.error_handling import AppError
+
+# Layout of a RAG artifact bundle:
+#   prefix    MAGIC, uint32 format version, uint32 manifest length (little-endian)
+#   manifest  UTF-8 JSON describing every member (offset, sizes, compression, sha256)
+#   members   member payloads back to back; offsets are relative to the end of the manifest
+# The manifest sits at the front so a reader can validate a bundle, or fetch a
+# single member, from the first few kilobytes via ranged reads.
+MAGIC = b"WRAB"
+FORMAT_VERSION = 1
+PREFIX = struct.Struct("<4sII")
+COMPRESSIONS = ("none", "zlib")
+
+_COPY_BUFFER = 1024 * 1024
+
+
+def write_bundle(
+    path: str,
+    members: Dict[str, str],
+    metadata: Dict[str, Any],
+    compression: str = "none"
+) -> Dict[str, Any]:
+    """
+    Packs files into a single bundle with a checksummed manifest.
+
+    Args:
+        path (str): Bundle file to write
+        members (Dict[str, str]): Member name -> local file path
+        metadata (Dict[str, Any]): Extra manifest fields (model, dimension, ...)
+        compression (str): "none" or "zlib"
+
+    Returns:
+        Dict[str, Any]: The manifest that was written
+    """
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unsupported bundle compression: {compression}")
+
+    manifest: Dict[str, Any] = {"format_version": FORMAT_VERSION, **metadata, "members": {}}
+    with tempfile.TemporaryFile() as payload:
+        for name, member_path in members.items():
+            offset = payload.tell()
+            digest = hashlib.sha256()
+            size = 0
+            compressor = zlib.compressobj(6) if compression == "zlib" else None
+            with open(member_path, "rb") as f:
+                while True:
+                    block = f.read(_COPY_BUFFER)
+                    if not block:
+                        break
+                    digest.update(block)
+                    size += len(block)
+                    payload.write(compressor.compress(block) if compressor else block)
+            if compressor:
+                payload.write(compressor.flush())
+            manifest["members"][name] = {
+                "offset": offset,
+                "size": size,
+                "stored_size": payload.tell() - offset,
+                "compression": compression,
+                "sha256": digest.hexdigest(),
+            }
+
+        manifest_bytes = json.dumps(manifest, sort_keys=True).encode("utf-8")
+        payload.seek(0)
+        with open(path, "wb") as out:
+            out.write(PREFIX.pack(MAGIC, FORMAT_VERSION, len(manifest_bytes)))
+            out.write(manifest_bytes)
+            shutil.copyfileobj(payload, out, _COPY_BUFFER)
+    return manifest
+
+
+def parse_prefix(data: bytes) -> int:
+    """
+    Validates the fixed-size bundle prefix.
+
+    Returns:
+        int: Length of the manifest that follows the prefix
+
+    Raises:
+        AppError: If the data is not a bundle of a supported version
+    """
+    if len(data) < PREFIX.size:
+        raise AppError("Artifact bundle is truncated", code="INVALID_ARTIFACT")
+    magic, version, manifest_length = PREFIX.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise AppError("Not a RAG artifact bundle", code="INVALID_ARTIFACT")
+    if version != FORMAT_VERSION:
+        raise AppError(
+            f"Unsupported artifact bundle version {version} (expected {FORMAT_VERSION})",
+            code="INVALID_ARTIFACT"
+        )
+    return manifest_length
+
+
+def read_manifest(f: BinaryIO) -> Tuple[Dict[str, Any], int]:
+    """
+    Reads the manifest from an open bundle.
+
+    Returns:
+        Tuple[Dict[str, Any], int]: (manifest, absolute offset of the member payloads)
+    """
+    manifest_length = parse_prefix(f.read(PREFIX.size))
+    manifest_bytes = f.read(manifest_length)
+    if len(manifest_bytes) != manifest_length:
+        raise AppError("Artifact bundle is truncated", code="INVALID_ARTIFACT")
+    return json.loads(manifest_bytes), PREFIX.size + manifest_length
+
+
+def fetch_manifest(s3_client, object_name: str, probe_bytes: int = 64 * 1024) -> Dict[str, Any]:
+    """
+    Reads a stored bundle's manifest with ranged GETs, without downloading
+    the members. Usually one request; a second one if the manifest is
+    larger than probe_bytes.
+
+    Args:
+        s3_client (S3Client): Client for the bundle's bucket
+        object_name (str): Key of the bundle
+
+    Raises:
+        AppError: If the object is missing or not a valid bundle
+    """
+    head = s3_client.get_range(object_name, 0, probe_bytes)
+    if head is None:
+        raise AppError(f"Artifact bundle {object_name} not found", code="SESSION_NOT_FOUND")
+    manifest_length = parse_prefix(head)
+    manifest_bytes = head[PREFIX.size:PREFIX.size + manifest_length]
+    if len(manifest_bytes) < manifest_length:
+        rest = s3_client.get_range(
+            object_name, PREFIX.size + len(manifest_bytes), manifest_length - len(manifest_bytes)
+        ) or b""
+        manifest_bytes += rest
+    if len(manifest_bytes) != manifest_length:
+        raise AppError("Artifact bundle is truncated", code="INVALID_ARTIFACT")
+    return json.loads(manifest_bytes)
+
+
+def extract_bundle(path: str, dest_dir: str) -> Dict[str, Any]:
+    """
+    Validates a bundle and extracts every member into dest_dir.
+
+    Each member is decompressed and its size and SHA-256 are checked
+    against the manifest. On failure every member extracted so far is deleted.
+
+    Returns:
+        Dict[str, Any]: The bundle manifest
+
+    Raises:
+        AppError: If the bundle is malformed or a checksum does not match
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    extracted = []
+    try:
+        with open(path, "rb") as f:
+            manifest, data_offset = read_manifest(f)
+            for name, member in manifest["members"].items():
+                if os.path.basename(name) != name or member["compression"] not in COMPRESSIONS:
+                    raise AppError(f"Invalid bundle member {name}", code="INVALID_ARTIFACT")
+                member_path = os.path.join(dest_dir, name)
+                extracted.append(member_path)
+                _extract_member(f, data_offset + member["offset"], member, member_path)
+    except Exception as e:
+        # Never leave partial members where a later load could pick them up
+        for member_path in extracted:
+            if os.path.exists(member_path):
+                os.remove(member_path)
+        if isinstance(e, AppError):
+            raise
+        raise AppError(f"Artifact bundle is corrupt: {e}", code="INVALID_ARTIFACT") from e
+    return manifest
+
+
+def _extract_member(f: BinaryIO, offset: int, member: Dict[str, Any], member_path: str):
+    f.seek(offset)
+    remaining = member["stored_size"]
+    decompressor = zlib.decompressobj() if member["compression"] == "zlib" else None
+    digest = hashlib.sha256()
+    size = 0
+    with open(member_path, "wb") as out:
+        while remaining > 0:
+            block = f.read(min(_COPY_BUFFER, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            if decompressor:
+                block = decompressor.decompress(block)
+            digest.update(block)
+            size += len(block)
+            out.write(block)
+        if decompressor:
+            block = decompressor.flush()
+            digest.update(block)
+            size += len(block)
+            out.write(block)
+
+    if size != member["size"] or digest.hexdigest() != member["sha256"]:
+        raise AppError(
+            f"Checksum mismatch for bundle member {os.path.basename(member_path)}",
+            code="INVALID_ARTIFACT"
+        )
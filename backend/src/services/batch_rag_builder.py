@@ -0,0 +1,194 @@
+import copy
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, List, Optional
+
+import numpy as np
+
+from models.batch_build import BatchBuildJob
+from models.rag_session import RagSession, RagStatus
+from services.embedding_service import EmbeddingService
+from services.rag_builder import RagBuilderService
+from services.vector_store import VectorStoreService
+
+logger = logging.getLogger(__name__)
+
+# Default size of the encoding pool, whatever the core count: every worker
+# still holds its own activations and interpreter
+MAX_DEFAULT_EMBED_WORKERS = 4
+
+# Each pool worker's encoder, around the model handed over by _init_worker
+_worker_service: Optional[EmbeddingService] = None
+
+
+def _init_worker(model_name: str, model: Any):
+    """
+    Wraps the model passed in, whose torch weights arrive as handles to the
+    parent's shared memory rather than as a copy. Keeps each worker to one
+    torch thread so workers do not oversubscribe CPUs.
+    """
+    global _worker_service
+    try:
+        import torch
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+    _worker_service = EmbeddingService(model_name, model=model)
+
+
+def _encode_shard(texts: List[str]) -> np.ndarray:
+    return _worker_service.encode(texts)
+
+
+def _share_model(model: Any):
+    """
+    Moves a torch model's weights into shared memory, so pickling it to a
+    worker passes handles to the same pages instead of copying them. Other
+    models (e.g. test stand-ins) are pickled as they are.
+    """
+    try:
+        import torch
+        import torch.multiprocessing  # noqa: F401 - registers tensor pickling by handle
+    except ImportError:
+        return
+    if isinstance(model, torch.nn.Module):
+        model.share_memory()
+
+
+class PooledEmbeddingService(EmbeddingService):
+    """
+    EmbeddingService that spreads large encode calls over a process pool.
+
+    The pool starts on the first encode call large enough to need it, and
+    the model is loaded then, once, in this process: its weights are moved
+    to shared memory and every worker maps those pages rather than loading
+    a copy. Workers are started with forkserver (or spawn), not forked from
+    this process: by the time a batch runs it has torch, S3 transfer and
+    prefetch threads, and forking a threaded process can deadlock the
+    child. Where a process pool cannot be created (e.g. no /dev/shm on
+    Lambda) encoding stays in-process.
+    """
+
+    def __init__(self, base: EmbeddingService, workers: int, shard_size: int = 16):
+        # The base's model if it has one loaded; otherwise loaded on first use
+        super().__init__(base.model_name, model=base._model, cache=base.cache)
+        self.workers = workers
+        self.shard_size = shard_size
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._pool_failed = workers <= 1
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        with self._pool_lock:
+            if self.pool is None and not self._pool_failed:
+                _share_model(self.model)
+                start_method = "forkserver" \
+                    if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                try:
+                    self.pool = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context(start_method),
+                        initializer=_init_worker,
+                        initargs=(self.model_name, self.model)
+                    )
+                except (OSError, NotImplementedError, ValueError) as e:
+                    logger.warning(f"Process pool unavailable, encoding in-process: {e}")
+                    self._pool_failed = True
+            return self.pool
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        pool = self._get_pool() if len(texts) > self.shard_size else None
+        if pool is None:
+            return super().encode(texts)
+
+        shards = [texts[i:i + self.shard_size] for i in range(0, len(texts), self.shard_size)]
+        try:
+            return np.vstack(list(pool.map(_encode_shard, shards)))
+        except BrokenProcessPool as e:
+            logger.warning(f"Process pool failed, encoding in-process: {e}")
+            with self._pool_lock:
+                self._pool_failed = True
+            self.close()
+            return super().encode(texts)
+
+    def close(self):
+        with self._pool_lock:
+            pool, self.pool = self.pool, None
+        if pool is not None:
+            pool.shutdown()
+
+
+class BatchRagBuilder:
+    """
+    Builds RAG sessions for many Wikipedia URLs in one call.
+
+    Articles are fetched concurrently on a thread pool and each one is
+    built as soon as its fetch completes, while the remaining fetches
+    continue. Encoding goes through a PooledEmbeddingService shared by
+    all builds.
+
+    Builds run on a copy of the given builder with its own embedding
+    service and index arena, so single builds on the given builder keep
+    encoding in-process and never share an index with a batch.
+    """
+
+    def __init__(
+        self,
+        builder: RagBuilderService,
+        fetch_workers: int = 8,
+        embed_workers: Optional[int] = None
+    ):
+        self.fetch_workers = fetch_workers
+        self.embedding_service = PooledEmbeddingService(
+            builder.embedding_service,
+            workers=embed_workers or min(os.cpu_count() or 1, MAX_DEFAULT_EMBED_WORKERS)
+        )
+        # Shares the fetcher, S3 client and build settings
+        self.builder = copy.copy(builder)
+        self.builder.embedding_service = self.embedding_service
+        self.builder.vector_store = VectorStoreService(
+            dimension=builder.vector_store.dimension,
+            max_index_bytes=builder.vector_store.max_index_bytes
+        )
+
+    def build_many(self, urls: List[str]) -> BatchBuildJob:
+        """
+        Builds one session per URL.
+
+        Args:
+            urls (List[str]): Wikipedia URLs
+
+        Returns:
+            BatchBuildJob: Per-article sessions in input order plus totals
+        """
+        start = time.perf_counter()
+        sessions: List[Optional[RagSession]] = [None] * len(urls)
+
+        with ThreadPoolExecutor(max_workers=self.fetch_workers) as fetcher:
+            futures = {
+                fetcher.submit(self.builder.wiki_fetcher.fetch_article, url): i
+                for i, url in enumerate(urls)
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                # Fetch errors surface inside the build and mark that session failed
+                sessions[i] = self.builder.build_rag_session(
+                    urls[i], fetch_article=lambda _url, f=future: f.result()
+                )
+
+        succeeded = sum(1 for s in sessions if s.status == RagStatus.READY)
+        return BatchBuildJob(
+            total=len(urls),
+            succeeded=succeeded,
+            failed=len(urls) - succeeded,
+            elapsed_ms=int((time.perf_counter() - start) * 1000),
+            sessions=sessions
+        )
+
+    def close(self):
+        self.embedding_service.close()
@@ -1,85 +1,678 @@
 import os
-import json
 import shutil
-from typing import List, Optional, Generator, Dict
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, List, Optional, Generator, Dict, Tuple
 from uuid import UUID
 
+from ..models.chat_message import ChatMessage, MessageMetadata, MessageRole
 from ..models.query import Query, RetrievedChunk, LatencyMetrics, QueryMetadata
 from ..models.rag_session import RagStatus
-from ..services.llm_service import LLMService
+from ..services.llm_service import (
+    LLMService, LLM_ERROR_PREFIX, CANNOT_ANSWER_TEXT, collect_stream
+)
 from ..services.embedding_service import EmbeddingService
-from ..services.vector_store import VectorStoreService
+from ..services.vector_store import VectorStoreService, distance_to_similarity
+from ..services.chunk_store import ChunkStore, convert_json_chunks
+from ..services.artifact_bundle import extract_bundle
+from ..services.query_cache import QueryCache, normalize_query
+from ..services.context_builder import ContextBuilder
+from ..services.lexical_index import LexicalIndex, reciprocal_rank_fusion
+from ..services.history_writer import HistoryWriter
 from ..utils.s3_client import S3Client
+from ..utils.error_handling import AppError
+from ..utils.metrics import StageTimer
+
+DEFAULT_TOP_K = 3
+# Largest top_k a request may ask for
+MAX_TOP_K = 10
+# "hybrid" fuses BM25 and vector results, "dense" is vector search only and
+# "lexical" is BM25 only, which skips the embedding model
+RETRIEVAL_MODES = ("hybrid", "dense", "lexical")
+# Each retriever returns this many candidates per final result for fusion
+FUSION_CANDIDATES_PER_RESULT = 4
+# With a score-gap cutoff, BM25 hits scoring under this fraction of the
+# best BM25 hit are dropped as well
+LEXICAL_MIN_SCORE_RATIO = 0.5
+
+# Index loads run one at a time, so each one's resident-memory growth can be
+# measured on its own
+_index_load_lock = threading.Lock()
+
+
+def resident_bytes() -> Optional[int]:
+    """Resident set size of this process (Linux), None if unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+# A retrieved chunk: its vector id and cosine similarity to the query, or
+# None where only BM25 found it
+Hit = Tuple[int, Optional[float]]
+
+
+def latency_metrics(timer: StageTimer) -> LatencyMetrics:
+    """Summarizes a query's StageTimer (see process_query) as LatencyMetrics."""
+    stages = timer.stages_ms()
+    generation_ms = timer.get("generation")
+    tokens = timer.values.get("generated_tokens")
+    return LatencyMetrics(
+        retrieval=sum(stages.get(name, 0) for name in ("query_embed", "search", "context")),
+        llm_inference=stages.get("generation", 0),
+        total=round(timer.total_ms),
+        query_embed=stages.get("query_embed"),
+        search=stages.get("search"),
+        time_to_first_token=stages.get("time_to_first_token"),
+        tokens_per_second=round(tokens / (generation_ms / 1000), 1)
+        if tokens and generation_ms else None
+    )
 
 class ChatService:
-    def __init__(self, session_id: str, rag_bucket_name: Optional[str] = None):
+    def __init__(
+        self,
+        session_id: str,
+        rag_bucket_name: Optional[str] = None,
+        llm_service: Optional[LLMService] = None,
+        embedding_service: Optional[EmbeddingService] = None,
+        s3_client: Optional[S3Client] = None,
+        query_cache: Optional[QueryCache] = None,
+        context_builder: Optional[ContextBuilder] = None,
+        retrieval_mode: str = "hybrid",
+        min_similarity: Optional[float] = None,
+        max_score_gap: Optional[float] = None,
+        history_writer: Optional[HistoryWriter] = None
+    ):
         self.session_id = str(UUID(session_id)) # Validation
-        self.llm_service = LLMService()
-        self.embedding_service = EmbeddingService()
+        if retrieval_mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode {retrieval_mode!r}")
+        # Default for queries that do not choose a mode
+        self.retrieval_mode = retrieval_mode
+        # Adaptive top-k: vector hits less similar than min_similarity, or
+        # more than max_score_gap below the best hit, are not sent to the
+        # LLM. None disables a cutoff. BM25 scores have no absolute scale,
+        # so in hybrid mode a query none of whose vector hits passes
+        # min_similarity is off-topic, whatever its BM25 matches.
+        self.min_similarity = min_similarity
+        self.max_score_gap = max_score_gap
+        # The LLM client, embedding model and S3 client are session-independent;
+        # pass them in to share one instance between all sessions in a process
+        self.llm_service = llm_service or LLMService()
+        self.embedding_service = embedding_service or EmbeddingService()
         self.vector_store = VectorStoreService()
-        self.s3_client = S3Client(rag_bucket_name) if rag_bucket_name else None
+        self.s3_client = s3_client or (S3Client(rag_bucket_name) if rag_bucket_name else None)
+        # Optional, usually process-wide: cached query embeddings and answers
+        self.query_cache = query_cache
+        # Merges and packs retrieved chunks into the prompt's token budget
+        self.context_builder = context_builder or ContextBuilder()
+        # Optional, process-wide: buffers answered queries for DynamoDB
+        self.history_writer = history_writer
+        # Identifies the loaded artifacts, so cached answers end with a rebuild
+        self.artifact_version = self.session_id
         
-        # In-memory storage for this session instance (Lambda warm start optimization)
-        self.chunk_map: Dict[int, str] = {}
-        self._load_resources()
+        # Resident memory taken by the loaded FAISS index
+        self.index_bytes = 0
+        # Memory-mapped chunk text for this session instance (Lambda warm start optimization)
+        self.chunk_store: Optional[ChunkStore] = None
+        # BM25 index over the same chunks; sessions built before it have none
+        self.lexical_index: Optional[LexicalIndex] = None
+        # Each instance loads into its own directory, so a reload of a rebuilt
+        # session never overwrites files another instance still has mapped.
+        # Warm reuse across requests is ChatServicePool's job.
+        self.tmp_dir = tempfile.mkdtemp(prefix=f"{self.session_id}-")
+        # Time spent downloading and loading the session's artifacts
+        self.load_timer = StageTimer()
+        try:
+            self._load_resources()
+        except Exception:
+            self.close()
+            raise
+
+    @property
+    def memory_usage_bytes(self) -> int:
+        """
+        Approximate memory held for this session: the resident growth
+        measured while loading its index, plus the mapped chunk store and
+        BM25 index, whose pages stay resident once they are read.
+        """
+        total = self.index_bytes
+        for name in ("chunks.bin", "lexical.bin"):
+            path = os.path.join(self.tmp_dir, name)
+            if os.path.exists(path):
+                total += os.path.getsize(path)
+        return total
+
+    def close(self):
+        """
+        Releases the session's index and chunk store and deletes its /tmp
+        files. Shared services passed in are left untouched.
+        """
+        if self.chunk_store is not None:
+            self.chunk_store.close()
+            self.chunk_store = None
+        if self.lexical_index is not None:
+            self.lexical_index.close()
+            self.lexical_index = None
+        self.vector_store.reset()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
 
     def _load_resources(self):
         """
-        Downloads index and chunks from S3 to local /tmp and loads them.
+        Downloads the session's artifact bundle from S3 to local /tmp,
+        validates it and loads the index and chunks.
         """
-        tmp_dir = f"/tmp/{self.session_id}"
-        os.makedirs(tmp_dir, exist_ok=True)
-        
-        index_key = f"indices/{self.session_id}/index.faiss"
-        chunks_key = f"indices/{self.session_id}/chunks.json"
+        tmp_dir = self.tmp_dir
         
         local_index_path = os.path.join(tmp_dir, "index.faiss")
-        local_chunks_path = os.path.join(tmp_dir, "chunks.json")
+        local_chunks_path = os.path.join(tmp_dir, "chunks.bin")
         
         if self.s3_client:
-            # Download if not exists (caching for warm starts)
-            if not os.path.exists(local_index_path):
-                self.s3_client.download_file(index_key, local_index_path)
-            if not os.path.exists(local_chunks_path):
-                self.s3_client.download_file(chunks_key, local_chunks_path)
+            with self.load_timer.stage("download"):
+                if not self._download_bundle(tmp_dir):
+                    self._download_legacy_artifacts(tmp_dir)
         
-        # Load Vector Store
-        if os.path.exists(local_index_path):
-            self.vector_store.load_local(local_index_path)
-            
-        # Load Chunks
-        if os.path.exists(local_chunks_path):
-            with open(local_chunks_path, 'r') as f:
-                chunks_data = json.load(f)
-                self.chunk_map = {item['position']: item['content'] for item in chunks_data}
-
-    def process_query(self, query_text: str) -> Generator[str, None, None]:
+        with self.load_timer.stage("load"):
+            # Load Vector Store
+            if os.path.exists(local_index_path):
+                with _index_load_lock:
+                    before = resident_bytes()
+                    self.vector_store.load_local(local_index_path)
+                    after = resident_bytes()
+                # FAISS holds at least the serialized index in memory; the
+                # growth can be smaller when freed memory is reused, or is
+                # unknown where RSS cannot be read
+                self.index_bytes = os.path.getsize(local_index_path)
+                if before is not None and after is not None:
+                    self.index_bytes = max(self.index_bytes, after - before)
+                
+            # Load Chunks
+            if os.path.exists(local_chunks_path):
+                self.chunk_store = ChunkStore(local_chunks_path)
+
+            local_lexical_path = os.path.join(tmp_dir, "lexical.bin")
+            if os.path.exists(local_lexical_path) and self.chunk_store is not None:
+                self.lexical_index = LexicalIndex(local_lexical_path)
+
+    def _download_bundle(self, tmp_dir: str) -> bool:
+        """
+        Fetches and unpacks the session bundle in a single S3 request.
+
+        Returns:
+            bool: False if the session has no bundle
+
+        Raises:
+            AppError: If the bundle is corrupt or was built for another model
+        """
+        bundle_path = os.path.join(tmp_dir, "bundle.rag")
+        if not self.s3_client.download_file(f"indices/{self.session_id}/bundle.rag", bundle_path):
+            return False
+        try:
+            manifest = extract_bundle(bundle_path, tmp_dir)
+        finally:
+            os.remove(bundle_path)
+        index_sha = manifest["members"]["index.faiss"]["sha256"]
+        self.artifact_version = f"{self.session_id}:{index_sha[:16]}"
+
+        model = manifest.get("embedding_model")
+        dimension = manifest.get("embedding_dimension")
+        if model != self.embedding_service.model_name or dimension != self.vector_store.dimension:
+            raise AppError(
+                f"Session {self.session_id} was built with {model} ({dimension}d) embeddings",
+                code="MODEL_MISMATCH"
+            )
+        return True
+
+    def _download_legacy_artifacts(self, tmp_dir: str):
+        """Fetches sessions built before bundles, which stored each file separately."""
+        prefix = f"indices/{self.session_id}"
+        local_chunks_path = os.path.join(tmp_dir, "chunks.bin")
+        downloaded = self.s3_client.download_files([
+            (f"{prefix}/index.faiss", os.path.join(tmp_dir, "index.faiss")),
+            (f"{prefix}/chunks.bin", local_chunks_path),
+        ])
+        if not downloaded[f"{prefix}/chunks.bin"]:
+            # Sessions built before chunks.bin: convert once, then mmap as usual
+            legacy_path = os.path.join(tmp_dir, "chunks.json")
+            if self.s3_client.download_file(f"{prefix}/chunks.json", legacy_path):
+                convert_json_chunks(legacy_path, local_chunks_path)
+                os.remove(legacy_path)
+
+    def process_query(
+        self,
+        query_text: str,
+        retrieval_mode: Optional[str] = None,
+        top_k: Optional[int] = None,
+        retrieved: Optional[List[RetrievedChunk]] = None,
+        timer: Optional[StageTimer] = None
+    ) -> Generator[str, None, None]:
         """
         Orchestrates the RAG flow: Retrieve -> Augment -> Generate
+
+        With a query cache, a repeated question is replayed from the cached
+        answer chunks, and a repeated query text skips the embedding model.
+        If no chunk passes the similarity cutoffs, CANNOT_ANSWER_TEXT is
+        returned without calling the LLM. Answered queries are handed to the
+        history writer, if any, once the answer is complete.
+
+        Args:
+            query_text (str): The user's question
+            retrieval_mode (str, optional): One of RETRIEVAL_MODES. Defaults
+                to the service's retrieval_mode
+            top_k (int, optional): Most chunks to use, up to MAX_TOP_K.
+                Defaults to DEFAULT_TOP_K
+            retrieved (List[RetrievedChunk], optional): Filled with the chunks
+                used as context, before the first answer chunk is yielded;
+                left empty for a cached answer
+            timer (StageTimer, optional): Records the query_embed, search,
+                context, time_to_first_token and generation stages and the
+                generated_tokens count; see latency_metrics
         """
-        # 1. Embed Query
-        query_embedding_list = self.embedding_service.generate_embeddings([query_text])
-        if not query_embedding_list:
-             yield "Error: Could not process query."
-             return
-             
-        query_vector = query_embedding_list[0]
+        timer = timer or StageTimer()
+        asked_at = datetime.utcnow()
+        top_k = self._resolve_top_k(top_k)
+        mode = self._resolve_mode(retrieval_mode)
+        cached_answer = self._cached_answer(query_text, top_k, mode)
+        if cached_answer is not None:
+            yield from cached_answer
+            self._record_history(
+                query_text, "".join(cached_answer), [], top_k, latency_metrics(timer),
+                asked_at=asked_at
+            )
+            return
+
+        # 1. Embed Query, unless retrieval is lexical only
+        query_vectors = [None]
+        if mode != "lexical":
+            with timer.stage("query_embed"):
+                query_vectors = self._embed_queries([query_text])
 
         # 2. Retrieve context
-        distances, indices = self.vector_store.search(query_vector, top_k=3)
-        
-        retrieved_texts = []
-        for idx in indices:
-            # FAISS returns -1 for not found/padding
-            if idx != -1 and idx in self.chunk_map:
-                retrieved_texts.append(self.chunk_map[idx])
-        
-        context_text = "\n\n".join(retrieved_texts)
-        if not context_text:
-            context_text = "No relevant context found in this document."
+        with timer.stage("search"):
+            hits = self._retrieve([query_text], query_vectors, top_k, mode)[0]
+        if hits is None:
+             yield "Error: Could not process query."
+             return
+        chunks = self._retrieved_chunks(hits)
+        if retrieved is not None:
+            retrieved.extend(chunks)
+        if not hits:
+            yield CANNOT_ANSWER_TEXT
+            self._record_history(
+                query_text, CANNOT_ANSWER_TEXT, chunks, top_k, latency_metrics(timer),
+                asked_at=asked_at
+            )
+            return
+        with timer.stage("context"):
+            context_text = self._build_context([vector_id for vector_id, _ in hits])
 
         # 3. Call LLM with streaming
-        for chunk in self.llm_service.stream_response(query_text, context_text):
-            yield chunk
+        answer_chunks = []
+        complete = yield from self._stream_answer(
+            query_text, context_text, top_k, mode, timer, answer_chunks
+        )
+        if not complete:
+            # Failed or cut off: not worth keeping as history
+            return
+
+        # 4. Persist the exchange; the writer only buffers it
+        self._record_history(
+            query_text, "".join(answer_chunks), chunks, top_k, latency_metrics(timer),
+            asked_at=asked_at, token_count=timer.values.get("generated_tokens")
+        )
+
+    def process_queries(
+        self,
+        query_texts: List[str],
+        max_concurrency: int = 4,
+        retrieval_mode: Optional[str] = None,
+        top_k: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Answers several queries against this session in one pass.
+
+        All uncached queries are embedded with one encode call and searched
+        with one FAISS call on the query matrix; the LLM generations then
+        run on up to max_concurrency threads. Queries that are identical
+        after normalization are answered once.
+
+        Args:
+            query_texts (List[str]): Queries, answered in this order
+            max_concurrency (int): Maximum LLM generations in flight
+            retrieval_mode (str, optional): As for process_query
+            top_k (int, optional): As for process_query
+
+        Answered queries are handed to the history writer, if any, as in
+        process_query.
+
+        Returns:
+            Dict[str, Any]: "results", one dict per query with its response,
+                whether it came from the answer cache, any error, the
+                RetrievedChunks used and its generation time; and
+                "timings_ms" for the batch stages
+        """
+        start = time.perf_counter()
+        asked_at = datetime.utcnow()
+        top_k = self._resolve_top_k(top_k)
+        mode = self._resolve_mode(retrieval_mode)
+        results: List[Dict[str, Any]] = [
+            {
+                "query": text, "response": None, "cached": False, "error": None,
+                "retrieved_chunks": [], "llm_ms": 0
+            }
+            for text in query_texts
+        ]
+
+        # Index of the first occurrence of each distinct query
+        first_of: Dict[str, int] = {}
+        pending = []
+        for i, text in enumerate(query_texts):
+            key = normalize_query(text)
+            if key in first_of:
+                continue
+            first_of[key] = i
+            cached_answer = self._cached_answer(text, top_k, mode)
+            if cached_answer is not None:
+                results[i]["response"] = "".join(cached_answer)
+                results[i]["cached"] = True
+            else:
+                pending.append(i)
+
+        # 1. Embed all uncached queries at once
+        embed_start = time.perf_counter()
+        pending_texts = [query_texts[i] for i in pending]
+        if mode != "lexical":
+            vectors = self._embed_queries(pending_texts)
+        else:
+            vectors = [None] * len(pending)
+        embed_ms = (time.perf_counter() - embed_start) * 1000
+
+        # 2. Retrieve context for all of them with one vector search
+        retrieval_start = time.perf_counter()
+        contexts = []
+        for i, hits in zip(pending, self._retrieve(pending_texts, vectors, top_k, mode)):
+            if hits is None:
+                results[i]["error"] = "Could not process query."
+                continue
+            results[i]["retrieved_chunks"] = self._retrieved_chunks(hits)
+            if hits:
+                contexts.append((i, self._build_context([vector_id for vector_id, _ in hits])))
+            else:
+                results[i]["response"] = CANNOT_ANSWER_TEXT
+        retrieval_ms = (time.perf_counter() - retrieval_start) * 1000
+
+        # 3. Generate with bounded concurrency
+        def generate(item):
+            i, context_text = item
+            generation_start = time.perf_counter()
+            try:
+                answer, complete = collect_stream(
+                    self._stream_answer(query_texts[i], context_text, top_k, mode)
+                )
+                if complete:
+                    results[i]["response"] = answer
+                elif LLM_ERROR_PREFIX in answer:
+                    results[i]["error"] = answer[answer.index(LLM_ERROR_PREFIX):]
+                else:
+                    results[i]["error"] = "Generation stopped before the answer was complete."
+            except Exception as e:
+                results[i]["error"] = str(e)
+            results[i]["llm_ms"] = round((time.perf_counter() - generation_start) * 1000, 1)
+
+        generation_start = time.perf_counter()
+        if contexts:
+            workers = max(1, min(max_concurrency, len(contexts)))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(generate, contexts))
+        generation_ms = (time.perf_counter() - generation_start) * 1000
+
+        # Repeats share the answer of their first occurrence
+        for i, text in enumerate(query_texts):
+            first = first_of[normalize_query(text)]
+            if first != i:
+                results[i].update({
+                    key: results[first][key]
+                    for key in ("response", "cached", "error", "retrieved_chunks")
+                })
+
+        total_ms = (time.perf_counter() - start) * 1000
+        for i, result in enumerate(results):
+            if result["response"] is not None:
+                # Every query waited for the whole batch. The questions arrived
+                # together; microsecond offsets keep their sort keys distinct.
+                self._record_history(
+                    result["query"], result["response"], result["retrieved_chunks"], top_k,
+                    LatencyMetrics(
+                        retrieval=round(embed_ms + retrieval_ms),
+                        llm_inference=round(result["llm_ms"]),
+                        total=round(total_ms)
+                    ),
+                    asked_at=asked_at + timedelta(microseconds=i)
+                )
+
+        return {
+            "results": results,
+            "timings_ms": {
+                "embedding": round(embed_ms, 1),
+                "retrieval": round(retrieval_ms, 1),
+                "generation": round(generation_ms, 1),
+                "total": round(total_ms, 1),
+            },
+        }
+
+    def _record_history(
+        self,
+        query_text: str,
+        answer: str,
+        retrieved: List[RetrievedChunk],
+        top_k: int,
+        latency: LatencyMetrics,
+        asked_at: Optional[datetime] = None,
+        token_count: Optional[int] = None
+    ):
+        """
+        Hands a Query and its question and answer ChatMessages to the
+        history writer, which buffers them. Failed answers are not kept.
+        """
+        if self.history_writer is None or not answer or answer.startswith(LLM_ERROR_PREFIX):
+            return
+        asked_at = asked_at or datetime.utcnow()
+        try:
+            query = Query(
+                session_id=self.session_id,
+                query_text=query_text,
+                retrieved_chunks=retrieved,
+                response_text=answer,
+                created_at=asked_at,
+                latency_ms=latency,
+                metadata=QueryMetadata(model=self.llm_service.model, top_k=top_k)
+            )
+            question = ChatMessage(
+                session_id=self.session_id,
+                content=query_text,
+                role=MessageRole.USER,
+                created_at=asked_at
+            )
+            reply = ChatMessage(
+                session_id=self.session_id,
+                query_id=query.query_id,
+                content=answer,
+                role=MessageRole.ASSISTANT,
+                metadata=MessageMetadata(token_count=token_count or None)
+            )
+        except ValueError as e:
+            # e.g. a query text outside the Query model's length limits
+            print(f"Not persisting query for session {self.session_id}: {e}")
+            return
+        self.history_writer.add_message(question)
+        self.history_writer.add_query(query)
+        self.history_writer.add_message(reply)
+
+    def _resolve_top_k(self, top_k: Optional[int]) -> int:
+        if top_k is None:
+            return DEFAULT_TOP_K
+        if not 1 <= top_k <= MAX_TOP_K:
+            raise AppError(f"top_k must be between 1 and {MAX_TOP_K}", code="INVALID_TOP_K")
+        return top_k
+
+    def _resolve_mode(self, retrieval_mode: Optional[str]) -> str:
+        """The mode a query actually runs in: without a lexical index, only dense."""
+        mode = retrieval_mode or self.retrieval_mode
+        if mode not in RETRIEVAL_MODES:
+            raise AppError(f"Unknown retrieval mode {mode!r}", code="INVALID_RETRIEVAL_MODE")
+        return mode if self.lexical_index is not None else "dense"
+
+    def _retrieve(
+        self,
+        query_texts: List[str],
+        query_vectors: List[Optional[List[float]]],
+        top_k: int,
+        mode: str
+    ) -> List[Optional[List[Hit]]]:
+        """
+        The chunks to use for each query, best first, after the similarity
+        cutoffs; None where a query needed an embedding and has none. Dense
+        search runs as one FAISS call for all queries.
+        """
+        candidates = top_k if mode == "dense" else top_k * FUSION_CANDIDATES_PER_RESULT
+        dense: List[Optional[List[Hit]]] = [None] * len(query_texts)
+        if mode != "lexical":
+            embedded = [i for i, vector in enumerate(query_vectors) if vector is not None]
+            distances, rows = self.vector_store.search_batch(
+                [query_vectors[i] for i in embedded], top_k=candidates
+            )
+            for i, row_distances, row in zip(embedded, distances, rows):
+                dense[i] = self._dense_hits(row_distances, row)
+        if mode == "dense":
+            return dense
+
+        retrieved: List[Optional[List[Hit]]] = []
+        for text, dense_hits in zip(query_texts, dense):
+            lexical_ids = self._lexical_ids(text, candidates)
+            if mode == "lexical":
+                retrieved.append([(vector_id, None) for vector_id in lexical_ids[:top_k]])
+            elif dense_hits is None:
+                retrieved.append(None)
+            elif not dense_hits and self.min_similarity is not None:
+                retrieved.append([])
+            else:
+                similarity = dict(dense_hits)
+                fused = reciprocal_rank_fusion(
+                    [[vector_id for vector_id, _ in dense_hits], lexical_ids], top_k
+                )
+                retrieved.append([(vector_id, similarity.get(vector_id)) for vector_id in fused])
+        return retrieved
+
+    def _dense_hits(self, distances: List[float], vector_ids: List[int]) -> List[Hit]:
+        """Vector search results that pass the similarity cutoffs, best first."""
+        # FAISS pads missing results with -1
+        hits = [
+            (vector_id, distance_to_similarity(distance))
+            for distance, vector_id in zip(distances, vector_ids) if vector_id != -1
+        ]
+        if self.min_similarity is not None:
+            hits = [hit for hit in hits if hit[1] >= self.min_similarity]
+        if self.max_score_gap is not None and hits:
+            best = hits[0][1]
+            hits = [hit for hit in hits if hit[1] >= best - self.max_score_gap]
+        return hits
+
+    def _lexical_ids(self, query_text: str, candidates: int) -> List[int]:
+        """Vector ids of the best BM25 matches, best first."""
+        scores, positions = self.lexical_index.search(query_text, top_k=candidates)
+        if self.max_score_gap is not None and scores:
+            cutoff = scores[0] * LEXICAL_MIN_SCORE_RATIO
+            positions = [p for p, score in zip(positions, scores) if score >= cutoff]
+        return [self.chunk_store.vector_id(position) for position in positions]
+
+    def _retrieved_chunks(self, hits: List[Hit]) -> List[RetrievedChunk]:
+        chunks = []
+        for vector_id, similarity in hits:
+            position = self.chunk_store.position_of(vector_id) if self.chunk_store else None
+            if position is None:
+                continue
+            chunks.append(RetrievedChunk(
+                chunk_id=self.chunk_store.chunk_id(position),
+                position=position,
+                similarity_score=None if similarity is None else round(similarity, 4)
+            ))
+        return chunks
+
+    def _cached_answer(self, query_text: str, top_k: int, mode: str) -> Optional[List[str]]:
+        if self.query_cache is None:
+            return None
+        return self.query_cache.get_answer(
+            self._answer_scope(mode), query_text, self.llm_service.model, top_k
+        )
+
+    def _answer_scope(self, mode: str) -> str:
+        # Answers depend on the artifacts and on how context was retrieved
+        return f"{self.artifact_version}:{mode}"
+
+    def _embed_queries(self, query_texts: List[str]) -> List[Optional[List[float]]]:
+        """Embeds queries with one encode call for those not in the query cache."""
+        if not query_texts:
+            return []
+        model_name = self.embedding_service.model_name
+        vectors: List[Optional[List[float]]] = [None] * len(query_texts)
+        if self.query_cache is not None:
+            vectors = [self.query_cache.get_embedding(model_name, text) for text in query_texts]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            encoded = self.embedding_service.generate_embeddings([query_texts[i] for i in missing])
+            for i, vector in zip(missing, encoded):
+                vectors[i] = vector
+                if self.query_cache is not None:
+                    self.query_cache.put_embedding(model_name, query_texts[i], vector)
+        return vectors
+
+    def _build_context(self, indices: List[int]) -> str:
+        return self.context_builder.build(self.chunk_store, indices).text
+
+    def _stream_answer(
+        self,
+        query_text: str,
+        context_text: str,
+        top_k: int,
+        mode: str,
+        timer: Optional[StageTimer] = None,
+        answer_chunks: Optional[List[str]] = None
+    ) -> Generator[str, None, bool]:
+        """
+        Streams the LLM's answer, filling answer_chunks if given. Returns
+        whether the answer is complete; only then is it cached.
+        """
+        llm_model = self.llm_service.model
+        answer_chunks = [] if answer_chunks is None else answer_chunks
+        start = time.perf_counter()
+        stream = self.llm_service.stream_response(query_text, context_text)
+        complete = False
+        try:
+            while True:
+                try:
+                    chunk = next(stream)
+                except StopIteration as stop:
+                    complete = bool(stop.value)
+                    break
+                if timer is not None and not answer_chunks:
+                    timer.add("time_to_first_token", (time.perf_counter() - start) * 1000)
+                answer_chunks.append(chunk)
+                yield chunk
+        finally:
+            stream.close()
+            if timer is not None:
+                timer.add("generation", (time.perf_counter() - start) * 1000)
+                # Ollama streams one token per chunk
+                timer.values["generated_tokens"] = len(answer_chunks)
 
-        # TODO: Persist query/chat history to DynamoDB
+        # Only answers the LLM finished are cached; a failure after some
+        # tokens, a generation cut off at its deadline, or a consumer that
+        # stops early never gets here
+        if complete and self.query_cache is not None and answer_chunks:
+            self.query_cache.put_answer(
+                self._answer_scope(mode), query_text, llm_model, top_k, answer_chunks
+            )
+        return complete
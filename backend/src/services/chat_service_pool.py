@@ -0,0 +1,137 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+
+from ..services.chat_service import ChatService
+
+
+class _PoolEntry:
+    def __init__(self, service: ChatService, size_bytes: int):
+        self.service = service
+        self.size_bytes = size_bytes
+        self.loaded_at = time.monotonic()
+        self.leases = 0
+        self.evicted = False
+
+
+class ChatServicePool:
+    """
+    Process-wide pool of loaded ChatService instances keyed by session_id.
+
+    Loaded sessions are kept in LRU order and evicted once their combined
+    index and chunk store size exceeds max_bytes. A session handed out via
+    lease() is never closed while the lease is held; if it is evicted in
+    the meantime it is closed when the last lease is released.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[str], ChatService],
+        max_bytes: int = 512 * 1024 * 1024,
+        max_age_s: Optional[float] = None
+    ):
+        """
+        Args:
+            factory (Callable[[str], ChatService]): Loads the service for a session_id
+            max_bytes (int): Budget for the sessions kept loaded. The most
+                recently used session is kept even if it alone exceeds it.
+            max_age_s (float, optional): Reload sessions loaded longer ago than
+                this, so rebuilt sessions are picked up. None keeps them until evicted.
+        """
+        self.factory = factory
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self._entries: "OrderedDict[str, _PoolEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @contextmanager
+    def lease(self, session_id: str) -> Iterator[ChatService]:
+        """
+        Yields a ready ChatService for session_id, loading it on a miss.
+
+        Raises:
+            Whatever the factory raises for a session that cannot be loaded
+        """
+        entry = self._acquire(session_id)
+        try:
+            yield entry.service
+        finally:
+            self._release(entry)
+
+    def _acquire(self, session_id: str) -> _PoolEntry:
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None and self._is_expired(entry):
+                self._evict(session_id)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(session_id)
+                entry.leases += 1
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        # Load outside the lock so other sessions are served meanwhile
+        service = self.factory(session_id)
+        loaded = _PoolEntry(service, service.memory_usage_bytes)
+
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None and not self._is_expired(entry):
+                # Another request loaded the same session first; keep theirs
+                service.close()
+            else:
+                if entry is not None:
+                    self._evict(session_id)
+                entry = loaded
+                self._entries[session_id] = entry
+            self._entries.move_to_end(session_id)
+            entry.leases += 1
+            self._enforce_budget()
+            return entry
+
+    def _release(self, entry: _PoolEntry):
+        with self._lock:
+            entry.leases -= 1
+            if entry.evicted and entry.leases == 0:
+                entry.service.close()
+
+    def _is_expired(self, entry: _PoolEntry) -> bool:
+        return self.max_age_s is not None and time.monotonic() - entry.loaded_at > self.max_age_s
+
+    def _enforce_budget(self):
+        # Oldest first; the most recently used session always stays
+        while len(self._entries) > 1 and self.resident_bytes > self.max_bytes:
+            self._evict(next(iter(self._entries)))
+
+    def _evict(self, session_id: str):
+        entry = self._entries.pop(session_id)
+        entry.evicted = True
+        self.evictions += 1
+        if entry.leases == 0:
+            entry.service.close()
+
+    @property
+    def resident_bytes(self) -> int:
+        return sum(entry.size_bytes for entry in self._entries.values())
+
+    def clear(self):
+        """Evicts every session."""
+        with self._lock:
+            for session_id in list(self._entries):
+                self._evict(session_id)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "sessions": len(self._entries),
+                "resident_bytes": self.resident_bytes,
+            }
@@ -0,0 +1,164 @@
+import json
+import mmap
+import struct
+import uuid
+from array import array
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+from utils.error_handling import AppError
+
+# Layout of chunks.bin (all integers little-endian):
+#   header   MAGIC, uint32 version, uint32 reserved
+#   data     UTF-8 text of every chunk, concatenated in position order
+#   tables   uint64 offsets[count + 1] into data, int64 vector_ids[count],
+#            16-byte chunk UUIDs[count]
+#   trailer  uint64 count, uint64 tables offset, MAGIC, uint32 version
+MAGIC = b"WRCS"
+VERSION = 1
+_HEADER = struct.Struct("<4sII")
+_TRAILER = struct.Struct("<QQ4sI")
+
+
+class ChunkStoreWriter:
+    """
+    Streams chunks into a chunks.bin file.
+
+    Text is written straight to disk; only the fixed-size offset, id and
+    UUID tables are kept in memory until close.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._offsets = array("Q", [0])
+        self._vector_ids = array("q")
+        self._chunk_ids = bytearray()
+        self._file = None
+
+    def __enter__(self) -> "ChunkStoreWriter":
+        self._file = open(self.path, "wb")
+        self._file.write(_HEADER.pack(MAGIC, VERSION, 0))
+        return self
+
+    def append(self, text: str, vector_id: int, chunk_id: str):
+        data = text.encode("utf-8")
+        self._file.write(data)
+        self._offsets.append(self._offsets[-1] + len(data))
+        self._vector_ids.append(vector_id)
+        self._chunk_ids += uuid.UUID(chunk_id).bytes
+        self.count += 1
+
+    def close(self):
+        # Align the tables so they can be viewed as numpy arrays in place
+        self._file.write(b"\0" * (-self._file.tell() % 8))
+        tables_offset = self._file.tell()
+        self._file.write(self._offsets.tobytes())
+        self._file.write(self._vector_ids.tobytes())
+        self._file.write(bytes(self._chunk_ids))
+        self._file.write(_TRAILER.pack(self.count, tables_offset, MAGIC, VERSION))
+        self._file.close()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ChunkStore:
+    """
+    Read-only, memory-mapped view of a chunks.bin file.
+
+    Opening the store only reads the trailer; chunk text is decoded on
+    demand, so lookups are O(1) by position without parsing the file or
+    creating a Python object per chunk.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._offsets = self._vector_ids = self._sorted_ids = self._sorted_positions = None
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise AppError(f"Chunk store {path} is empty", code="INVALID_ARTIFACT")
+
+        valid = len(self._mm) >= _HEADER.size + _TRAILER.size
+        if valid:
+            magic, version, _ = _HEADER.unpack_from(self._mm, 0)
+            count, tables_offset, trailer_magic, _ = _TRAILER.unpack_from(
+                self._mm, len(self._mm) - _TRAILER.size
+            )
+            valid = magic == MAGIC and trailer_magic == MAGIC and version == VERSION
+        if not valid:
+            self.close()
+            raise AppError(
+                f"{path} is not a version {VERSION} chunk store", code="INVALID_ARTIFACT"
+            )
+
+        self._count = count
+        self._offsets = np.frombuffer(
+            self._mm, dtype="<u8", count=count + 1, offset=tables_offset
+        )
+        ids_offset = tables_offset + 8 * (count + 1)
+        self._vector_ids = np.frombuffer(self._mm, dtype="<i8", count=count, offset=ids_offset)
+        self._uuids_offset = ids_offset + 8 * count
+
+        # New builds use vector_id == position; rebuilt sessions need a lookup table
+        if np.array_equal(self._vector_ids, np.arange(count)):
+            self._sorted_ids = None
+            self._sorted_positions = None
+        else:
+            self._sorted_positions = np.argsort(self._vector_ids, kind="stable")
+            self._sorted_ids = self._vector_ids[self._sorted_positions]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def text(self, position: int) -> str:
+        start = _HEADER.size + int(self._offsets[position])
+        end = _HEADER.size + int(self._offsets[position + 1])
+        return self._mm[start:end].decode("utf-8")
+
+    def vector_id(self, position: int) -> int:
+        return int(self._vector_ids[position])
+
+    def chunk_id(self, position: int) -> uuid.UUID:
+        start = self._uuids_offset + 16 * position
+        return uuid.UUID(bytes=self._mm[start:start + 16])
+
+    def position_of(self, vector_id: int) -> Optional[int]:
+        """Position of the chunk stored under vector_id, or None."""
+        if self._sorted_ids is None:
+            return vector_id if 0 <= vector_id < self._count else None
+        i = int(np.searchsorted(self._sorted_ids, vector_id))
+        if i < self._count and self._sorted_ids[i] == vector_id:
+            return int(self._sorted_positions[i])
+        return None
+
+    def get(self, vector_id: int) -> Optional[str]:
+        """Text of the chunk stored under vector_id, or None."""
+        position = self.position_of(vector_id)
+        return self.text(position) if position is not None else None
+
+    def iter_records(self) -> Iterator[Tuple[int, str, str]]:
+        """Yields (vector_id, chunk_id, text) in position order."""
+        for position in range(self._count):
+            yield self.vector_id(position), str(self.chunk_id(position)), self.text(position)
+
+    def close(self):
+        # numpy views keep the mmap exported; drop them before closing it
+        self._offsets = self._vector_ids = self._sorted_ids = self._sorted_positions = None
+        self._mm.close()
+        self._file.close()
+
+
+def convert_json_chunks(json_path: str, bin_path: str):
+    """Converts a legacy chunks.json file into a chunks.bin file."""
+    with open(json_path) as f:
+        chunks_data = json.load(f)
+    with ChunkStoreWriter(bin_path) as writer:
+        for item in chunks_data:
+            writer.append(
+                item["content"], item.get("vector_id", item["position"]), item["chunk_id"]
+            )
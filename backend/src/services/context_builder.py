@@ -0,0 +1,142 @@
+import math
+from typing import List, NamedTuple, Optional
+
+from ..services.chunk_store import ChunkStore
+
+# Rough size of English text in Llama-family tokens; errs on the large side
+CHARS_PER_TOKEN = 4
+# Prompt template and chat markup around the context
+PROMPT_OVERHEAD_TOKENS = 128
+# Longest query accepted (Query.query_text is at most 1000 characters)
+MAX_QUERY_TOKENS = 250
+# Room left for the generated answer
+RESPONSE_TOKENS = 512
+# Shorter matches between chunk boundaries are treated as coincidence
+MIN_OVERLAP_CHARS = 8
+
+NO_CONTEXT_TEXT = "No relevant context found in this document."
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def num_ctx_for(context_tokens: int, response_tokens: int = RESPONSE_TOKENS) -> int:
+    """
+    Ollama context window that fits the prompt template, a maximal query,
+    context_tokens of context and the answer, rounded up to 256 tokens.
+
+    Ollama reloads the model whenever num_ctx changes, so this is derived
+    once from the configured budget rather than per prompt.
+    """
+    needed = PROMPT_OVERHEAD_TOKENS + MAX_QUERY_TOKENS + context_tokens + response_tokens
+    return math.ceil(needed / 256) * 256
+
+
+def strip_overlap(previous: str, text: str, max_overlap_chars: int) -> str:
+    """
+    Drops the start of text that repeats the end of previous, i.e. the
+    overlap the splitter puts between neighbouring chunks.
+    """
+    longest = min(len(previous), len(text), max_overlap_chars)
+    for size in range(longest, MIN_OVERLAP_CHARS - 1, -1):
+        if previous.endswith(text[:size]):
+            return text[size:].lstrip()
+    return text
+
+
+class BuiltContext(NamedTuple):
+    text: str
+    # Positions of the chunks used, in the order they appear in text
+    positions: List[int]
+    tokens: int
+    # True if a chunk was dropped or cut to stay within the budget
+    truncated: bool
+
+
+class ContextBuilder:
+    """
+    Assembles the LLM context from retrieved chunks.
+
+    Chunks at adjacent positions are merged into one passage in document
+    order with the splitter's overlap removed, passages are ordered by
+    their best retrieval rank, and chunks are packed in rank order until
+    the token budget is reached.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 1024,
+        max_overlap_chars: int = 200,
+        separator: str = "\n\n"
+    ):
+        self.max_tokens = max_tokens
+        self.max_overlap_chars = max_overlap_chars
+        self.separator = separator
+
+    @property
+    def num_ctx(self) -> int:
+        return num_ctx_for(self.max_tokens)
+
+    def build(self, chunk_store: Optional[ChunkStore], vector_ids: List[int]) -> BuiltContext:
+        """
+        Args:
+            chunk_store (ChunkStore): The session's chunks, or None if it has none
+            vector_ids (List[int]): Search results, best first; -1 marks padding
+
+        Returns:
+            BuiltContext: The packed context
+        """
+        texts = {}
+        ranked = []
+        for vector_id in vector_ids:
+            # FAISS returns -1 for not found/padding; other values are vector ids
+            if vector_id == -1 or chunk_store is None:
+                continue
+            position = chunk_store.position_of(vector_id)
+            if position is None or position in texts:
+                continue
+            texts[position] = chunk_store.text(position)
+            ranked.append(position)
+
+        selected: List[int] = []
+        text = ""
+        truncated = False
+        for position in ranked:
+            candidate = self._render(selected + [position], ranked, texts)
+            if estimate_tokens(candidate) <= self.max_tokens:
+                selected.append(position)
+                text = candidate
+            elif not selected:
+                # Even the best chunk alone is over budget: keep its start
+                selected.append(position)
+                text = candidate[:self.max_tokens * CHARS_PER_TOKEN]
+                truncated = True
+            else:
+                truncated = True
+
+        if not text:
+            return BuiltContext(NO_CONTEXT_TEXT, [], estimate_tokens(NO_CONTEXT_TEXT), False)
+        order = [p for run in self._runs(selected, ranked) for p in run]
+        return BuiltContext(text, order, estimate_tokens(text), truncated)
+
+    def _runs(self, positions: List[int], ranked: List[int]) -> List[List[int]]:
+        """Groups positions into runs of consecutive positions, best-ranked run first."""
+        runs: List[List[int]] = []
+        for position in sorted(positions):
+            if runs and position == runs[-1][-1] + 1:
+                runs[-1].append(position)
+            else:
+                runs.append([position])
+        return sorted(runs, key=lambda run: min(ranked.index(p) for p in run))
+
+    def _render(self, positions: List[int], ranked: List[int], texts) -> str:
+        passages = []
+        for run in self._runs(positions, ranked):
+            passage = texts[run[0]]
+            for previous, position in zip(run, run[1:]):
+                rest = strip_overlap(texts[previous], texts[position], self.max_overlap_chars)
+                if rest:
+                    passage += " " + rest
+            passages.append(passage)
+        return self.separator.join(passages)
@@ -1,12 +1,45 @@
-from typing import List
-from sentence_transformers import SentenceTransformer
+from typing import Any, List, Optional
+
+import numpy as np
+
+from services import model_registry
+from services.embedding_cache import EmbeddingCache
 
 class EmbeddingService:
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        model: Optional[Any] = None,
+        cache: Optional[EmbeddingCache] = None
+    ):
         self.model_name = model_name
-        # Initialize model - this will download it if not present
-        # In Lambda, we might want to load from a specific path or layer
-        self.model = SentenceTransformer(model_name)
+        # Unless a model is passed in, the process-wide one from the model
+        # registry is used; it is loaded on first use, not here
+        self._model = model
+        # Opt-in: texts found in the cache are not encoded again
+        self.cache = cache
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = model_registry.get_model(self.model_name)
+        return self._model
+
+    def preload(self):
+        """Loads the model now rather than on the first encode."""
+        self.model
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Encodes texts with the model.
+        
+        Args:
+            texts (List[str]): List of text chunks
+            
+        Returns:
+            np.ndarray: Matrix of shape (len(texts), dimension)
+        """
+        return self.model.encode(texts)
 
     def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
         """
@@ -21,7 +54,17 @@ class EmbeddingService:
         if not texts:
             return []
             
-        embeddings = self.model.encode(texts)
+        if self.cache is None:
+            embeddings = self.encode(texts)
+        else:
+            embeddings = self.cache.get_many(self.model_name, texts)
+            missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+            if missing:
+                missing_texts = [texts[i] for i in missing]
+                encoded = self.encode(missing_texts)
+                self.cache.put_many(self.model_name, missing_texts, encoded)
+                for i, embedding in zip(missing, encoded):
+                    embeddings[i] = embedding
         # Convert numpy arrays to lists for JSON serialization
         return [embedding.tolist() for embedding in embeddings]
 
@@ -0,0 +1,313 @@
+import json
+import random
+import threading
+import time
+from collections import deque
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..models.chat_message import ChatMessage
+from ..models.query import Query
+from ..utils.metrics import put_metric
+
+# DynamoDB accepts at most 25 put requests per BatchWriteItem call
+MAX_BATCH_ITEMS = 25
+# Records expire this long after they are written (30 days), through the
+# tables' TTL attribute
+RETENTION_S = 30 * 24 * 3600
+
+# A buffered record: its table and its item as plain Python values
+Entry = Tuple[str, Dict[str, Any]]
+
+
+def to_item(record: Any, retention_s: float = RETENTION_S) -> Dict[str, Any]:
+    """A Query or ChatMessage as DynamoDB item values, with its ttl attribute."""
+    # DynamoDB numbers must be Decimals, not floats
+    item = json.loads(record.json(), parse_float=Decimal)
+    item["ttl"] = int(time.time() + retention_s)
+    return item
+
+
+class HistoryWriter:
+    """
+    Write-behind persistence of Query and ChatMessage records, so saving
+    chat history never adds a DynamoDB round trip to a query.
+
+    add_query and add_message only append to an in-memory buffer. A
+    background thread writes it with BatchWriteItem calls once it holds
+    max_batch records or its oldest record has waited flush_interval_s.
+    Lambda freezes the process between invocations, which stops that
+    thread, so a handler calls flush() before returning. That flush is on
+    the response path, so a handler makes it best-effort: one attempt per
+    batch (max_retries=0) and, with wait=False, none at all while the
+    thread is already writing, as that write drains the buffer anyway.
+
+    Items a batch leaves unprocessed (throttling) and failed calls are
+    retried with exponential backoff and jitter, up to max_retries times;
+    what is still unwritten goes back to the buffer for the next flush.
+    Each DynamoDB call is made once, within timeout_s; botocore's own
+    retries are turned off so they do not stack on these.
+    Beyond max_buffer records the oldest are dropped. Errors are counted
+    and logged, never raised: history is not worth failing a query over.
+    """
+
+    def __init__(
+        self,
+        query_table: Optional[str] = None,
+        chat_table: Optional[str] = None,
+        client=None,
+        max_batch: int = MAX_BATCH_ITEMS,
+        flush_interval_s: float = 1.0,
+        max_buffer: int = 1000,
+        max_retries: int = 5,
+        retry_base_s: float = 0.05,
+        timeout_s: float = 1.0,
+        retention_s: float = RETENTION_S,
+        emit_metrics: bool = True
+    ):
+        """
+        Args:
+            query_table (str, optional): Table for Query records; None skips them
+            chat_table (str, optional): Table for ChatMessage records; None skips them
+            client (optional): boto3 DynamoDB client; created on first write if None
+            max_batch (int): Records per BatchWriteItem call, at most 25
+            flush_interval_s (float): Longest a record waits in the buffer
+                while the process is running
+            max_buffer (int): Records kept while DynamoDB is unavailable
+            max_retries (int): Retries of unprocessed items per batch
+            retry_base_s (float): First retry delay; doubles on every retry
+            timeout_s (float): Connect and read timeout of each DynamoDB call,
+                for a client created here
+            retention_s (float): Lifetime of the written items (ttl attribute)
+            emit_metrics (bool): Emit a metric when records are dropped
+        """
+        if not 1 <= max_batch <= MAX_BATCH_ITEMS:
+            raise ValueError(f"max_batch must be between 1 and {MAX_BATCH_ITEMS}")
+        self.query_table = query_table
+        self.chat_table = chat_table
+        self._client = client
+        self.max_batch = max_batch
+        self.flush_interval_s = flush_interval_s
+        self.max_buffer = max_buffer
+        self.max_retries = max_retries
+        self.retry_base_s = retry_base_s
+        self.timeout_s = timeout_s
+        self.retention_s = retention_s
+        self.emit_metrics = emit_metrics
+
+        self._condition = threading.Condition()
+        # (queued_at, entry), oldest first
+        self._buffer: deque = deque()
+        # Held for the whole of a flush, so flush() returns only after a
+        # write the background thread had in progress is done too
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.written = 0
+        self.retried = 0
+        self.dropped = 0
+        self.errors = 0
+        self.batches = 0
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3
+            from botocore.config import Config
+            self._client = boto3.client("dynamodb", config=Config(
+                connect_timeout=self.timeout_s,
+                read_timeout=self.timeout_s,
+                retries={"total_max_attempts": 1}
+            ))
+        return self._client
+
+    def add_query(self, query: Query):
+        if self.query_table is not None:
+            self._add(self.query_table, query)
+
+    def add_message(self, message: ChatMessage):
+        if self.chat_table is not None:
+            self._add(self.chat_table, message)
+
+    def _add(self, table: str, record: Any):
+        entry = (table, to_item(record, self.retention_s))
+        with self._condition:
+            self._buffer.append((time.monotonic(), entry))
+            dropped = self._trim()
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(
+                    target=self._run, name="history-writer", daemon=True
+                )
+                self._thread.start()
+            if len(self._buffer) >= self.max_batch:
+                self._condition.notify()
+        self._record_dropped(dropped)
+
+    def _trim(self) -> int:
+        """Drops the oldest records beyond max_buffer; call with the condition held."""
+        dropped = 0
+        while len(self._buffer) > self.max_buffer:
+            self._buffer.popleft()
+            dropped += 1
+        self.dropped += dropped
+        return dropped
+
+    def _record_dropped(self, dropped: int):
+        if dropped:
+            print(f"History buffer full, dropped {dropped} records")
+            if self.emit_metrics:
+                put_metric("HistoryRecordsDropped", dropped, unit="Count")
+
+    def _run(self):
+        """Background thread: flushes on the size and age thresholds."""
+        retry_at = 0.0
+        while True:
+            with self._condition:
+                while not self._closed:
+                    now = time.monotonic()
+                    if now < retry_at:
+                        self._condition.wait(retry_at - now)
+                    elif len(self._buffer) >= self.max_batch:
+                        break
+                    elif self._buffer:
+                        age = now - self._buffer[0][0]
+                        if age >= self.flush_interval_s:
+                            break
+                        self._condition.wait(self.flush_interval_s - age)
+                    else:
+                        self._condition.wait()
+                if self._closed:
+                    return
+            # After a flush that wrote nothing, give DynamoDB a pause
+            if not self.flush():
+                retry_at = time.monotonic() + self.flush_interval_s
+
+    def flush(self, max_retries: Optional[int] = None, wait: bool = True) -> int:
+        """
+        Writes every buffered record now.
+
+        Args:
+            max_retries (int, optional): Retries per batch; None for the
+                writer's max_retries
+            wait (bool): Wait for a flush already in progress, then write
+                what is left; if False, leave the buffer to that flush
+
+        Returns:
+            int: Records written by this call
+        """
+        if not self._flush_lock.acquire(blocking=wait):
+            return 0
+        try:
+            written = 0
+            unwritten: List[Tuple[float, Entry]] = []
+            while True:
+                batch = self._take_batch()
+                if not batch:
+                    break
+                failed = self._write(
+                    [entry for _, entry in batch],
+                    self.max_retries if max_retries is None else max_retries
+                )
+                written += len(batch) - len(failed)
+                failed_ids = {id(entry) for entry in failed}
+                unwritten.extend(queued for queued in batch if id(queued[1]) in failed_ids)
+            if unwritten:
+                # Back to the front, in order, for the next flush
+                with self._condition:
+                    self._buffer.extendleft(reversed(unwritten))
+                    dropped = self._trim()
+                self._record_dropped(dropped)
+            return written
+        finally:
+            self._flush_lock.release()
+
+    def _take_batch(self) -> List[Tuple[float, Entry]]:
+        """
+        Takes up to max_batch records off the buffer. A batch may not put
+        the same key twice, so a record whose key is already in the batch
+        waits for the next one.
+        """
+        batch, keys, skipped = [], set(), []
+        with self._condition:
+            while self._buffer and len(batch) < self.max_batch:
+                queued = self._buffer.popleft()
+                table, item = queued[1]
+                key = (table, item["session_id"], item["created_at"])
+                if key in keys:
+                    skipped.append(queued)
+                    continue
+                keys.add(key)
+                batch.append(queued)
+            self._buffer.extendleft(reversed(skipped))
+        return batch
+
+    def _write(self, entries: List[Entry], max_retries: int) -> List[Entry]:
+        """
+        Writes entries with BatchWriteItem, retrying what is left unprocessed.
+
+        Returns:
+            List[Entry]: Entries still unwritten after max_retries retries
+        """
+        from boto3.dynamodb.types import TypeSerializer
+        serializer = TypeSerializer()
+        # Unprocessed items come back serialized; map them to their entries
+        pending: Dict[Tuple[str, str, str], Entry] = {}
+        request_items: Dict[str, List[Dict[str, Any]]] = {}
+        for entry in entries:
+            table, item = entry
+            pending[(table, item["session_id"], item["created_at"])] = entry
+            request_items.setdefault(table, []).append({
+                "PutRequest": {
+                    "Item": {name: serializer.serialize(value) for name, value in item.items()}
+                }
+            })
+
+        for attempt in range(max_retries + 1):
+            if attempt:
+                self.retried += sum(len(requests) for requests in request_items.values())
+                # Full jitter, so containers throttled together do not retry together
+                time.sleep(random.uniform(0, self.retry_base_s * 2 ** (attempt - 1)))
+            try:
+                response = self.client.batch_write_item(RequestItems=request_items)
+            except Exception as e:
+                print(f"Error writing chat history: {e}")
+                self.errors += 1
+                continue
+            self.batches += 1
+            unprocessed = response.get("UnprocessedItems") or {}
+            for table, requests in request_items.items():
+                left = {
+                    (request["PutRequest"]["Item"]["session_id"]["S"],
+                     request["PutRequest"]["Item"]["created_at"]["S"])
+                    for request in unprocessed.get(table, [])
+                }
+                for request in requests:
+                    item = request["PutRequest"]["Item"]
+                    key = (item["session_id"]["S"], item["created_at"]["S"])
+                    if key not in left:
+                        self.written += 1
+                        pending.pop((table,) + key, None)
+            request_items = unprocessed
+            if not request_items:
+                break
+        return list(pending.values())
+
+    def close(self):
+        """Writes what is buffered and stops the background thread."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        with self._condition:
+            return {
+                "buffered": len(self._buffer),
+                "written": self.written,
+                "batches": self.batches,
+                "retried": self.retried,
+                "dropped": self.dropped,
+                "errors": self.errors,
+            }
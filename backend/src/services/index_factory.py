@@ -0,0 +1,110 @@
+import math
+from typing import Any, Dict, NamedTuple, Optional
+
+import faiss
+import numpy as np
+
+# Index types a session can be exported as. Every type is wrapped in an
+# IndexIDMap2 so search results are chunk vector ids regardless of type.
+#   flat     exact float32 search
+#   sqfp16   brute-force scan over float16 vectors (half the size)
+#   sq8      brute-force scan over int8-quantized vectors (a quarter of the size)
+#   hnsw     graph search over float32 vectors; fastest queries, larger file
+#   ivf      inverted lists over float32 vectors, nprobe lists scanned per query
+#   ivf_sq8  inverted lists over int8-quantized vectors
+#   ivfpq    inverted lists over product-quantized codes; smallest by far
+INDEX_TYPES = ("flat", "sqfp16", "sq8", "hnsw", "ivf", "ivf_sq8", "ivfpq")
+
+# Automatic choice by chunk count: below this bound exact search is both
+# small and fast enough. Above it IVF-SQ8 keeps recall@3 near 0.98 at a
+# quarter of the size (scripts/benchmarks/bench_index_types.py); IVF-PQ is
+# smaller still but drops to ~0.6 and trains slowly, so it is opt-in only.
+FLAT_MAX_CHUNKS = 20000
+
+HNSW_M = 32
+HNSW_EF_SEARCH = 64
+IVF_NPROBE = 16
+# faiss k-means wants at least this many training points per centroid
+_MIN_POINTS_PER_CENTROID = 39
+
+
+class IndexSpec(NamedTuple):
+    index_type: str
+    factory: str
+    params: Dict[str, Any]
+
+
+def choose_index_type(count: int) -> str:
+    """Default index type for a session with count chunks."""
+    return "flat" if count < FLAT_MAX_CHUNKS else "ivf_sq8"
+
+
+def resolve_index_spec(index_type: Optional[str], count: int, dimension: int) -> IndexSpec:
+    """
+    Resolves the index type and parameters for count vectors.
+
+    Args:
+        index_type (str, optional): One of INDEX_TYPES; chosen from count if None
+        count (int): Number of vectors the index will hold
+        dimension (int): Vector dimension
+
+    Returns:
+        IndexSpec: The effective type, faiss factory string and parameters.
+            Types that need more training vectors than count fall back to flat.
+
+    Raises:
+        ValueError: If index_type is not one of INDEX_TYPES
+    """
+    if index_type is None:
+        index_type = choose_index_type(count)
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}; expected one of {INDEX_TYPES}")
+
+    if index_type == "hnsw":
+        return IndexSpec(
+            "hnsw", f"HNSW{HNSW_M}", {"M": HNSW_M, "efSearch": HNSW_EF_SEARCH}
+        )
+    if index_type.startswith("ivf"):
+        nlist = min(int(4 * math.sqrt(count)), count // _MIN_POINTS_PER_CENTROID)
+        # ~8 dimensions per sub-quantizer; m must divide the dimension
+        pq_m = next(m for m in range(max(1, dimension // 8), 0, -1) if dimension % m == 0)
+        if nlist < 1 or (index_type == "ivfpq" and count < 256 * _MIN_POINTS_PER_CENTROID):
+            return IndexSpec("flat", "Flat", {})
+        params: Dict[str, Any] = {"nlist": nlist, "nprobe": min(nlist, IVF_NPROBE)}
+        if index_type == "ivf":
+            return IndexSpec("ivf", f"IVF{nlist},Flat", params)
+        if index_type == "ivf_sq8":
+            return IndexSpec("ivf_sq8", f"IVF{nlist},SQ8", params)
+        params.update({"pq_m": pq_m, "pq_nbits": 8})
+        return IndexSpec("ivfpq", f"IVF{nlist},PQ{pq_m}x8", params)
+    factory = {"flat": "Flat", "sqfp16": "SQfp16", "sq8": "SQ8"}[index_type]
+    return IndexSpec(index_type, factory, {})
+
+
+def build_index(spec: IndexSpec, vectors: np.ndarray, ids: np.ndarray) -> faiss.Index:
+    """
+    Trains (if needed) and fills an index of the given spec.
+
+    Args:
+        spec (IndexSpec): Resolved index spec
+        vectors (np.ndarray): float32 vectors, shape (n, dimension)
+        ids (np.ndarray): int64 id per vector
+
+    Returns:
+        faiss.Index: IndexIDMap2 around the index; search parameters are
+            stored in the index, so they survive write_index/read_index
+    """
+    inner = faiss.index_factory(vectors.shape[1], spec.factory)
+    if "efSearch" in spec.params:
+        faiss.downcast_index(inner).hnsw.efSearch = spec.params["efSearch"]
+    if "nprobe" in spec.params:
+        faiss.extract_index_ivf(inner).nprobe = spec.params["nprobe"]
+    if isinstance(inner, faiss.IndexIVFPQ):
+        # Polysemous codes are only used for Hamming pre-filtering, which we
+        # don't enable, and dominate training time
+        inner.do_polysemous_training = False
+    index = faiss.IndexIDMap2(inner)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add_with_ids(vectors, ids)
+    return index
@@ -0,0 +1,198 @@
+import math
+import mmap
+import re
+import struct
+from collections import Counter
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from utils.error_handling import AppError
+
+# Layout of lexical.bin (all integers little-endian):
+#   header   MAGIC, uint32 version, uint32 reserved
+#   terms    UTF-8 text of every distinct term, concatenated in sorted order
+#   tables   uint64 term_offsets[terms + 1] into terms,
+#            uint64 posting_offsets[terms + 1] into the posting arrays,
+#            uint32 doc_lengths[docs], uint32 posting_docs[postings],
+#            uint16 posting_tfs[postings]
+#   trailer  uint64 docs, uint64 terms, uint64 postings, uint64 tables offset,
+#            float64 average doc length, MAGIC, uint32 version
+# Documents are chunk positions in the session's chunk store.
+MAGIC = b"WRLX"
+VERSION = 1
+_HEADER = struct.Struct("<4sII")
+_TRAILER = struct.Struct("<QQQQd4sI")
+
+# Okapi BM25 parameters
+K1 = 1.2
+B = 0.75
+
+_TOKEN = re.compile(r"\w+")
+STOPWORDS = frozenset(
+    "a an and are as at be been but by did do does for from had has have how i "
+    "if in into is it its of on or that the their then there these they this "
+    "to was were what when where which who whom why will with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Case-folded word tokens without stopwords; numbers such as years are kept."""
+    return [token for token in _TOKEN.findall(text.casefold()) if token not in STOPWORDS]
+
+
+class LexicalIndexWriter:
+    """
+    Builds a BM25 inverted index over chunks added in position order and
+    writes it to a lexical.bin file on close.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._doc_lengths: List[int] = []
+
+    def __enter__(self) -> "LexicalIndexWriter":
+        return self
+
+    def add(self, text: str):
+        tokens = tokenize(text)
+        doc = len(self._doc_lengths)
+        self._doc_lengths.append(len(tokens))
+        for term, tf in Counter(tokens).items():
+            self._postings.setdefault(term, []).append((doc, min(tf, 0xFFFF)))
+
+    def close(self):
+        terms = sorted(self._postings)
+        encoded = [term.encode("utf-8") for term in terms]
+        term_offsets = np.zeros(len(terms) + 1, dtype="<u8")
+        np.cumsum([len(e) for e in encoded], out=term_offsets[1:])
+        posting_offsets = np.zeros(len(terms) + 1, dtype="<u8")
+        np.cumsum([len(self._postings[t]) for t in terms], out=posting_offsets[1:])
+        postings = [p for term in terms for p in self._postings[term]]
+        posting_docs = np.array([doc for doc, _ in postings], dtype="<u4")
+        posting_tfs = np.array([tf for _, tf in postings], dtype="<u2")
+        doc_lengths = np.array(self._doc_lengths, dtype="<u4")
+        avg_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+
+        with open(self.path, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, 0))
+            f.write(b"".join(encoded))
+            # Align the tables so they can be viewed as numpy arrays in place
+            f.write(b"\0" * (-f.tell() % 8))
+            tables_offset = f.tell()
+            for table in (term_offsets, posting_offsets, doc_lengths, posting_docs, posting_tfs):
+                f.write(table.tobytes())
+            f.write(_TRAILER.pack(
+                len(doc_lengths), len(terms), len(postings), tables_offset, avg_length,
+                MAGIC, VERSION
+            ))
+        self._postings = {}
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+
+class LexicalIndex:
+    """
+    Read-only, memory-mapped BM25 index over a session's chunks.
+
+    Posting lists are numpy views into the file; only the term -> id
+    dictionary is built in memory when the index is opened.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise AppError(f"Lexical index {path} is empty", code="INVALID_ARTIFACT")
+
+        valid = len(self._mm) >= _HEADER.size + _TRAILER.size
+        if valid:
+            magic, version, _ = _HEADER.unpack_from(self._mm, 0)
+            docs, terms, postings, tables_offset, avg_length, trailer_magic, _ = \
+                _TRAILER.unpack_from(self._mm, len(self._mm) - _TRAILER.size)
+            valid = magic == MAGIC and trailer_magic == MAGIC and version == VERSION
+        if not valid:
+            self.close()
+            raise AppError(
+                f"{path} is not a version {VERSION} lexical index", code="INVALID_ARTIFACT"
+            )
+
+        self.doc_count = docs
+        self.avg_length = avg_length or 1.0
+        offset = tables_offset
+        term_offsets = np.frombuffer(self._mm, dtype="<u8", count=terms + 1, offset=offset)
+        offset += 8 * (terms + 1)
+        self._posting_offsets = np.frombuffer(
+            self._mm, dtype="<u8", count=terms + 1, offset=offset
+        )
+        offset += 8 * (terms + 1)
+        self._doc_lengths = np.frombuffer(self._mm, dtype="<u4", count=docs, offset=offset)
+        offset += 4 * docs
+        self._posting_docs = np.frombuffer(self._mm, dtype="<u4", count=postings, offset=offset)
+        offset += 4 * postings
+        self._posting_tfs = np.frombuffer(self._mm, dtype="<u2", count=postings, offset=offset)
+
+        blob = self._mm[_HEADER.size:_HEADER.size + int(term_offsets[-1])]
+        bounds = term_offsets.tolist()
+        self._terms = {
+            blob[bounds[i]:bounds[i + 1]].decode("utf-8"): i for i in range(terms)
+        }
+        # Per-document length normalization, shared by every query term
+        self._norms = (K1 * (1 - B + B * self._doc_lengths / self.avg_length)).astype("float32")
+
+    def __len__(self) -> int:
+        return self.doc_count
+
+    def search(self, query: str, top_k: int = 5) -> Tuple[List[float], List[int]]:
+        """
+        Ranks chunks by BM25 score for the query.
+
+        Returns:
+            Tuple[List[float], List[int]]: (Scores, positions), best first;
+                chunks sharing no term with the query are not returned
+        """
+        scores = np.zeros(self.doc_count, dtype="float32")
+        for term in set(tokenize(query)):
+            term_id = self._terms.get(term)
+            if term_id is None:
+                continue
+            start = int(self._posting_offsets[term_id])
+            end = int(self._posting_offsets[term_id + 1])
+            docs = self._posting_docs[start:end]
+            tfs = self._posting_tfs[start:end].astype("float32")
+            df = end - start
+            idf = math.log(1 + (self.doc_count - df + 0.5) / (df + 0.5))
+            # Each doc occurs once per posting list, so fancy-index += is exact
+            scores[docs] += idf * tfs * (K1 + 1) / (tfs + self._norms[docs])
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > top_k:
+            matched = matched[np.argpartition(-scores[matched], top_k - 1)[:top_k]]
+        matched = matched[np.argsort(-scores[matched], kind="stable")]
+        return scores[matched].tolist(), matched.tolist()
+
+    def close(self):
+        # numpy views keep the mmap exported; drop them before closing it
+        self._posting_offsets = self._doc_lengths = None
+        self._posting_docs = self._posting_tfs = self._norms = None
+        self._mm.close()
+        self._file.close()
+
+
+def reciprocal_rank_fusion(rankings: List[List[int]], top_k: int, k: int = 60) -> List[int]:
+    """
+    Merges ranked id lists by Reciprocal Rank Fusion: each id scores
+    sum(1 / (k + rank)) over the lists it appears in. Rank-based, so BM25
+    scores and L2 distances need no calibration against each other.
+    """
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            fused[item] = fused.get(item, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused, key=lambda item: -fused[item])[:top_k]
@@ -0,0 +1,159 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Generator, Iterator, Optional
+
+from ..services.llm_service import LLMService, collect_stream
+from ..utils.error_handling import AppError
+from ..utils.metrics import put_metric
+
+SATURATED_CODE = "LLM_SATURATED"
+
+
+class LLMDispatcher:
+    """
+    Admission control in front of an LLMService.
+
+    At most max_concurrency generations run at once; further requests
+    wait in FIFO order in a queue of at most max_queue entries, each for
+    at most queue_timeout_s. A request that finds the queue full, or
+    whose wait runs out, fails fast with AppError code LLM_SATURATED, so
+    the caller can answer 429 instead of piling more load on Ollama.
+
+    Exposes the LLMService interface, so ChatService can use it in place
+    of the service it wraps. Limits apply per process: it bounds the
+    concurrent generations of one streaming app or one batch request;
+    across Lambda execution environments only the chat function's
+    optional reserved concurrency (chat_max_concurrency in
+    infrastructure/stacks/lambda_stack.py) limits them.
+    """
+
+    def __init__(
+        self,
+        llm_service: LLMService,
+        max_concurrency: int = 2,
+        max_queue: int = 16,
+        queue_timeout_s: float = 10.0,
+        emit_metrics: bool = True
+    ):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.llm_service = llm_service
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout_s = queue_timeout_s
+        self.emit_metrics = emit_metrics
+
+        self._condition = threading.Condition()
+        self._waiting: deque = deque()
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.max_wait_ms = 0.0
+
+    @property
+    def model(self) -> str:
+        return self.llm_service.model
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiting)
+
+    @contextmanager
+    def slot(self, timeout_s: Optional[float] = None) -> Iterator[float]:
+        """
+        Holds one generation slot for the duration of the block and yields
+        the time spent waiting for it (ms).
+
+        Args:
+            timeout_s (float, optional): Longest wait. Defaults to queue_timeout_s
+
+        Raises:
+            AppError: LLM_SATURATED if the queue is full or the wait times out
+        """
+        wait_ms = self._acquire(self.queue_timeout_s if timeout_s is None else timeout_s)
+        try:
+            yield wait_ms
+        finally:
+            self._release()
+
+    def _acquire(self, timeout_s: float) -> float:
+        start = time.monotonic()
+        with self._condition:
+            depth = len(self._waiting)
+            if self.in_flight < self.max_concurrency and not self._waiting:
+                error = None
+            elif depth >= self.max_queue:
+                self.rejected += 1
+                error = f"LLM is saturated: {depth} requests already waiting"
+            elif self._wait_in_queue(start + timeout_s):
+                error = None
+            else:
+                self.timed_out += 1
+                error = f"LLM is saturated: no capacity within {timeout_s:.1f}s"
+
+            wait_ms = (time.monotonic() - start) * 1000
+            if error is None:
+                self.in_flight += 1
+                self.admitted += 1
+                self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+        self._record("LLMQueueDepth", depth, "Count")
+        if error is not None:
+            self._record("LLMRejected", 1, "Count")
+            raise AppError(error, code=SATURATED_CODE)
+        self._record("LLMQueueWait", wait_ms)
+        return wait_ms
+
+    def _wait_in_queue(self, deadline: float) -> bool:
+        """Waits, with the condition held, until this request heads the queue and a slot is free."""
+        ticket = object()
+        self._waiting.append(ticket)
+        try:
+            while self._waiting[0] is not ticket or self.in_flight >= self.max_concurrency:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            return True
+        finally:
+            self._waiting.remove(ticket)
+            # The next waiter may now be at the head
+            self._condition.notify_all()
+
+    def _release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def _record(self, name: str, value: float, unit: str = "Milliseconds"):
+        if self.emit_metrics:
+            put_metric(name, value, unit=unit)
+
+    def stream_response(self, query: str, context: str) -> Generator[str, None, bool]:
+        """
+        LLMService.stream_response behind admission control. The slot is
+        taken on the first next() and held until the stream is exhausted
+        or closed. Returns whether the stream completed.
+        """
+        with self.slot():
+            return (yield from self.llm_service.stream_response(query, context))
+
+    def generate_response(self, query: str, context: str) -> Optional[str]:
+        return collect_stream(self.stream_response(query, context))[0]
+
+    def check_health(self) -> bool:
+        return self.llm_service.check_health()
+
+    def stats(self) -> Dict[str, float]:
+        with self._condition:
+            return {
+                "in_flight": self.in_flight,
+                "queued": len(self._waiting),
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "max_wait_ms": round(self.max_wait_ms, 1),
+            }
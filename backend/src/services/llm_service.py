@@ -1,14 +1,77 @@
 import json
 import logging
+import time
 import requests
-from typing import Generator, Optional, Dict, List
+from requests.adapters import HTTPAdapter
+from typing import Generator, Optional, Dict, List, Tuple
+from urllib3.util.retry import Retry
 from ..models.query import Query
 
+# First chunk streamed when generation fails; callers use it to avoid
+# treating the error as an answer
+LLM_ERROR_PREFIX = "Error: Could not generate response from LLM."
+# What the model is told to answer when the context does not contain the
+# answer; also returned directly when retrieval finds no relevant chunk
+CANNOT_ANSWER_TEXT = "I cannot answer this based on the provided context."
+
+
+def collect_stream(stream: Generator[str, None, bool]) -> Tuple[str, bool]:
+    """
+    Reads a stream_response generator to the end.
+
+    Returns:
+        Tuple[str, bool]: The answer text, and whether the stream completed
+    """
+    chunks = []
+    while True:
+        try:
+            chunks.append(next(stream))
+        except StopIteration as stop:
+            return "".join(chunks), bool(stop.value)
+
 class LLMService:
-    def __init__(self, ollama_base_url: str = "http://localhost:11434", model: str = "llama3.2:3b-instruct"):
-        self.base_url = ollama_base_url
+    def __init__(
+        self,
+        ollama_base_url: str = "http://localhost:11434",
+        model: str = "llama3.2:3b-instruct",
+        connect_timeout_s: float = 3.05,
+        read_timeout_s: float = 30.0,
+        max_generation_s: Optional[float] = None,
+        max_retries: int = 2,
+        pool_maxsize: int = 10,
+        num_ctx: Optional[int] = None
+    ):
+        self.base_url = ollama_base_url.rstrip("/")
         self.model = model
         self.logger = logging.getLogger(__name__)
+        # read_timeout_s bounds the wait for each chunk, max_generation_s the
+        # whole stream; together they keep a hung Ollama from holding a
+        # request until the Lambda timeout
+        self.timeout = (connect_timeout_s, read_timeout_s)
+        self.max_generation_s = max_generation_s
+        self.max_retries = max_retries
+        self.pool_maxsize = pool_maxsize
+        # Context window requested from Ollama; None keeps the model default.
+        # Keep it fixed: Ollama reloads the model when it changes.
+        self.num_ctx = num_ctx
+
+        # Keep-alive connections are reused across queries on a warm container.
+        # Only connection failures and gateway errors are retried: they happen
+        # before any token is streamed, so a retry never duplicates output.
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=0,
+            status=max_retries,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(["GET", "POST"]),
+            backoff_factor=0.2,
+            raise_on_status=False
+        )
+        self.session = requests.Session()
+        self.session.mount(
+            self.base_url, HTTPAdapter(pool_maxsize=pool_maxsize, max_retries=retry)
+        )
 
     def _generate_prompt(self, query: str, context: str) -> str:
         """
@@ -17,7 +80,7 @@ class LLMService:
         return f"""<|begin_of_text|><|start_header_id|>system<|end_header_id|>
 
 You are a helpful assistant that answers questions based strictly on the provided Wikipedia context.
-If the answer is not in the context, say "I cannot answer this based on the provided context."
+If the answer is not in the context, say "{CANNOT_ANSWER_TEXT}"
 Do not use outside knowledge.
 
 Context:
@@ -31,32 +94,32 @@ Context:
     def check_health(self) -> bool:
         """Checks if Ollama is reachable."""
         try:
-            response = requests.get(f"{self.base_url}/api/tags")
+            response = self.session.get(f"{self.base_url}/api/tags", timeout=self.timeout)
             return response.status_code == 200
         except requests.RequestException:
             return False
 
-    def stream_response(self, query: str, context: str) -> Generator[str, None, None]:
+    def stream_response(self, query: str, context: str) -> Generator[str, None, bool]:
         """
         Streams the LLM response for a given query and context.
         Yields chunks of generated text.
+
+        A failed call yields a last chunk starting with LLM_ERROR_PREFIX,
+        possibly after tokens have been streamed; past max_generation_s the
+        stream stops mid-answer. The generator returns True only when
+        Ollama marked the answer done, so callers keep (cache, persist)
+        complete answers only; see collect_stream.
         """
-        prompt = self._generate_prompt(query, context)
-        payload = {
-            "model": self.model,
-            "prompt": prompt,
-            "stream": True,
-            "options": {
-                "temperature": 0.7,
-                # "num_ctx": 4096 # Adjust based on context size if needed
-            }
-        }
+        payload = self._generate_payload(query, context)
+        deadline = self._deadline()
+        done = False
 
         try:
-            with requests.post(
+            with self.session.post(
                 f"{self.base_url}/api/generate",
                 json=payload,
-                stream=True
+                stream=True,
+                timeout=self.timeout
             ) as response:
                 response.raise_for_status()
                 
@@ -68,21 +131,48 @@ Context:
                         chunk = json.loads(line)
                         if "response" in chunk:
                             yield chunk["response"]
+                        # Read on to the end of the body rather than breaking, so
+                        # the connection is returned to the pool for reuse
                         if chunk.get("done", False):
-                            break
+                            done = True
+                            continue
                     except json.JSONDecodeError:
                         self.logger.error(f"Failed to decode JSON chunk: {line}")
                         continue
+                    if deadline is not None and time.monotonic() > deadline:
+                        self.logger.error(
+                            f"Generation exceeded {self.max_generation_s}s, stopping stream"
+                        )
+                        break
 
         except requests.RequestException as e:
             self.logger.error(f"Error calling Ollama: {str(e)}")
-            yield f"Error: Could not generate response from LLM. {str(e)}"
+            yield f"{LLM_ERROR_PREFIX} {str(e)}"
+            return False
+        return done
+
+    def close(self):
+        """Closes the pooled connections."""
+        self.session.close()
+
+    def _generate_payload(self, query: str, context: str) -> Dict:
+        options = {"temperature": 0.7}
+        if self.num_ctx is not None:
+            options["num_ctx"] = self.num_ctx
+        return {
+            "model": self.model,
+            "prompt": self._generate_prompt(query, context),
+            "stream": True,
+            "options": options
+        }
+
+    def _deadline(self) -> Optional[float]:
+        if self.max_generation_s is None:
+            return None
+        return time.monotonic() + self.max_generation_s
 
     def generate_response(self, query: str, context: str) -> Optional[str]:
         """
         Non-streaming version of response generation.
         """
-        response_text = ""
-        for chunk in self.stream_response(query, context):
-            response_text += chunk
-        return response_text
+        return collect_stream(self.stream_response(query, context))[0]
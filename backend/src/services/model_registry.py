@@ -0,0 +1,74 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable
+
+from utils.metrics import put_metric
+
+logger = logging.getLogger(__name__)
+
+# Directory holding pre-packaged models (e.g. a Lambda layer at /opt/models),
+# one sub-directory per model name. Models not found there are downloaded
+# from the Hugging Face hub as before.
+EMBEDDING_MODEL_DIR = os.environ.get("EMBEDDING_MODEL_DIR")
+
+_models: Dict[str, Any] = {}
+_load_stats: Dict[str, Dict[str, Any]] = {}
+_locks: Dict[str, threading.Lock] = {}
+_registry_lock = threading.Lock()
+
+
+def resolve_model_path(model_name: str) -> str:
+    """Local path of a pre-packaged model if there is one, else the hub name."""
+    if EMBEDDING_MODEL_DIR:
+        local_path = os.path.join(EMBEDDING_MODEL_DIR, model_name)
+        if os.path.isdir(local_path):
+            return local_path
+    return model_name
+
+
+def get_model(model_name: str):
+    """
+    Returns the process-wide SentenceTransformer for model_name, loading
+    it on first use.
+
+    Concurrent first calls for the same model wait for a single load.
+    Every load is logged and emitted as a ModelLoadTime metric.
+    """
+    model = _models.get(model_name)
+    if model is not None:
+        return model
+
+    with _registry_lock:
+        lock = _locks.setdefault(model_name, threading.Lock())
+    with lock:
+        if model_name not in _models:
+            start = time.perf_counter()
+            path = resolve_model_path(model_name)
+            # Imported here: torch and sentence_transformers take seconds to
+            # import, which only the first request that needs a model should pay
+            from sentence_transformers import SentenceTransformer
+            _models[model_name] = SentenceTransformer(path, device="cpu")
+            load_ms = (time.perf_counter() - start) * 1000
+
+            source = "local" if path != model_name else "hub"
+            _load_stats[model_name] = {"load_ms": round(load_ms, 1), "source": source}
+            logger.info(f"Loaded embedding model {model_name} from {source} in {load_ms:.0f}ms")
+            put_metric("ModelLoadTime", load_ms, dimensions={"Model": model_name})
+    return _models[model_name]
+
+
+def preload(model_names: Iterable[str]):
+    """Loads models eagerly, e.g. during Lambda init rather than the first request."""
+    for model_name in model_names:
+        get_model(model_name)
+
+
+def is_loaded(model_name: str) -> bool:
+    return model_name in _models
+
+
+def load_stats() -> Dict[str, Dict[str, Any]]:
+    """Load time (ms) and source ("local" or "hub") per loaded model."""
+    return {name: dict(stats) for name, stats in _load_stats.items()}
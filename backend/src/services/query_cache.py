@@ -0,0 +1,198 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+def normalize_query(text: str) -> str:
+    """Case-folds, collapses whitespace and drops trailing punctuation."""
+    return re.sub(r"\s+", " ", text).strip().rstrip("?!. ").casefold()
+
+
+def _cache_key(*parts: str) -> str:
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+class TTLCache:
+    """
+    Thread-safe in-process map with a per-entry TTL and LRU eviction
+    once more than max_entries are held.
+    """
+
+    def __init__(self, max_entries: int, ttl_s: float):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_s, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+            }
+
+
+class DynamoCacheBackend:
+    """
+    Shared cache level in a DynamoDB table, so warm containers see each
+    other's entries.
+
+    Items are {cache_key, value (binary), ttl (epoch seconds)}. The table's
+    TTL setting deletes expired items eventually; reads also check ttl, since
+    deletion can lag by hours.
+    """
+
+    def __init__(self, table_name: str, client=None):
+        self.table_name = table_name
+        # Created on first use, so boto3 is not imported during Lambda init
+        self._client = client
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3
+            self._client = boto3.client("dynamodb")
+        return self._client
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            item = self.client.get_item(
+                TableName=self.table_name, Key={"cache_key": {"S": key}}
+            ).get("Item")
+        except Exception as e:
+            # The shared level is an optimization; never fail a query over it
+            print(f"Error reading query cache: {e}")
+            self.errors += 1
+            return None
+        if item is None or int(item["ttl"]["N"]) <= time.time():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return item["value"]["B"]
+
+    def put(self, key: str, value: bytes, ttl_s: float):
+        try:
+            self.client.put_item(
+                TableName=self.table_name,
+                Item={
+                    "cache_key": {"S": key},
+                    "value": {"B": value},
+                    "ttl": {"N": str(int(time.time() + ttl_s))},
+                }
+            )
+        except Exception as e:
+            print(f"Error writing query cache: {e}")
+            self.errors += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "errors": self.errors}
+
+
+class QueryCache:
+    """
+    Two-level cache for the chat path.
+
+    Level one maps (embedding model, normalized query) to the query
+    embedding. Level two maps (session, artifact version, normalized query,
+    LLM model, top_k) to the streamed answer chunks, so a repeated question
+    is replayed without retrieval or generation. Both levels are held
+    in-process and, if a shared backend is given, also read through to
+    and written to it. A TTL of 0 disables that level.
+    """
+
+    def __init__(
+        self,
+        embedding_ttl_s: float = 3600,
+        embedding_max_entries: int = 10000,
+        answer_ttl_s: float = 600,
+        answer_max_entries: int = 2000,
+        shared: Optional[DynamoCacheBackend] = None
+    ):
+        self.embeddings = TTLCache(embedding_max_entries, embedding_ttl_s)
+        self.answers = TTLCache(answer_max_entries, answer_ttl_s)
+        self.shared = shared
+
+    def get_embedding(self, model: str, query: str) -> Optional[List[float]]:
+        if self.embeddings.ttl_s <= 0:
+            return None
+        key = _cache_key("embedding", model, normalize_query(query))
+        vector = self.embeddings.get(key)
+        if vector is None and self.shared is not None:
+            data = self.shared.get(key)
+            if data is not None:
+                vector = np.frombuffer(data, dtype="<f4").tolist()
+                self.embeddings.put(key, vector)
+        return vector
+
+    def put_embedding(self, model: str, query: str, vector: List[float]):
+        if self.embeddings.ttl_s <= 0:
+            return
+        key = _cache_key("embedding", model, normalize_query(query))
+        self.embeddings.put(key, vector)
+        if self.shared is not None:
+            data = np.asarray(vector, dtype="<f4").tobytes()
+            self.shared.put(key, data, self.embeddings.ttl_s)
+
+    def get_answer(
+        self, session_version: str, query: str, model: str, top_k: int
+    ) -> Optional[List[str]]:
+        if self.answers.ttl_s <= 0:
+            return None
+        key = _cache_key("answer", session_version, model, str(top_k), normalize_query(query))
+        chunks = self.answers.get(key)
+        if chunks is None and self.shared is not None:
+            data = self.shared.get(key)
+            if data is not None:
+                chunks = json.loads(data)
+                self.answers.put(key, chunks)
+        return chunks
+
+    def put_answer(
+        self, session_version: str, query: str, model: str, top_k: int, chunks: List[str]
+    ):
+        if self.answers.ttl_s <= 0:
+            return
+        key = _cache_key("answer", session_version, model, str(top_k), normalize_query(query))
+        self.answers.put(key, chunks)
+        if self.shared is not None:
+            self.shared.put(key, json.dumps(chunks).encode("utf-8"), self.answers.ttl_s)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        stats = {"embeddings": self.embeddings.stats(), "answers": self.answers.stats()}
+        if self.shared is not None:
+            stats["shared"] = self.shared.stats()
+        return stats
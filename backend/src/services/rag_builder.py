@@ -1,35 +1,109 @@
+import hashlib
 import os
 import shutil
 import uuid
-from typing import List, Optional
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 from datetime import datetime
-
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from uuid import UUID
 
 from models.rag_session import RagSession, RagStatus, RagMetadata
 from models.text_chunk import TextChunk, ChunkMetadata
 from services.wikipedia_fetcher import WikipediaFetcher
 from services.embedding_service import EmbeddingService
 from services.vector_store import VectorStoreService
+from services.chunk_store import ChunkStore, ChunkStoreWriter
+from services.lexical_index import LexicalIndexWriter
+from services.artifact_bundle import extract_bundle, write_bundle
+from services.index_factory import resolve_index_spec
 from utils.s3_client import S3Client
+from utils.error_handling import AppError
+from utils.metrics import StageTimer
+from utils.pipeline import prefetch
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+BUNDLE_NAME = "bundle.rag"
 
 class RagBuilderService:
-    def __init__(self, rag_bucket_name: str):
-        self.wiki_fetcher = WikipediaFetcher()
-        self.embedding_service = EmbeddingService()
-        self.vector_store = VectorStoreService()
+    def __init__(
+        self,
+        rag_bucket_name: str,
+        max_index_bytes: Optional[int] = None,
+        embedding_service: Optional[EmbeddingService] = None,
+        wiki_fetcher: Optional[WikipediaFetcher] = None,
+        batch_size: int = 32,
+        prefetch_batches: int = 2,
+        bundle_compression: str = "none",
+        index_type: Optional[str] = None
+    ):
+        self.wiki_fetcher = wiki_fetcher or WikipediaFetcher()
+        self.embedding_service = embedding_service or EmbeddingService()
+        # One reusable index arena per builder; it is reset for every session
+        self.vector_store = VectorStoreService(max_index_bytes=max_index_bytes)
         self.s3_client = S3Client(rag_bucket_name) if rag_bucket_name else None
-        
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            separators=["\n\n", "\n", " ", ""]
-        )
 
-    def build_rag_session(self, source_url: str) -> RagSession:
+        # Created on first split; langchain is slow to import
+        self._text_splitter = None
+        # Chunks per embedding batch and how many split batches may queue
+        # up ahead of the encoder; together they bound peak build memory
+        self.batch_size = batch_size
+        self.prefetch_batches = prefetch_batches
+        self.bundle_compression = bundle_compression
+        # Exported index type (see services.index_factory); None picks one
+        # from the chunk count. Validated here rather than after a build.
+        if index_type is not None:
+            resolve_index_spec(index_type, 0, self.vector_store.dimension)
+        self.index_type = index_type
+
+    @property
+    def text_splitter(self):
+        if self._text_splitter is None:
+            from langchain_text_splitters import RecursiveCharacterTextSplitter
+            self._text_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=CHUNK_SIZE,
+                chunk_overlap=CHUNK_OVERLAP,
+                separators=["\n\n", "\n", " ", ""]
+            )
+        return self._text_splitter
+
+    def preload(self):
+        """
+        Imports the text splitter and creates the Wikipedia and S3 clients
+        now rather than during the first build. The embedding model is
+        preloaded separately (EmbeddingService.preload).
+        """
+        self.text_splitter
+        self.wiki_fetcher.preload()
+        if self.s3_client is not None:
+            self.s3_client.preload()
+
+    def build_rag_session(
+        self,
+        source_url: str,
+        fetch_article: Optional[Callable[[str], Tuple[str, str]]] = None,
+        session_id: Optional[str] = None
+    ) -> RagSession:
         """
         Orchestrates the RAG build process.
+
+        Args:
+            source_url (str): Wikipedia URL
+            fetch_article (Callable, optional): Returns (title, content) for
+                the URL. Defaults to the WikipediaFetcher; batch builds pass
+                in articles that were fetched concurrently.
+            session_id (str, optional): Existing session to rebuild in place,
+                from the same source_url it was built from. Only chunks whose
+                text changed are embedded again and the stored index is
+                patched by id. Sessions stored with a non-flat index are
+                rebuilt in full.
+
+        The session's metadata records the total build time and the time
+        spent in each stage (download, fetch, split, embed, index, bundle,
+        upload), whether or not the build succeeded.
         """
+        timer = StageTimer()
         # 1. Create Session
         session = RagSession(
             source_url=source_url,
@@ -39,60 +113,332 @@ class RagBuilderService:
                 content_size=0
             )
         )
-        
+        if session_id:
+            session.session_id = UUID(session_id)
+        tmp_dir = f"/tmp/{session.session_id}"
+
         try:
-            # 2. Fetch Content
-            title, content = self.wiki_fetcher.fetch_article(source_url)
-            session.metadata.article_title = title
-            session.metadata.content_size = len(content)
-            
-            # 3. Chunk Content
-            chunks_text = self.text_splitter.split_text(content)
-            session.chunk_count = len(chunks_text)
-            
-            # 4. Generate Embeddings
-            embeddings = self.embedding_service.generate_embeddings(chunks_text)
-            
-            # 5. Create Vector Index
-            self.vector_store.add_vectors(embeddings)
-            
-            # 6. Save Index Locally
-            tmp_dir = f"/tmp/{session.session_id}"
-            os.makedirs(tmp_dir, exist_ok=True)
-            index_path = self.vector_store.save_local(tmp_dir, str(session.session_id))
-            
-            # Save chunks metadata for simple retrieval (Phase 1/2)
-            chunks_data = [
-                {"chunk_id": str(uuid.uuid4()), "position": i, "content": text}
-                for i, text in enumerate(chunks_text)
-            ]
-            import json
-            chunks_path = os.path.join(tmp_dir, "chunks.json")
-            with open(chunks_path, "w") as f:
-                json.dump(chunks_data, f)
-            
-            # 7. Upload to S3
-            s3_key_index = f"indices/{session.session_id}/index.faiss"
-            s3_key_chunks = f"indices/{session.session_id}/chunks.json"
-            
-            if self.s3_client:
-                if not self.s3_client.upload_file(index_path, s3_key_index):
-                    raise Exception("Failed to upload index to S3")
-                if not self.s3_client.upload_file(chunks_path, s3_key_chunks):
-                    raise Exception("Failed to upload chunks to S3")
-                    
-                session.s3_index_path = f"s3://{self.s3_client.bucket_name}/{s3_key_index}"
-            
-            # Cleanup
-            shutil.rmtree(tmp_dir, ignore_errors=True)
-            
+            # The index only holds this session's vectors and is emptied
+            # again once the artifacts have been uploaded.
+            with self.vector_store.session_scope():
+                previous = None
+                if session_id:
+                    with timer.stage("download"):
+                        previous = self._load_previous_build(session, tmp_dir)
+                self._build_artifacts(
+                    session, source_url, tmp_dir,
+                    fetch_article or self.wiki_fetcher.fetch_article,
+                    timer,
+                    previous
+                )
+
             # 8. Update Session Status
             session.status = RagStatus.READY
             session.updated_at = datetime.utcnow()
-            
+
         except Exception as e:
             session.status = RagStatus.FAILED
             session.metadata.error_message = str(e)
+            if isinstance(e, AppError):
+                session.metadata.error_code = e.code
             session.updated_at = datetime.utcnow()
-            
+
+        finally:
+            # Cleanup
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            session.metadata.processing_time_ms = round(timer.total_ms)
+            session.metadata.stage_timings_ms = timer.stages_ms()
+
         return session
+
+    def _build_artifacts(
+        self,
+        session: RagSession,
+        source_url: str,
+        tmp_dir: str,
+        fetch_article: Callable[[str], Tuple[str, str]],
+        timer: StageTimer,
+        previous: Optional["_ChunkIdAssigner"] = None
+    ):
+        """
+        Fetches the article and streams it through split -> embed -> index
+        in bounded batches, then uploads the index and chunk store as a
+        single artifact bundle.
+
+        Splitting runs ahead in a background thread and each embedded batch
+        is indexed and written to disk while the next batch is encoding, so
+        only a few batches of chunk text and vectors are held at a time.
+
+        When previous is given the vector store already holds the previous
+        build's index; unchanged chunks keep their vectors and ids, only new
+        text is embedded, and vectors of chunks that disappeared are removed.
+
+        Split and index times are busy time on their own threads, which
+        overlaps with embedding.
+        """
+        # 2. Fetch Content
+        with timer.stage("fetch"):
+            title, content = fetch_article(source_url)
+        session.metadata.article_title = title
+        session.metadata.content_size = len(content)
+
+        os.makedirs(tmp_dir, exist_ok=True)
+        chunks_path = os.path.join(tmp_dir, "chunks.bin")
+        lexical_path = os.path.join(tmp_dir, "lexical.bin")
+        assigner = previous or _ChunkIdAssigner()
+
+        # 3-5. Chunk, embed and index batch by batch, with a BM25 index over
+        # the same chunks for lexical retrieval
+        with ChunkStoreWriter(chunks_path) as chunk_writer, \
+                LexicalIndexWriter(lexical_path) as lexical_writer, \
+                ThreadPoolExecutor(max_workers=1) as index_writer:
+            pending = None
+            batches = self._iter_chunk_batches(content, timer)
+            for batch in prefetch(batches, maxsize=self.prefetch_batches):
+                records, new_ids, new_texts = assigner.assign(batch)
+                with timer.stage("embed"):
+                    embeddings = self.embedding_service.generate_embeddings(new_texts)
+                if pending is not None:
+                    pending.result()
+                pending = index_writer.submit(
+                    self._write_batch, chunk_writer, lexical_writer, records, new_ids, embeddings,
+                    timer
+                )
+            if pending is not None:
+                pending.result()
+        session.chunk_count = chunk_writer.count
+
+        stale_ids = assigner.stale_ids()
+        self.vector_store.remove_ids(stale_ids)
+        if previous is not None:
+            session.metadata.reused_chunk_count = assigner.reused
+            session.metadata.removed_chunk_count = len(stale_ids)
+            if assigner.unchanged and "lexical.bin" in assigner.previous_artifacts:
+                # Same chunks in the same order: the stored artifacts are current
+                session.metadata.index_type = previous.index_type
+                session.metadata.index_params = previous.index_params
+                session.s3_index_path = self._s3_uri(session)
+                return
+
+        # 6. Save Index Locally and bundle it with the chunk store
+        spec = resolve_index_spec(self.index_type, session.chunk_count, self.vector_store.dimension)
+        session.metadata.index_type = spec.index_type
+        session.metadata.index_params = spec.params
+        bundle_path = os.path.join(tmp_dir, BUNDLE_NAME)
+        with timer.stage("bundle"):
+            index_path = self.vector_store.save_local(tmp_dir, str(session.session_id), spec)
+            write_bundle(
+                bundle_path,
+                {"index.faiss": index_path, "chunks.bin": chunks_path, "lexical.bin": lexical_path},
+                {
+                    "session_id": str(session.session_id),
+                    "source_url": str(session.source_url),
+                    "embedding_model": self.embedding_service.model_name,
+                    "embedding_dimension": self.vector_store.dimension,
+                    "chunk_count": session.chunk_count,
+                    "index_type": spec.index_type,
+                    "index_params": spec.params,
+                },
+                compression=self.bundle_compression
+            )
+
+        # 7. Upload to S3
+        if self.s3_client:
+            with timer.stage("upload"):
+                uploaded = self.s3_client.upload_file(bundle_path, self._bundle_key(session))
+            if not uploaded:
+                raise Exception("Failed to upload artifact bundle to S3")
+
+            session.s3_index_path = self._s3_uri(session)
+
+    @staticmethod
+    def _bundle_key(session: RagSession) -> str:
+        return f"indices/{session.session_id}/{BUNDLE_NAME}"
+
+    def _s3_uri(self, session: RagSession) -> Optional[str]:
+        if not self.s3_client:
+            return None
+        return f"s3://{self.s3_client.bucket_name}/{self._bundle_key(session)}"
+
+    def _load_previous_build(
+        self, session: RagSession, tmp_dir: str
+    ) -> Optional["_ChunkIdAssigner"]:
+        """
+        Downloads the stored artifact bundle of an existing session and
+        loads its index into the vector store.
+
+        Returns None when the stored index is not flat: quantized vectors
+        cannot be reused exactly and not every type supports remove_ids,
+        so such sessions are rebuilt in full under the same id.
+
+        Raises:
+            AppError: If the session's artifacts cannot be downloaded, the
+                bundle is invalid, or it was built from another source_url or
+                with another embedding model
+        """
+        previous_dir = os.path.join(tmp_dir, "previous")
+        os.makedirs(previous_dir, exist_ok=True)
+        bundle_path = os.path.join(previous_dir, BUNDLE_NAME)
+
+        if self.s3_client is None \
+                or not self.s3_client.download_file(self._bundle_key(session), bundle_path):
+            raise AppError(
+                f"No stored artifacts for session {session.session_id}",
+                code="SESSION_NOT_FOUND"
+            )
+        manifest = extract_bundle(bundle_path, previous_dir)
+        # Bundles written before the source was recorded cannot be checked
+        stored_url = manifest.get("source_url")
+        if stored_url is not None and stored_url != str(session.source_url):
+            # Chunk ids and vectors would be reused across different articles
+            raise AppError(
+                f"Session {session.session_id} was built from {stored_url}, "
+                f"not {session.source_url}",
+                code="SOURCE_MISMATCH"
+            )
+        if manifest.get("embedding_model") != self.embedding_service.model_name:
+            # Reused vectors would not be comparable with newly embedded ones
+            raise AppError(
+                f"Session {session.session_id} was built with "
+                f"{manifest.get('embedding_model')}, not {self.embedding_service.model_name}",
+                code="MODEL_MISMATCH"
+            )
+
+        if manifest.get("index_type", "flat") != "flat":
+            shutil.rmtree(previous_dir, ignore_errors=True)
+            return None
+
+        self.vector_store.load_local(os.path.join(previous_dir, "index.faiss"))
+        store = ChunkStore(os.path.join(previous_dir, "chunks.bin"))
+        try:
+            assigner = _ChunkIdAssigner(store.iter_records(), next_id=self.vector_store.next_id)
+        finally:
+            store.close()
+        assigner.previous_artifacts = set(manifest["members"])
+        assigner.index_type = manifest.get("index_type", "flat")
+        assigner.index_params = manifest.get("index_params", {})
+        shutil.rmtree(previous_dir, ignore_errors=True)
+        return assigner
+
+    def _iter_chunk_batches(self, content: str, timer: StageTimer) -> Iterator[List[str]]:
+        """
+        Splits the article into chunks and yields them in batches of
+        batch_size, splitting one paragraph-aligned segment at a time.
+        """
+        segment_size = CHUNK_SIZE * self.batch_size
+        batch: List[str] = []
+        for segment in _iter_segments(content, segment_size):
+            with timer.stage("split"):
+                texts = self.text_splitter.split_text(segment)
+            for text in texts:
+                batch.append(text)
+                if len(batch) >= self.batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    def _write_batch(self, chunk_writer: ChunkStoreWriter, lexical_writer: LexicalIndexWriter,
+                     records: List[Tuple[int, str, str]],
+                     new_ids: List[int], embeddings: List[List[float]], timer: StageTimer):
+        """
+        Adds one batch's new vectors to the index and its records to the
+        chunk store and lexical index.
+        """
+        with timer.stage("index"):
+            self.vector_store.add_vectors(embeddings, ids=new_ids)
+            for vector_id, chunk_id, text in records:
+                chunk_writer.append(text, vector_id, chunk_id)
+                lexical_writer.add(text)
+
+
+def _iter_segments(content: str, segment_size: int) -> Iterator[str]:
+    """
+    Yields consecutive paragraph-aligned slices of content.
+
+    Cut points are content-defined: once a segment holds half of
+    segment_size characters it ends at the first paragraph whose hash
+    selects it as a boundary (or at twice segment_size). An edit therefore
+    only moves the cuts next to it, and segments elsewhere in the article
+    split into the same chunks as before.
+    """
+    start = 0
+    segment_start = 0
+    while start < len(content):
+        end = content.find("\n\n", start)
+        if end == -1:
+            end = len(content)
+        paragraph = content[start:end]
+        size = end - segment_start
+        start = end + 2
+        if end == len(content) or size >= segment_size * 2 or (
+            size >= segment_size // 2 and zlib.crc32(paragraph.encode("utf-8")) % 8 == 0
+        ):
+            yield content[segment_start:end]
+            segment_start = start
+    # Content ending in separators leaves its last paragraphs unyielded
+    tail = content[segment_start:]
+    if tail.strip():
+        yield tail
+
+
+def _content_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class _ChunkIdAssigner:
+    """
+    Assigns vector ids to chunks as they are produced.
+
+    For a new build every chunk is new and gets the next id, which equals
+    its position. For a rebuild, a chunk whose exact text existed in the
+    previous build reuses that chunk's id, chunk_id and stored vector.
+    """
+
+    def __init__(
+        self,
+        previous_chunks: Iterable[Tuple[int, str, str]] = (),
+        next_id: int = 0
+    ):
+        # content hash -> (vector_id, chunk_id) of previous chunks with that text
+        self._previous: Dict[str, List[Tuple[int, str]]] = {}
+        self._previous_order: List[int] = []
+        for vector_id, chunk_id, text in previous_chunks:
+            self._previous.setdefault(_content_hash(text), []).append((vector_id, chunk_id))
+            self._previous_order.append(vector_id)
+        self._assigned_order: List[int] = []
+        self.next_id = next_id
+        self.reused = 0
+        # Bundle members of the previous build, to tell if it predates one
+        self.previous_artifacts: Set[str] = set()
+        # Index type and parameters of the previous build
+        self.index_type = "flat"
+        self.index_params: Dict[str, Any] = {}
+
+    def assign(self, texts: List[str]) -> Tuple[List[Tuple[int, str, str]], List[int], List[str]]:
+        """
+        Returns (vector_id, chunk_id, text) records for texts plus the ids
+        and texts of the chunks that still need to be embedded.
+        """
+        records, new_ids, new_texts = [], [], []
+        for text in texts:
+            matches = self._previous.get(_content_hash(text))
+            if matches:
+                vector_id, chunk_id = matches.pop(0)
+                self.reused += 1
+            else:
+                vector_id, chunk_id = self.next_id, str(uuid.uuid4())
+                self.next_id += 1
+                new_ids.append(vector_id)
+                new_texts.append(text)
+            self._assigned_order.append(vector_id)
+            records.append((vector_id, chunk_id, text))
+        return records, new_ids, new_texts
+
+    def stale_ids(self) -> List[int]:
+        """Ids of previous chunks that no longer occur in the article."""
+        return [vector_id for matches in self._previous.values() for vector_id, _ in matches]
+
+    @property
+    def unchanged(self) -> bool:
+        return self._assigned_order == self._previous_order
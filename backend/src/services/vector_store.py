@@ -2,50 +2,153 @@ import faiss
 import numpy as np
 import os
 import pickle
-from typing import List, Optional, Tuple
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+from services.index_factory import IndexSpec, build_index
+from utils.error_handling import AppError
+
+def distance_to_similarity(distance: float) -> float:
+    """
+    Cosine similarity for a squared L2 distance between unit-length
+    embeddings (|a - b|^2 = 2 - 2 cos), which is what the index returns
+    for the normalized sentence embeddings we store.
+    """
+    return max(-1.0, min(1.0, 1.0 - distance / 2.0))
+
 
 class VectorStoreService:
-    def __init__(self, dimension: int = 384):
+    def __init__(self, dimension: int = 384, max_index_bytes: Optional[int] = None):
         self.dimension = dimension
-        self.index = faiss.IndexFlatL2(dimension)
+        # Upper bound on resident vector memory; None means unbounded
+        self.max_index_bytes = max_index_bytes
+        # Vectors are stored under explicit int64 ids so that individual
+        # chunks can be replaced or removed on incremental rebuilds
+        self.index = self._new_index()
+
+    def _new_index(self) -> faiss.Index:
+        return faiss.IndexIDMap2(faiss.IndexFlatL2(self.dimension))
+
+    @property
+    def memory_usage_bytes(self) -> int:
+        """Approximate resident size of the stored float32 vectors and their ids."""
+        return self.index.ntotal * (self.dimension * 4 + 8)
+
+    @property
+    def next_id(self) -> int:
+        """Smallest id greater than every id currently in the index."""
+        if self.index.ntotal == 0:
+            return 0
+        return int(faiss.vector_to_array(self.index.id_map).max()) + 1
+
+    def reset(self):
+        """
+        Drops every vector from the index and releases its storage,
+        so the same service can be reused for the next session.
+        """
+        self.index.reset()
+
+    @contextmanager
+    def session_scope(self) -> Iterator["VectorStoreService"]:
+        """
+        Scopes the index to a single RAG session.
+
+        The index is emptied on entry and again on exit, so a warm
+        container never carries vectors from one build into the next.
+        """
+        self.reset()
+        try:
+            yield self
+        finally:
+            self.reset()
     
-    def add_vectors(self, vectors: List[List[float]]):
+    def add_vectors(self, vectors: List[List[float]], ids: Optional[List[int]] = None):
         """
         Adds vectors to the FAISS index.
         
         Args:
             vectors (List[List[float]]): List of embedding vectors
+            ids (List[int], optional): Id per vector. Defaults to consecutive
+                ids after the current ones, i.e. chunk positions for a new build
+
+        Raises:
+            AppError: If the vectors would exceed max_index_bytes
         """
-        if not vectors:
+        if len(vectors) == 0:
             return
             
         vectors_np = np.array(vectors).astype('float32')
-        self.index.add(vectors_np)
+        if self.max_index_bytes is not None:
+            projected = self.memory_usage_bytes + vectors_np.nbytes
+            if projected > self.max_index_bytes:
+                raise AppError(
+                    f"Vector index would use {projected} bytes, "
+                    f"exceeding the limit of {self.max_index_bytes} bytes",
+                    code="INDEX_MEMORY_LIMIT"
+                )
+        if ids is None:
+            start = self.next_id
+            ids_np = np.arange(start, start + len(vectors_np), dtype='int64')
+        else:
+            ids_np = np.array(ids, dtype='int64')
+        self.index.add_with_ids(vectors_np, ids_np)
+
+    def remove_ids(self, ids: List[int]) -> int:
+        """
+        Removes vectors by id.
         
-    def save_local(self, directory: str, session_id: str) -> str:
+        Args:
+            ids (List[int]): Ids to remove
+            
+        Returns:
+            int: Number of vectors removed
+        """
+        if not ids:
+            return 0
+        return self.index.remove_ids(np.array(ids, dtype='int64'))
+        
+    def save_local(self, directory: str, session_id: str, spec: Optional[IndexSpec] = None) -> str:
         """
         Saves the index to a local file.
+
+        The in-memory index is always flat so it can be patched by id; a
+        non-flat spec converts a copy of it on the way out.
         
         Args:
             directory (str): Directory to save to
             session_id (str): RAG session ID
+            spec (IndexSpec, optional): Index type to write. Defaults to flat
             
         Returns:
             str: Path to the saved index file
         """
         os.makedirs(directory, exist_ok=True)
         file_path = os.path.join(directory, f"{session_id}.index")
-        faiss.write_index(self.index, file_path)
+        index = self.index
+        if spec is not None and spec.index_type != "flat" and self.index.ntotal > 0:
+            vectors = self.index.index.reconstruct_n(0, self.index.ntotal)
+            ids = faiss.vector_to_array(self.index.id_map)
+            index = build_index(spec, vectors, ids)
+        faiss.write_index(index, file_path)
         return file_path
 
     def load_local(self, file_path: str):
         """
         Loads an index from a local file.
+
+        Indexes written before vectors had explicit ids are converted so
+        that each vector's id is its original position. Non-flat indexes
+        are searchable but do not support remove_ids in every type.
         
         Args:
             file_path (str): Path to the index file
         """
-        self.index = faiss.read_index(file_path)
+        index = faiss.read_index(file_path)
+        if not isinstance(index, faiss.IndexIDMap2):
+            vectors = index.reconstruct_n(0, index.ntotal)
+            index = self._new_index()
+            index.add_with_ids(vectors, np.arange(len(vectors), dtype='int64'))
+        self.index = index
 
     def search(self, query_vector: List[float], top_k: int = 5) -> Tuple[List[float], List[int]]:
         """
@@ -56,8 +159,30 @@ class VectorStoreService:
             top_k (int): Number of results to return
             
         Returns:
-            Tuple[List[float], List[int]]: (Distances, Indices)
+            Tuple[List[float], List[int]]: (Distances, Ids)
         """
         query_np = np.array([query_vector]).astype('float32')
         distances, indices = self.index.search(query_np, top_k)
         return distances[0].tolist(), indices[0].tolist()
+
+    def search_batch(
+        self, query_vectors: List[List[float]], top_k: int = 5
+    ) -> Tuple[List[List[float]], List[List[int]]]:
+        """
+        Searches the index for several queries in one call.
+
+        FAISS scans the stored vectors once for the whole query matrix,
+        which is much cheaper than one search per query.
+        
+        Args:
+            query_vectors (List[List[float]]): Query embedding vectors
+            top_k (int): Number of results to return per query
+            
+        Returns:
+            Tuple[List[List[float]], List[List[int]]]: (Distances, Ids), one row per query
+        """
+        if len(query_vectors) == 0:
+            return [], []
+        query_np = np.asarray(query_vectors, dtype='float32')
+        distances, indices = self.index.search(query_np, top_k)
+        return distances.tolist(), indices.tolist()
@@ -1,15 +1,44 @@
-import wikipediaapi
-from typing import Tuple
+import time
+import requests
+from typing import Optional, Tuple
+from services.article_cache import ArticleCache
 from utils.validation import is_valid_wikipedia_url, extract_title_from_url
 
+USER_AGENT = 'WikipediaRAGSystem/1.0 (riku-miura@example.com)'
+
 class WikipediaFetcher:
-    def __init__(self):
-        # User-Agent is required by Wikipedia API
-        self.wiki = wikipediaapi.Wikipedia(
-            user_agent='WikipediaRAGSystem/1.0 (riku-miura@example.com)',
-            language='en',
-            extract_format=wikipediaapi.ExtractFormat.WIKI
-        )
+    def __init__(
+        self,
+        cache: Optional[ArticleCache] = None,
+        cache_ttl_s: float = 3600,
+        api_url: str = "https://en.wikipedia.org/w/api.php",
+        timeout_s: float = 10
+    ):
+        # wikipediaapi client, created on first use
+        self._wiki = None
+        # With a cache, revision ids and redirect targets are looked up
+        # through the MediaWiki API at api_url; text still comes from the
+        # wikipediaapi client, so cached and uncached builds see the same text
+        self.cache = cache
+        self.cache_ttl_s = cache_ttl_s
+        self.api_url = api_url
+        self.timeout_s = timeout_s
+
+    @property
+    def wiki(self):
+        if self._wiki is None:
+            import wikipediaapi
+            # User-Agent is required by Wikipedia API
+            self._wiki = wikipediaapi.Wikipedia(
+                user_agent=USER_AGENT,
+                language='en',
+                extract_format=wikipediaapi.ExtractFormat.WIKI
+            )
+        return self._wiki
+
+    def preload(self):
+        """Creates the client the next fetch will use, rather than on that fetch."""
+        self.wiki
 
     def fetch_article(self, url: str) -> Tuple[str, str]:
         """
@@ -29,9 +58,85 @@ class WikipediaFetcher:
             raise ValueError("Invalid Wikipedia URL")
             
         title = extract_title_from_url(url)
+        if self.cache is not None:
+            return self._fetch_cached(title)
+
         page = self.wiki.page(title)
         
         if not page.exists():
             raise Exception(f"Page '{title}' does not exist on English Wikipedia")
             
         return page.title, page.text
+
+    def _fetch_cached(self, title: str) -> Tuple[str, str]:
+        """
+        Serves an article from the cache when possible.
+
+        Entries are keyed on the title redirects resolve to, so every
+        title that leads to an article shares one entry. Within
+        cache_ttl_s of the last check the cached text is returned without
+        any request. After that, or when the title is a redirect, only the
+        latest revision id is requested and the full download is skipped
+        if it is unchanged.
+        """
+        cached = self.cache.get(canonical_title(title))
+        if cached is not None and time.time() - cached.checked_at < self.cache_ttl_s:
+            self.cache.hits += 1
+            return cached.title, cached.content
+
+        info = self._query(title, prop="info")
+        title_key = canonical_title(info["title"])
+        if title_key != canonical_title(title):
+            cached = self.cache.get(title_key)
+
+        if cached is not None and cached.revision_id == info["lastrevid"]:
+            self.cache.revalidations += 1
+            self.cache.touch(title_key)
+            return cached.title, cached.content
+
+        self.cache.misses += 1
+        # The revision id is read before the text: if the article is edited
+        # in between, the next check finds a newer revision and refetches
+        page = self.wiki.page(info["title"])
+        # Reading the text first lets exists() use the page id it returned
+        content = page.text
+        if not page.exists():
+            raise Exception(f"Page '{title}' does not exist on English Wikipedia")
+        self.cache.put(title_key, page.title, info["lastrevid"], content)
+        return page.title, content
+
+    def _query(self, title: str, **params) -> dict:
+        """
+        Runs a MediaWiki action=query for a single page, following redirects.
+
+        Raises:
+            Exception: If the request fails or the page does not exist
+        """
+        response = requests.get(
+            self.api_url,
+            params={
+                "action": "query",
+                "format": "json",
+                "formatversion": 2,
+                "redirects": 1,
+                "titles": title,
+                **params
+            },
+            headers={"User-Agent": USER_AGENT},
+            timeout=self.timeout_s
+        )
+        response.raise_for_status()
+        pages = response.json().get("query", {}).get("pages", [])
+
+        if not pages or pages[0].get("missing") or pages[0].get("invalid"):
+            raise Exception(f"Page '{title}' does not exist on English Wikipedia")
+        return pages[0]
+
+
+def canonical_title(title: str) -> str:
+    """
+    Normalises a title the way MediaWiki does: underscores become spaces,
+    surrounding whitespace is dropped and the first letter is upper-cased.
+    """
+    title = " ".join(title.replace("_", " ").split())
+    return title[:1].upper() + title[1:]
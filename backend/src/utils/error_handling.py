@@ -1,3 +1,4 @@
+import sys
 from typing import Dict, Any
 
 class AppError(Exception):
@@ -6,6 +7,15 @@ class AppError(Exception):
         self.code = code
         super().__init__(self.message)
 
+# The chat side imports this module as src.utils.error_handling, the
+# builder-side modules it loads as utils.error_handling. Whichever copy is
+# imported second takes the first one's AppError, so there is one class
+_twin = sys.modules.get(
+    __name__[len("src."):] if __name__.startswith("src.") else f"src.{__name__}"
+)
+if _twin is not None and hasattr(_twin, "AppError"):
+    AppError = _twin.AppError
+
 def format_error_response(error: Exception) -> Dict[str, Any]:
     """
     Formats an exception into a standard API error response.
@@ -0,0 +1,144 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+# CloudWatch namespace for metrics emitted from the Lambda handlers
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "WikiRag")
+
+
+def put_metric(
+    name: str,
+    value: float,
+    unit: str = "Milliseconds",
+    dimensions: Optional[Dict[str, str]] = None
+):
+    """
+    Emits one metric as a CloudWatch Embedded Metric Format log line.
+
+    Lambda ships stdout to CloudWatch Logs, which extracts the metric
+    without any API call from the function.
+    """
+    put_metrics({name: value}, units={name: unit}, dimensions=dimensions)
+
+
+def put_metrics(
+    values: Dict[str, float],
+    units: Optional[Dict[str, str]] = None,
+    dimensions: Optional[Dict[str, str]] = None
+):
+    """
+    Emits several metrics sharing the same dimensions as one EMF log line.
+
+    Args:
+        values (Dict[str, float]): Metric name -> value
+        units (Dict[str, str], optional): Metric name -> CloudWatch unit;
+            metrics not listed are in Milliseconds
+        dimensions (Dict[str, str], optional): Dimension name -> value
+    """
+    units = units or {}
+    dimensions = dimensions or {}
+    print(json.dumps({
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": METRICS_NAMESPACE,
+                "Dimensions": [list(dimensions)],
+                "Metrics": [
+                    {"Name": name, "Unit": units.get(name, "Milliseconds")} for name in values
+                ],
+            }],
+        },
+        **dimensions,
+        **values,
+    }))
+
+
+def metric_name(stage: str) -> str:
+    """CloudWatch metric name for a stage, e.g. query_embed -> QueryEmbed."""
+    return "".join(part.capitalize() for part in stage.split("_"))
+
+
+class StageTimer:
+    """
+    Wall-clock time spent in each named stage of one operation, e.g. the
+    fetch, split, embed, index and upload stages of a build.
+
+    Stages may be timed from several threads; a stage that runs
+    concurrently with others (as in the pipelined build) accumulates its
+    busy time, so stage times can add up to more than total_ms.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._stages: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        # Measurements other than durations, e.g. the number of tokens generated
+        self.values: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000)
+
+    def add(self, name: str, ms: float):
+        """Adds ms to a stage, e.g. for time measured across a generator."""
+        with self._lock:
+            self._stages[name] = self._stages.get(name, 0.0) + ms
+
+    def get(self, name: str) -> Optional[float]:
+        with self._lock:
+            return self._stages.get(name)
+
+    @property
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def stages_ms(self) -> Dict[str, int]:
+        """Stage -> whole milliseconds, in the order the stages first ran."""
+        with self._lock:
+            return {name: round(ms) for name, ms in self._stages.items()}
+
+    def emit(
+        self,
+        operation: str,
+        extra: Optional[Dict[str, float]] = None,
+        units: Optional[Dict[str, str]] = None
+    ):
+        """
+        Emits every stage and the total as one EMF record under an
+        Operation dimension, e.g. Operation=RagBuild with metrics Fetch,
+        Split, ... and Total.
+
+        Args:
+            operation (str): Value of the Operation dimension
+            extra (Dict[str, float], optional): Further metrics to include,
+                such as a generation rate
+            units (Dict[str, str], optional): Units of the extra metrics
+        """
+        with self._lock:
+            stages = dict(self._stages)
+        put_stage_metrics(operation, stages, self.total_ms, extra=extra, units=units)
+
+
+def put_stage_metrics(
+    operation: str,
+    stages_ms: Dict[str, float],
+    total_ms: Optional[float],
+    extra: Optional[Dict[str, float]] = None,
+    units: Optional[Dict[str, str]] = None
+):
+    """
+    Emits stage timings, e.g. recorded on a model by a StageTimer, as one
+    EMF record with an Operation dimension.
+    """
+    values = {metric_name(name): round(ms, 1) for name, ms in stages_ms.items()}
+    if total_ms is not None:
+        values["Total"] = round(total_ms, 1)
+    values.update(extra or {})
+    put_metrics(values, units=units, dimensions={"Operation": operation})
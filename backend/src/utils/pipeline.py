@@ -0,0 +1,59 @@
+import queue
+import threading
+from typing import Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+def prefetch(items: Iterable[T], maxsize: int = 2) -> Iterator[T]:
+    """
+    Iterates over items while a background thread produces the next ones.
+
+    At most maxsize items are buffered ahead of the consumer, which bounds
+    memory regardless of how many items the source yields. Exceptions
+    raised by the source are re-raised in the consuming thread.
+
+    Args:
+        items (Iterable[T]): Source to drain in the background
+        maxsize (int): Maximum number of buffered items
+
+    Yields:
+        T: Items in source order
+    """
+    buffer: "queue.Queue" = queue.Queue(maxsize=maxsize)
+    stopped = threading.Event()
+
+    def put(entry) -> bool:
+        # Poll so the producer notices when the consumer goes away
+        while not stopped.is_set():
+            try:
+                buffer.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put((item, None)):
+                    return
+            put((_DONE, None))
+        except BaseException as e:
+            put((_DONE, e))
+
+    producer = threading.Thread(target=produce, name="prefetch", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stopped.set()
+        producer.join()
@@ -1,12 +1,89 @@
-import boto3
 import os
+import threading
 from botocore.exceptions import ClientError
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+MB = 1024 * 1024
+
+# boto3 clients are thread-safe and own their connection pool, so one client
+# per pool size is shared by every S3Client in the process (and across warm
+# Lambda invocations) instead of opening new connections per instance.
+# boto3 is imported with the first client, so importing this module (and
+# the Lambda init phase) does not pay for it.
+_clients: Dict[int, Any] = {}
+_clients_lock = threading.Lock()
+
+
+def _shared_client(max_pool_connections: int):
+    with _clients_lock:
+        if max_pool_connections not in _clients:
+            import boto3
+            from botocore.config import Config
+            # Creating clients from the default session is not thread-safe
+            _clients[max_pool_connections] = boto3.client(
+                's3',
+                config=Config(
+                    max_pool_connections=max_pool_connections,
+                    retries={'max_attempts': 5, 'mode': 'standard'}
+                )
+            )
+        return _clients[max_pool_connections]
+
 
 class S3Client:
-    def __init__(self, bucket_name: str):
+    def __init__(
+        self,
+        bucket_name: str,
+        max_concurrency: int = 16,
+        multipart_threshold_mb: int = 8,
+        multipart_chunksize_mb: int = 8,
+        max_pool_connections: int = 32,
+        client: Optional[Any] = None
+    ):
+        """
+        Args:
+            bucket_name (str): Bucket all keys refer to
+            max_concurrency (int): Parallel part transfers per file and
+                parallel files in the batch methods
+            multipart_threshold_mb (int): Files from this size on are
+                transferred in parts
+            multipart_chunksize_mb (int): Size of each part
+            max_pool_connections (int): HTTP connections kept by the shared client;
+                should be at least max_concurrency
+            client (optional): boto3 S3 client to use instead of the shared one
+        """
         self.bucket_name = bucket_name
-        self.s3 = boto3.client('s3')
+        self.max_concurrency = max_concurrency
+        self.max_pool_connections = max_pool_connections
+        self.multipart_threshold_mb = multipart_threshold_mb
+        self.multipart_chunksize_mb = multipart_chunksize_mb
+        # Created on first use; see preload()
+        self._s3 = client
+        self._transfer_config = None
+
+    @property
+    def s3(self):
+        if self._s3 is None:
+            self._s3 = _shared_client(self.max_pool_connections)
+        return self._s3
+
+    @property
+    def transfer_config(self):
+        if self._transfer_config is None:
+            from boto3.s3.transfer import TransferConfig
+            self._transfer_config = TransferConfig(
+                multipart_threshold=self.multipart_threshold_mb * MB,
+                multipart_chunksize=self.multipart_chunksize_mb * MB,
+                max_concurrency=self.max_concurrency,
+                use_threads=True
+            )
+        return self._transfer_config
+
+    def preload(self):
+        """Imports boto3 and creates the client now rather than on the first transfer."""
+        self.s3
+        self.transfer_config
 
     def upload_file(self, file_path: str, object_name: Optional[str] = None) -> bool:
         """
@@ -23,7 +100,9 @@ class S3Client:
             object_name = os.path.basename(file_path)
 
         try:
-            self.s3.upload_file(file_path, self.bucket_name, object_name)
+            self.s3.upload_file(
+                file_path, self.bucket_name, object_name, Config=self.transfer_config
+            )
         except ClientError as e:
             print(f"Error uploading file to S3: {e}")
             return False
@@ -32,17 +111,81 @@ class S3Client:
     def download_file(self, object_name: str, file_path: str) -> bool:
         """
         Downloads a file from an S3 bucket.
-        
+
         Args:
             object_name (str): S3 object name to download
             file_path (str): Local path to save the file
-            
+
         Returns:
             bool: True if file was downloaded, else False
         """
         try:
-            self.s3.download_file(self.bucket_name, object_name, file_path)
+            self.s3.download_file(
+                self.bucket_name, object_name, file_path, Config=self.transfer_config
+            )
         except ClientError as e:
             print(f"Error downloading file from S3: {e}")
             return False
         return True
+
+    def upload_files(self, files: List[Tuple[str, str]]) -> Dict[str, bool]:
+        """
+        Uploads several files in parallel.
+
+        Args:
+            files (List[Tuple[str, str]]): (file_path, object_name) pairs
+
+        Returns:
+            Dict[str, bool]: Upload result per object name
+        """
+        return self._run_batch(self.upload_file, files, key_index=1)
+
+    def download_files(self, objects: List[Tuple[str, str]]) -> Dict[str, bool]:
+        """
+        Downloads several objects in parallel.
+
+        Args:
+            objects (List[Tuple[str, str]]): (object_name, file_path) pairs
+
+        Returns:
+            Dict[str, bool]: Download result per object name
+        """
+        return self._run_batch(self.download_file, objects, key_index=0)
+
+    def _run_batch(self, transfer, pairs: List[Tuple[str, str]], key_index: int) -> Dict[str, bool]:
+        if len(pairs) <= 1:
+            return {pair[key_index]: transfer(*pair) for pair in pairs}
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(pairs))) as pool:
+            results = pool.map(lambda pair: transfer(*pair), pairs)
+            return {pair[key_index]: ok for pair, ok in zip(pairs, results)}
+
+    def get_range(
+        self,
+        object_name: str,
+        offset: int,
+        length: Optional[int] = None
+    ) -> Optional[bytes]:
+        """
+        Reads part of an object with a ranged GET.
+
+        Args:
+            object_name (str): S3 object name
+            offset (int): First byte to read
+            length (int, optional): Bytes to read; the rest of the object if omitted.
+                Fewer bytes are returned if the object ends first.
+
+        Returns:
+            Optional[bytes]: The bytes read, or None if the object does not exist
+                or offset lies beyond its end
+        """
+        if length == 0:
+            return b""
+        end = "" if length is None else str(offset + length - 1)
+        try:
+            response = self.s3.get_object(
+                Bucket=self.bucket_name, Key=object_name, Range=f"bytes={offset}-{end}"
+            )
+            return response['Body'].read()
+        except ClientError as e:
+            print(f"Error reading range from S3: {e}")
+            return None
@@ -33,6 +33,7 @@ lambda_stack = LambdaStack(app, f"{app_name}-Lambda",
                            chunk_table=storage.chunk_table,
                            query_table=storage.query_table,
                            chat_table=storage.chat_table,
+                           query_cache_table=storage.query_cache_table,
                            ollama_host=compute.instance.instance_private_ip,
                            env=env)
 
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from aws_cdk import (
     Stack,
     Duration,
@@ -18,7 +20,10 @@ class LambdaStack(Stack):
                  chunk_table: dynamodb.Table,
                  query_table: dynamodb.Table,
                  chat_table: dynamodb.Table,
+                 query_cache_table: dynamodb.Table,
                  ollama_host: str,
+                 chat_max_concurrency: Optional[int] = None,
+                 shared_query_cache: bool = False,
                  **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
@@ -44,6 +49,18 @@ class LambdaStack(Stack):
             }
         )
 
+        chat_environment = {
+            "RAG_BUCKET": rag_bucket.bucket_name,
+            "QUERY_TABLE": query_table.table_name,
+            "CHAT_TABLE": chat_table.table_name,
+            "OLLAMA_HOST": f"http://{ollama_host}:11434"
+        }
+        # Opt-in: every query missing the in-process cache then also makes a
+        # get_item, and every new entry a put_item, on the request path. It
+        # pays off only with many warm containers answering repeated queries
+        if shared_query_cache:
+            chat_environment["QUERY_CACHE_TABLE"] = query_cache_table.table_name
+
         # Chat Lambda
         self.chat_fn = _lambda.Function(self, "ChatFunction",
             runtime=_lambda.Runtime.PYTHON_3_11,
@@ -52,13 +69,16 @@ class LambdaStack(Stack):
             architecture=_lambda.Architecture.ARM_64,
             memory_size=512,
             timeout=Duration.seconds(60),
+            # Opt-in cap on concurrent chat invocations. The handler's
+            # LLM_MAX_CONCURRENCY applies per execution environment, which
+            # serves one request at a time, so this is what bounds the load
+            # on Ollama across environments: size it as the generations the
+            # Ollama host sustains divided by LLM_MAX_CONCURRENCY. It also
+            # throttles cache hits, "cannot answer" replies and history reads,
+            # which never reach the LLM, so it is unset by default
+            reserved_concurrent_executions=chat_max_concurrency,
             vpc=vpc,
-            environment={
-                "RAG_BUCKET": rag_bucket.bucket_name,
-                "QUERY_TABLE": query_table.table_name,
-                "CHAT_TABLE": chat_table.table_name,
-                "OLLAMA_HOST": f"http://{ollama_host}:11434"
-            }
+            environment=chat_environment
         )
 
         # Grant permissions
@@ -72,6 +92,8 @@ class LambdaStack(Stack):
         
         query_table.grant_read_write_data(self.chat_fn)
         chat_table.grant_read_write_data(self.chat_fn)
+        if shared_query_cache:
+            query_cache_table.grant_read_write_data(self.chat_fn)
 
         # API Gateway
         self.api = apigateway.RestApi(self, "WikipediaRagApi",
@@ -88,9 +110,15 @@ class LambdaStack(Stack):
         rag_build = rag.add_resource("build")
         rag_build.add_method("POST", apigateway.LambdaIntegration(self.rag_builder_fn))
 
+        rag_build_batch = rag_build.add_resource("batch")
+        rag_build_batch.add_method("POST", apigateway.LambdaIntegration(self.rag_builder_fn))
+
         rag_status = rag.add_resource("{session_id}").add_resource("status")
         rag_status.add_method("GET", apigateway.LambdaIntegration(self.rag_builder_fn))
 
         chat = self.api.root.add_resource("chat")
         chat_query = chat.add_resource("query")
         chat_query.add_method("POST", apigateway.LambdaIntegration(self.chat_fn))
+
+        chat_query_batch = chat_query.add_resource("batch")
+        chat_query_batch.add_method("POST", apigateway.LambdaIntegration(self.chat_fn))
@@ -108,6 +108,17 @@ class StorageStack(Stack):
             time_to_live_attribute="ttl"
         )
 
+        # Query embeddings and answers shared by warm chat containers
+        self.query_cache_table = dynamodb.Table(self, "QueryCacheTable",
+            partition_key=dynamodb.Attribute(
+                name="cache_key",
+                type=dynamodb.AttributeType.STRING
+            ),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.DESTROY,
+            time_to_live_attribute="ttl"
+        )
+
         self.chat_table = dynamodb.Table(self, "ChatMessagesTable",
             partition_key=dynamodb.Attribute(
                 name="session_id",
@@ -0,0 +1,109 @@
+"""
+Benchmark for adaptive top-k retrieval with similarity cutoffs.
+
+Builds one session into an in-memory S3 stand-in and answers two kinds
+of query, first with a fixed top_k and then with the similarity cutoffs:
+questions whose text matches one chunk (a single strong hit among weak
+ones) and off-topic questions (no good hit), in each of the dense and
+hybrid retrieval modes. Reports the context tokens sent to the LLM, how
+many queries reached the LLM at all, and the similarity of the chunks
+kept (of those found by vector search, in hybrid mode). Prompt prefill
+time grows with context tokens, so fewer tokens and skipped calls
+translate into faster answers.
+
+Usage:
+    python scripts/benchmarks/bench_adaptive_topk.py --queries 200 --top-k 5
+    python scripts/benchmarks/bench_adaptive_topk.py --modes hybrid
+"""
+import argparse
+import random
+import statistics
+import sys
+
+from common import emit, hash_embedding_service, memory_s3_client, synthetic_article, \
+    FakeFetcher, StubLLM
+
+from services.rag_builder import RagBuilderService
+from src.services.chat_service import ChatService
+from src.services.context_builder import estimate_tokens
+
+
+class RecordingLLM(StubLLM):
+    """StubLLM that records the size of every context it is sent."""
+
+    def __init__(self):
+        super().__init__()
+        self.context_tokens = []
+
+    def stream_response(self, query: str, context: str, **kwargs):
+        self.context_tokens.append(estimate_tokens(context))
+        return super().stream_response(query, context, **kwargs)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--paragraphs", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--min-similarity", type=float, default=0.2)
+    parser.add_argument("--max-score-gap", type=float, default=0.15)
+    parser.add_argument("--modes", nargs="+", choices=["dense", "hybrid"],
+                        default=["dense", "hybrid"])
+    args = parser.parse_args()
+
+    s3_client = memory_s3_client()
+    embedding_service = hash_embedding_service()
+    builder = RagBuilderService("bench-bucket", embedding_service=embedding_service)
+    builder.s3_client = s3_client
+    url = "https://en.wikipedia.org/wiki/Adaptive_Benchmark"
+    builder.wiki_fetcher = FakeFetcher({url: ("Adaptive", synthetic_article(args.paragraphs))})
+    session_id = str(builder.build_rag_session(url).session_id)
+
+    rng = random.Random(0)
+    probe = ChatService(session_id, embedding_service=embedding_service, s3_client=s3_client)
+    on_topic = [
+        probe.chunk_store.text(rng.randrange(len(probe.chunk_store)))
+        for _ in range(args.queries // 2)
+    ]
+    probe.close()
+    # The hash embedder gives unrelated texts near-zero similarity
+    off_topic = [f"unrelated question number {n}" for n in range(args.queries - len(on_topic))]
+
+    cutoffs = {"min_similarity": args.min_similarity, "max_score_gap": args.max_score_gap}
+    for mode in args.modes:
+        for case, options in (("fixed", {}), ("adaptive", cutoffs)):
+            llm = RecordingLLM()
+            service = ChatService(
+                session_id, llm_service=llm, embedding_service=embedding_service,
+                s3_client=s3_client, retrieval_mode=mode, **options
+            )
+            for kind, questions in (("on_topic", on_topic), ("off_topic", off_topic)):
+                llm.context_tokens = []
+                kept, scores = [], []
+                for question in questions:
+                    retrieved = []
+                    "".join(
+                        service.process_query(question, top_k=args.top_k, retrieved=retrieved)
+                    )
+                    kept.append(len(retrieved))
+                    # Chunks only BM25 found have no similarity
+                    scores.extend(chunk.similarity_score for chunk in retrieved
+                                  if chunk.similarity_score is not None)
+                emit({
+                    "benchmark": "adaptive_topk",
+                    "mode": mode,
+                    "case": case,
+                    "queries": kind,
+                    "top_k": args.top_k,
+                    "llm_calls": len(llm.context_tokens),
+                    "chunks_kept_mean": round(statistics.mean(kept), 2),
+                    "context_tokens_mean": round(statistics.mean(llm.context_tokens), 1)
+                    if llm.context_tokens else 0,
+                    "similarity_mean": round(statistics.mean(scores), 3) if scores else None,
+                })
+            service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+Benchmark comparing batch builds with one-URL-at-a-time builds.
+
+The sequential path calls RagBuilderService.build_rag_session once per
+URL, as repeated POST /rag/build requests would. The batch path builds
+the same URLs through BatchRagBuilder with concurrent fetches and a
+process pool for encoding.
+
+Usage:
+    python scripts/benchmarks/bench_batch_build.py --articles 20 --fetch-latency 0.3
+"""
+import argparse
+import sys
+import time
+
+from common import (
+    FakeFetcher,
+    emit,
+    hash_embedding_service,
+    recording_s3_client,
+    synthetic_article,
+)
+
+from services.batch_rag_builder import BatchRagBuilder
+from services.rag_builder import RagBuilderService
+from models.rag_session import RagStatus
+
+
+def make_builder(articles, args) -> RagBuilderService:
+    service = RagBuilderService(
+        "bench-bucket",
+        embedding_service=hash_embedding_service(work_factor=args.work_factor)
+    )
+    service.s3_client = recording_s3_client()
+    service.wiki_fetcher = FakeFetcher(articles, latency_s=args.fetch_latency)
+    return service
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--articles", type=int, default=20)
+    parser.add_argument("--paragraphs", type=int, default=100)
+    parser.add_argument("--fetch-latency", type=float, default=0.3,
+                        help="Simulated seconds per Wikipedia fetch")
+    parser.add_argument("--work-factor", type=int, default=200,
+                        help="Synthetic hashing rounds per chunk to mimic encoder cost")
+    parser.add_argument("--fetch-workers", type=int, default=8)
+    parser.add_argument("--embed-workers", type=int, default=None)
+    args = parser.parse_args()
+
+    articles = {
+        f"https://en.wikipedia.org/wiki/Article_{i}":
+            (f"Article {i}", synthetic_article(args.paragraphs, seed=i))
+        for i in range(args.articles)
+    }
+    urls = list(articles)
+
+    sequential = make_builder(articles, args)
+    start = time.perf_counter()
+    sessions = [sequential.build_rag_session(url) for url in urls]
+    sequential_s = time.perf_counter() - start
+    emit({
+        "benchmark": "batch_build",
+        "mode": "sequential",
+        "articles": len(urls),
+        "succeeded": sum(1 for s in sessions if s.status == RagStatus.READY),
+        "elapsed_s": round(sequential_s, 3),
+    })
+
+    batch = BatchRagBuilder(
+        make_builder(articles, args),
+        fetch_workers=args.fetch_workers,
+        embed_workers=args.embed_workers
+    )
+    try:
+        start = time.perf_counter()
+        job = batch.build_many(urls)
+        batch_s = time.perf_counter() - start
+    finally:
+        batch.close()
+    emit({
+        "benchmark": "batch_build",
+        "mode": "batch",
+        "articles": len(urls),
+        "succeeded": job.succeeded,
+        "elapsed_s": round(batch_s, 3),
+        "speedup": round(sequential_s / batch_s, 2),
+    })
+    return 0 if job.failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
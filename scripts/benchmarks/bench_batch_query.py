@@ -0,0 +1,88 @@
+"""
+Benchmark for batched queries against one chat session.
+
+Builds one session into an in-memory S3 stand-in and answers the same
+set of distinct queries one process_query call at a time and with
+process_queries, which embeds them in one encode call, searches them in
+one FAISS call and overlaps the (stub) LLM generations. Also compares
+per-vector search with search_batch on the raw index.
+
+Usage:
+    python scripts/benchmarks/bench_batch_query.py --queries 200 --concurrency 4
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from common import (
+    StubLLM, emit, hash_embedding_service, memory_s3_client, synthetic_article, FakeFetcher
+)
+
+from services.rag_builder import RagBuilderService
+from src.services.chat_service import ChatService
+
+
+def build_session(s3_client, paragraphs: int) -> str:
+    builder = RagBuilderService("bench-bucket", embedding_service=hash_embedding_service())
+    builder.s3_client = s3_client
+    url = "https://en.wikipedia.org/wiki/Batch_Benchmark"
+    builder.wiki_fetcher = FakeFetcher({url: ("Batch Benchmark", synthetic_article(paragraphs))})
+    return str(builder.build_rag_session(url).session_id)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--paragraphs", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--llm-latency-s", type=float, default=0.01)
+    parser.add_argument("--embed-work", type=int, default=1000,
+                        help="Work factor of the hash embedding model for queries")
+    args = parser.parse_args()
+
+    s3_client = memory_s3_client()
+    session_id = build_session(s3_client, args.paragraphs)
+    service = ChatService(
+        session_id,
+        llm_service=StubLLM(latency_s=args.llm_latency_s),
+        embedding_service=hash_embedding_service(work_factor=args.embed_work),
+        s3_client=s3_client
+    )
+    queries = [f"question {n} about history and science" for n in range(args.queries)]
+
+    start = time.perf_counter()
+    for query in queries:
+        "".join(service.process_query(query))
+    sequential_ms = (time.perf_counter() - start) * 1000
+    emit({"benchmark": "batch_query", "case": "sequential", "queries": args.queries,
+          "total_ms": round(sequential_ms, 1)})
+
+    batch = service.process_queries(queries, max_concurrency=args.concurrency)
+    emit({"benchmark": "batch_query", "case": "batched", "queries": args.queries,
+          "concurrency": args.concurrency, "total_ms": batch["timings_ms"]["total"],
+          "stages_ms": batch["timings_ms"],
+          "errors": sum(1 for result in batch["results"] if result["error"])})
+
+    # Search alone, on the session's loaded index
+    vectors = np.random.default_rng(0).standard_normal(
+        (args.queries, service.vector_store.dimension)
+    ).astype("float32")
+    start = time.perf_counter()
+    for vector in vectors:
+        service.vector_store.search(vector, top_k=3)
+    per_vector_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    service.vector_store.search_batch(vectors, top_k=3)
+    batch_search_ms = (time.perf_counter() - start) * 1000
+    emit({"benchmark": "batch_query", "case": "search_only", "queries": args.queries,
+          "index_size": service.vector_store.index.ntotal,
+          "per_vector_ms": round(per_vector_ms, 2), "search_batch_ms": round(batch_search_ms, 2)})
+
+    service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
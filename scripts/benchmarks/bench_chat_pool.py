@@ -0,0 +1,106 @@
+"""
+Benchmark for the warm ChatService pool used by chat_handler.
+
+Builds a few sessions into an in-memory S3 stand-in and answers queries
+with a stub LLM, comparing a new ChatService per request with leases from
+ChatServicePool, then replays a skewed access pattern over all sessions
+with a memory budget smaller than their combined size.
+
+Usage:
+    python scripts/benchmarks/bench_chat_pool.py --sessions 8 --queries 50 --budget-fraction 0.5
+"""
+import argparse
+import random
+import sys
+import time
+
+from common import (
+    StubLLM, emit, hash_embedding_service, memory_s3_client, synthetic_article, FakeFetcher
+)
+
+from services.rag_builder import RagBuilderService
+from src.services.chat_service import ChatService
+from src.services.chat_service_pool import ChatServicePool
+
+
+def build_sessions(count: int, paragraphs: int, s3_client, embedding_service):
+    builder = RagBuilderService("bench-bucket", embedding_service=embedding_service)
+    builder.s3_client = s3_client
+    urls = {
+        f"https://en.wikipedia.org/wiki/Article_{i}":
+            (f"Article {i}", synthetic_article(paragraphs, seed=i))
+        for i in range(count)
+    }
+    builder.wiki_fetcher = FakeFetcher(urls)
+    return [str(builder.build_rag_session(url).session_id) for url in urls]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--paragraphs", type=int, default=400)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--budget-fraction", type=float, default=0.5)
+    args = parser.parse_args()
+
+    s3_client = memory_s3_client()
+    embedding_service = hash_embedding_service()
+    llm = StubLLM()
+    session_ids = build_sessions(args.sessions, args.paragraphs, s3_client, embedding_service)
+
+    def load(session_id: str) -> ChatService:
+        return ChatService(
+            session_id, llm_service=llm, embedding_service=embedding_service, s3_client=s3_client
+        )
+
+    def answer(service: ChatService, n: int) -> str:
+        return "".join(service.process_query(f"question {n} about history and science"))
+
+    # A new ChatService per request, as chat_handler used to do
+    start = time.perf_counter()
+    for n in range(args.queries):
+        service = load(session_ids[0])
+        answer(service, n)
+        service.close()
+    per_request_ms = (time.perf_counter() - start) * 1000 / args.queries
+    emit({
+        "benchmark": "chat_pool", "case": "per_request", "mean_query_ms": round(per_request_ms, 3)
+    })
+
+    pool = ChatServicePool(load, max_bytes=1 << 40)
+    start = time.perf_counter()
+    for n in range(args.queries):
+        with pool.lease(session_ids[0]) as service:
+            answer(service, n)
+    pooled_ms = (time.perf_counter() - start) * 1000 / args.queries
+    emit({"benchmark": "chat_pool", "case": "pooled", "mean_query_ms": round(pooled_ms, 3),
+          **pool.stats()})
+    total_bytes = pool.resident_bytes * args.sessions
+    pool.clear()
+
+    # Skewed traffic over every session with room for only part of them
+    budget = int(total_bytes * args.budget_fraction)
+    pool = ChatServicePool(load, max_bytes=budget)
+    rng = random.Random(0)
+    weights = [1 / (rank + 1) for rank in range(args.sessions)]
+    start = time.perf_counter()
+    for n in range(args.queries * args.sessions):
+        session_id = rng.choices(session_ids, weights)[0]
+        with pool.lease(session_id) as service:
+            answer(service, n)
+    lru_ms = (time.perf_counter() - start) * 1000 / (args.queries * args.sessions)
+    stats = pool.stats()
+    emit({
+        "benchmark": "chat_pool",
+        "case": "lru",
+        "budget_bytes": budget,
+        "mean_query_ms": round(lru_ms, 3),
+        "hit_rate": round(stats["hits"] / (stats["hits"] + stats["misses"]), 3),
+        **stats,
+    })
+    pool.clear()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+Benchmark comparing chunks.json with the memory-mapped chunks.bin store.
+
+For each chunk count, both formats are written to a temporary directory
+and then loaded in a fresh subprocess, which reports load time, the RSS
+added by loading, and the mean time of a 3-chunk lookup.
+
+Usage:
+    python scripts/benchmarks/bench_chunk_store.py --chunks 1000 10000 50000
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+from common import current_rss_mb, emit, synthetic_article
+
+from services.chunk_store import ChunkStore, ChunkStoreWriter
+
+LOOKUPS = 1000
+
+
+def write_files(directory: str, count: int):
+    paragraphs = synthetic_article(64).split("\n\n")
+    json_path = os.path.join(directory, "chunks.json")
+    bin_path = os.path.join(directory, "chunks.bin")
+    chunks_data = []
+    with ChunkStoreWriter(bin_path) as writer:
+        for position in range(count):
+            text = paragraphs[position % len(paragraphs)][:1000]
+            chunk_id = str(uuid.uuid4())
+            writer.append(text, position, chunk_id)
+            chunks_data.append({"chunk_id": chunk_id, "position": position, "content": text})
+    with open(json_path, "w") as f:
+        json.dump(chunks_data, f)
+    return json_path, bin_path
+
+
+def measure(fmt: str, path: str, count: int):
+    """Runs in the child process: load one format and time lookups."""
+    rng = random.Random(0)
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    if fmt == "json":
+        with open(path) as f:
+            chunk_map = {item["position"]: item["content"] for item in json.load(f)}
+        lookup = chunk_map.get
+    else:
+        store = ChunkStore(path)
+        lookup = store.get
+    load_ms = (time.perf_counter() - start) * 1000
+    rss_after_load = current_rss_mb()
+
+    start = time.perf_counter()
+    for _ in range(LOOKUPS):
+        for position in rng.sample(range(count), 3):
+            lookup(position)
+    lookup_us = (time.perf_counter() - start) * 1e6 / LOOKUPS
+
+    emit({
+        "benchmark": "chunk_store",
+        "format": fmt,
+        "chunks": count,
+        "file_mb": round(os.path.getsize(path) / (1024 * 1024), 3),
+        "load_ms": round(load_ms, 3),
+        "rss_added_mb": round(rss_after_load - rss_before, 3),
+        "lookup_3_us": round(lookup_us, 3),
+    })
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chunks", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--child", nargs=3, metavar=("FORMAT", "PATH", "COUNT"),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        fmt, path, count = args.child
+        measure(fmt, path, int(count))
+        return 0
+
+    for count in args.chunks:
+        with tempfile.TemporaryDirectory() as directory:
+            json_path, bin_path = write_files(directory, count)
+            for fmt, path in (("json", json_path), ("bin", bin_path)):
+                subprocess.run(
+                    [sys.executable, __file__, "--child", fmt, path, str(count)], check=True
+                )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Benchmark for token-budgeted context assembly.
+
+Builds one session into an in-memory S3 stand-in and compares, per
+query, the context the chat path used to send (the top-k chunks joined
+verbatim) with ContextBuilder's output: estimated prompt tokens, bytes
+repeated from chunk overlap, and assembly time. Besides ordinary search
+results it replays runs of adjacent chunks, as retrieved for questions
+answered by one passage of the article.
+
+Usage:
+    python scripts/benchmarks/bench_context_builder.py --queries 200 --top-k 5 --budget 1024
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+
+from common import emit, hash_embedding_service, memory_s3_client, synthetic_article, FakeFetcher
+
+from services.rag_builder import RagBuilderService
+from src.services.chat_service import ChatService
+from src.services.context_builder import ContextBuilder, estimate_tokens
+
+
+def verbatim(chunk_store, vector_ids) -> str:
+    """The previous assembly: every retrieved chunk, joined as is."""
+    return "\n\n".join(
+        text for text in (chunk_store.get(i) for i in vector_ids if i != -1) if text is not None
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--paragraphs", type=int, default=400)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--budget", type=int, default=1024)
+    parser.add_argument("--sentences", type=int, nargs=2, default=(12, 24),
+                        help="Sentences per paragraph; long paragraphs are split with overlap")
+    args = parser.parse_args()
+
+    s3_client = memory_s3_client()
+    embedding_service = hash_embedding_service()
+    builder = RagBuilderService("bench-bucket", embedding_service=embedding_service)
+    builder.s3_client = s3_client
+    url = "https://en.wikipedia.org/wiki/Context_Benchmark"
+    builder.wiki_fetcher = FakeFetcher({url: ("Context", synthetic_article(
+        args.paragraphs, sentence_range=tuple(args.sentences)
+    ))})
+    session_id = str(builder.build_rag_session(url).session_id)
+    service = ChatService(session_id, embedding_service=embedding_service, s3_client=s3_client)
+    chunk_store = service.chunk_store
+    context_builder = ContextBuilder(max_tokens=args.budget)
+
+    rng = random.Random(0)
+    searched = [
+        service.vector_store.search(
+            embedding_service.generate_embeddings([f"question {n}"])[0], top_k=args.top_k
+        )[1]
+        for n in range(args.queries)
+    ]
+    adjacent = []
+    for _ in range(args.queries):
+        start = rng.randrange(len(chunk_store) - args.top_k)
+        run = [chunk_store.vector_id(p) for p in range(start, start + args.top_k)]
+        rng.shuffle(run)
+        adjacent.append(run)
+
+    for case, workload in (("search_results", searched), ("adjacent_chunks", adjacent)):
+        before, after, saved_chars, truncated, build_ms = [], [], [], 0, []
+        for vector_ids in workload:
+            old = verbatim(chunk_store, vector_ids)
+            start = time.perf_counter()
+            built = context_builder.build(chunk_store, vector_ids)
+            build_ms.append((time.perf_counter() - start) * 1000)
+            before.append(estimate_tokens(old))
+            after.append(built.tokens)
+            truncated += built.truncated
+            if not built.truncated:
+                saved_chars.append(len(old) - len(built.text))
+        emit({
+            "benchmark": "context_builder",
+            "case": case,
+            "top_k": args.top_k,
+            "budget_tokens": args.budget,
+            "num_ctx": context_builder.num_ctx,
+            "verbatim_tokens_mean": round(statistics.mean(before), 1),
+            "verbatim_tokens_max": max(before),
+            "built_tokens_mean": round(statistics.mean(after), 1),
+            "built_tokens_max": max(after),
+            "overlap_chars_removed_mean": round(statistics.mean(saved_chars), 1)
+            if saved_chars else None,
+            "truncated": truncated,
+            "build_ms_mean": round(statistics.mean(build_ms), 3),
+        })
+    service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
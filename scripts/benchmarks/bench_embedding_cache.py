@@ -0,0 +1,79 @@
+"""
+Benchmark for the on-disk embedding cache.
+
+Builds the same article several times with the cache enabled and
+reports build time and cache counters per build. The first build is
+all misses; rebuilds should skip encoding entirely.
+
+Usage:
+    python scripts/benchmarks/bench_embedding_cache.py --builds 3 --paragraphs 400
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from common import (
+    FakeFetcher,
+    HashModel,
+    emit,
+    recording_s3_client,
+    synthetic_article,
+)
+
+from services.embedding_cache import EmbeddingCache
+from services.embedding_service import EmbeddingService
+from services.rag_builder import RagBuilderService
+from models.rag_session import RagStatus
+
+URL = "https://en.wikipedia.org/wiki/Benchmark_article"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--builds", type=int, default=3)
+    parser.add_argument("--paragraphs", type=int, default=400)
+    parser.add_argument("--work-factor", type=int, default=500,
+                        help="Synthetic hashing rounds per chunk to mimic encoder cost")
+    parser.add_argument("--max-entries", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = EmbeddingCache(
+            os.path.join(cache_dir, "embeddings.sqlite3"), max_entries=args.max_entries
+        )
+        service = RagBuilderService(
+            "bench-bucket",
+            embedding_service=EmbeddingService(
+                "hash-embedding", model=HashModel(work_factor=args.work_factor), cache=cache
+            )
+        )
+        service.s3_client = recording_s3_client()
+        article = synthetic_article(args.paragraphs)
+        service.wiki_fetcher = FakeFetcher({URL: ("Benchmark article", article)})
+
+        for n in range(1, args.builds + 1):
+            before = cache.stats()
+            start = time.perf_counter()
+            session = service.build_rag_session(URL)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if session.status != RagStatus.READY:
+                print(f"FAILURE: {session.metadata.error_message}")
+                return 1
+            after = cache.stats()
+            emit({
+                "benchmark": "embedding_cache",
+                "build": n,
+                "chunk_count": session.chunk_count,
+                "elapsed_ms": round(elapsed_ms, 2),
+                "hits": after["hits"] - before["hits"],
+                "misses": after["misses"] - before["misses"],
+                "entries": after["entries"],
+            })
+        cache.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+Benchmark for the revision-aware article fetch cache.
+
+Runs WikipediaFetcher against a local MediaWiki stand-in and reports the
+latency of a cold fetch, a fetch within the TTL, a fetch through a
+redirect to the cached article, a revalidated fetch (TTL expired,
+revision unchanged) and a refetch after a new revision, together with
+the requests each one sent.
+
+Usage:
+    python scripts/benchmarks/bench_fetch_cache.py --paragraphs 800
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from common import emit, synthetic_article
+from stand_ins import MockWikipediaServer
+
+from services.article_cache import ArticleCache
+from services.wikipedia_fetcher import WikipediaFetcher
+
+TITLE = "Benchmark article"
+URL = "https://en.wikipedia.org/wiki/Benchmark_article"
+REDIRECT = "Benchmark page"
+REDIRECT_URL = "https://en.wikipedia.org/wiki/Benchmark_page"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--paragraphs", type=int, default=800)
+    args = parser.parse_args()
+
+    with MockWikipediaServer() as wiki, tempfile.TemporaryDirectory() as cache_dir:
+        wiki.set_article(TITLE, synthetic_article(args.paragraphs))
+        cache = ArticleCache(os.path.join(cache_dir, "articles.sqlite3"))
+        fetcher = WikipediaFetcher(cache=cache, cache_ttl_s=3600)
+        wiki.serve(fetcher)
+
+        def fetch(case: str, url: str = URL):
+            before = dict(wiki.requests)
+            start = time.perf_counter()
+            title, content = fetcher.fetch_article(url)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            sent = {prop: n - before.get(prop, 0) for prop, n in wiki.requests.items()}
+            emit({
+                "benchmark": "fetch_cache",
+                "case": case,
+                "content_chars": len(content),
+                "elapsed_ms": round(elapsed_ms, 3),
+                "requests": {prop: n for prop, n in sent.items() if n},
+            })
+
+        fetch("cold")
+        fetch("within_ttl")
+
+        wiki.redirects[REDIRECT] = TITLE
+        fetch("redirect", REDIRECT_URL)
+
+        fetcher.cache_ttl_s = 0
+        fetch("revalidated")
+
+        wiki.set_article(TITLE, synthetic_article(args.paragraphs, seed=1))
+        fetch("new_revision")
+
+        emit({"benchmark": "fetch_cache", "case": "totals", **cache.stats()})
+        cache.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,295 @@
+"""
+Benchmark for write-behind chat history persistence.
+
+Persists the Query and two ChatMessages of each answered query into
+DynamoDB tables mocked with moto, whose calls are delayed by --rtt-ms to
+stand in for the network round trip. Compares a put_item per record
+inside the query ("inline") with HistoryWriter, whose add calls only
+buffer ("write_behind"): per invocation of --queries-per-invocation
+queries, it reports the time persistence adds to the queries themselves,
+the time of the flush a Lambda handler runs before returning, and the
+DynamoDB calls made. With --unprocessed a share of every batch is left
+unprocessed, as under throttling, to exercise the retries.
+
+It then times whole chat_handler invocations, flush included, against a
+session in an in-memory S3 stand-in with a stub LLM: without history
+("handler_none"), with a put_item per record ("handler_inline") and with
+the handler's HistoryWriter ("handler_write_behind").
+
+Usage:
+    python scripts/benchmarks/bench_history_writer.py --invocations 50 --rtt-ms 8
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from uuid import uuid4
+
+from common import (
+    FakeFetcher, StubLLM, emit, hash_embedding_service, memory_s3_client, percentile,
+    synthetic_article
+)
+
+import boto3
+from moto import mock_aws
+
+from services.rag_builder import RagBuilderService
+from src.api.lambda_handlers import chat_handler
+from src.models.chat_message import ChatMessage, MessageMetadata, MessageRole
+from src.models.query import LatencyMetrics, Query, QueryMetadata, RetrievedChunk
+from src.services.chat_service import ChatService
+from src.services.history_writer import HistoryWriter, to_item
+
+
+class SlowClient:
+    """DynamoDB client whose calls take rtt_s longer, and whose batches leave
+    a share of their items unprocessed."""
+
+    def __init__(self, client, rtt_s: float, unprocessed: float):
+        self.client = client
+        self.rtt_s = rtt_s
+        self.unprocessed = unprocessed
+        self.rng = random.Random(0)
+        self.calls = 0
+
+    def put_item(self, **kwargs):
+        self.calls += 1
+        time.sleep(self.rtt_s)
+        return self.client.put_item(**kwargs)
+
+    def batch_write_item(self, RequestItems):
+        self.calls += 1
+        time.sleep(self.rtt_s)
+        written, left = {}, {}
+        for table, requests in RequestItems.items():
+            for request in requests:
+                target = left if self.rng.random() < self.unprocessed else written
+                target.setdefault(table, []).append(request)
+        if written:
+            self.client.batch_write_item(RequestItems=written)
+        return {"UnprocessedItems": left}
+
+
+def create_tables(client, case: str):
+    """Creates the queries and chat_messages tables of a case; returns their names."""
+    names = (f"{case}_queries", f"{case}_chat_messages")
+    for name in names:
+        client.create_table(
+            TableName=name,
+            BillingMode="PAY_PER_REQUEST",
+            KeySchema=[
+                {"AttributeName": "session_id", "KeyType": "HASH"},
+                {"AttributeName": "created_at", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "session_id", "AttributeType": "S"},
+                {"AttributeName": "created_at", "AttributeType": "S"},
+            ]
+        )
+    return names
+
+
+def count_items(client, table: str) -> int:
+    pages = client.get_paginator("scan").paginate(TableName=table, Select="COUNT")
+    return sum(page["Count"] for page in pages)
+
+
+def exchange(session_id, n: int):
+    """
+    The records process_query hands over for one answered query, as
+    (is_query, record) pairs; is_query is False for a ChatMessage.
+    """
+    query = Query(
+        session_id=session_id,
+        query_text=f"What happened to the empire in {1500 + n}?",
+        retrieved_chunks=[RetrievedChunk(chunk_id=uuid4(), position=p, similarity_score=0.5)
+                          for p in range(3)],
+        response_text="The empire expanded. " * 20,
+        latency_ms=LatencyMetrics(retrieval=12, llm_inference=900, total=950),
+        metadata=QueryMetadata()
+    )
+    question = ChatMessage(session_id=session_id, content=query.query_text, role=MessageRole.USER)
+    reply = ChatMessage(
+        session_id=session_id, query_id=query.query_id, content=query.response_text,
+        role=MessageRole.ASSISTANT, metadata=MessageMetadata(token_count=60)
+    )
+    return [(False, question), (True, query), (False, reply)]
+
+
+class InlineWriter:
+    """HistoryWriter stand-in that puts every record as it is added."""
+
+    def __init__(self, client: SlowClient, tables):
+        from boto3.dynamodb.types import TypeSerializer
+        self.client = client
+        self.tables = tables
+        self.serializer = TypeSerializer()
+
+    def _put(self, table: str, record):
+        item = {k: self.serializer.serialize(v) for k, v in to_item(record).items()}
+        self.client.put_item(TableName=table, Item=item)
+
+    def add_query(self, query: Query):
+        self._put(self.tables[0], query)
+
+    def add_message(self, message: ChatMessage):
+        self._put(self.tables[1], message)
+
+    def flush(self, max_retries=None, wait=True) -> int:
+        return 0
+
+    def close(self):
+        pass
+
+    def stats(self):
+        return None
+
+
+def run_inline(client: SlowClient, tables, args) -> dict:
+    writer = InlineWriter(client, tables)
+    query_ms = []
+    for _ in range(args.invocations):
+        session_id = uuid4()
+        for n in range(args.queries_per_invocation):
+            start = time.perf_counter()
+            for is_query, record in exchange(session_id, n):
+                if is_query:
+                    writer.add_query(record)
+                else:
+                    writer.add_message(record)
+            query_ms.append((time.perf_counter() - start) * 1000)
+    return {"query_ms": query_ms, "flush_ms": [0.0]}
+
+
+def run_write_behind(client: SlowClient, tables, args) -> dict:
+    writer = HistoryWriter(
+        tables[0], tables[1], client=client, flush_interval_s=60, emit_metrics=False,
+        retry_base_s=0.001
+    )
+    query_ms, flush_ms = [], []
+    for _ in range(args.invocations):
+        session_id = uuid4()
+        for n in range(args.queries_per_invocation):
+            start = time.perf_counter()
+            for is_query, record in exchange(session_id, n):
+                if is_query:
+                    writer.add_query(record)
+                else:
+                    writer.add_message(record)
+            query_ms.append((time.perf_counter() - start) * 1000)
+        # What chat_handler does before returning
+        start = time.perf_counter()
+        writer.flush(max_retries=0, wait=False)
+        flush_ms.append((time.perf_counter() - start) * 1000)
+    writer.close()
+    return {"query_ms": query_ms, "flush_ms": flush_ms, "writer": writer.stats()}
+
+
+def build_session(s3_client, embedding_service) -> str:
+    builder = RagBuilderService("bench-bucket", embedding_service=embedding_service)
+    builder.s3_client = s3_client
+    url = "https://en.wikipedia.org/wiki/History_Benchmark"
+    builder.wiki_fetcher = FakeFetcher({url: ("History Benchmark", synthetic_article(40))})
+    return str(builder.build_rag_session(url).session_id)
+
+
+def run_handler(writer, args) -> list:
+    """Times chat_handler invocations with writer as its history writer."""
+    s3_client = memory_s3_client()
+    embedding_service = hash_embedding_service()
+    session_id = build_session(s3_client, embedding_service)
+    chat_handler.history_writer = writer
+    chat_handler.chat_pool.factory = lambda sid: ChatService(
+        sid, llm_service=StubLLM(), embedding_service=embedding_service,
+        s3_client=s3_client, history_writer=writer
+    )
+    chat_handler.chat_pool.clear()
+    queries = [f"What happened to the empire in {1500 + n}?"
+               for n in range(args.queries_per_invocation)]
+    if len(queries) == 1:
+        event = {"path": "/chat/query", "httpMethod": "POST",
+                 "body": json.dumps({"session_id": session_id, "query": queries[0]})}
+    else:
+        event = {"path": "/chat/query/batch", "httpMethod": "POST",
+                 "body": json.dumps({"session_id": session_id, "queries": queries})}
+
+    handler_ms = []
+    for _ in range(args.invocations):
+        start = time.perf_counter()
+        response = chat_handler.handler(event, None)
+        handler_ms.append((time.perf_counter() - start) * 1000)
+        assert response["statusCode"] == 200, response["body"]
+    chat_handler.chat_pool.clear()
+    return handler_ms
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--invocations", type=int, default=50)
+    parser.add_argument("--queries-per-invocation", type=int, default=1,
+                        help="1 for /chat/query; more for /chat/query/batch")
+    parser.add_argument("--rtt-ms", type=float, default=8.0,
+                        help="Added latency of each DynamoDB call")
+    parser.add_argument("--unprocessed", type=float, default=0.0,
+                        help="Share of batched items left unprocessed per call")
+    args = parser.parse_args()
+
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    with mock_aws():
+        dynamodb = boto3.client("dynamodb")
+        for case, run in (("inline", run_inline), ("write_behind", run_write_behind)):
+            tables = create_tables(dynamodb, case)
+            client = SlowClient(dynamodb, args.rtt_ms / 1000, args.unprocessed)
+            result = run(client, tables, args)
+            queries = args.invocations * args.queries_per_invocation
+            stored = sum(count_items(dynamodb, name) for name in tables)
+            emit({
+                "benchmark": "history_writer",
+                "case": case,
+                "queries": queries,
+                "rtt_ms": args.rtt_ms,
+                "unprocessed": args.unprocessed,
+                "added_query_ms_mean": round(statistics.mean(result["query_ms"]), 3),
+                "flush_ms_mean": round(statistics.mean(result["flush_ms"]), 2),
+                "dynamodb_calls_per_invocation": round(client.calls / args.invocations, 2),
+                "writer": result.get("writer"),
+            })
+            if stored != queries * 3:
+                print(f"{case}: stored {stored} of {queries * 3} records")
+                return 1
+
+        for case in ("none", "inline", "write_behind"):
+            client = SlowClient(dynamodb, args.rtt_ms / 1000, args.unprocessed)
+            if case == "none":
+                writer = None
+            elif case == "inline":
+                writer = InlineWriter(client, create_tables(dynamodb, "handler_inline"))
+            else:
+                writer = HistoryWriter(
+                    *create_tables(dynamodb, "handler_write_behind"), client=client,
+                    flush_interval_s=60, emit_metrics=False, retry_base_s=0.001
+                )
+            handler_ms = run_handler(writer, args)
+            if writer is not None:
+                writer.close()
+            emit({
+                "benchmark": "history_writer",
+                "case": f"handler_{case}",
+                "invocations": args.invocations,
+                "queries_per_invocation": args.queries_per_invocation,
+                "rtt_ms": args.rtt_ms,
+                "unprocessed": args.unprocessed,
+                "handler_ms_p50": round(statistics.median(handler_ms), 2),
+                "handler_ms_p95": round(percentile(handler_ms, 0.95), 2),
+                "dynamodb_calls_per_invocation": round(client.calls / args.invocations, 2),
+                "writer": writer.stats() if writer is not None else None,
+            })
+        chat_handler.history_writer = None
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+Benchmark for dense, lexical (BM25) and hybrid retrieval.
+
+Builds one session into an in-memory S3 stand-in and asks questions
+naming a year and a topic word taken from a random chunk, the kind of
+exact-term query embeddings tend to miss. Reports recall@k of the source
+chunk, retrieval latency per mode and the size of the lexical index next
+to the vector index. With the hash embedder dense recall is a chance-level
+floor; run with --real-model to measure the actual embedding model.
+
+Usage:
+    python scripts/benchmarks/bench_hybrid_retrieval.py --queries 200 --top-k 3
+"""
+import argparse
+import os
+import random
+import re
+import statistics
+import sys
+import time
+
+from common import emit, hash_embedding_service, memory_s3_client, synthetic_article, FakeFetcher
+
+from services.embedding_service import EmbeddingService
+from services.rag_builder import RagBuilderService
+from src.services.chat_service import ChatService, RETRIEVAL_MODES
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--paragraphs", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--real-model", action="store_true",
+                        help="Use the configured SentenceTransformer instead of hash embeddings")
+    args = parser.parse_args()
+
+    s3_client = memory_s3_client()
+    embedding_service = EmbeddingService() if args.real_model else hash_embedding_service()
+    builder = RagBuilderService("bench-bucket", embedding_service=embedding_service)
+    builder.s3_client = s3_client
+    url = "https://en.wikipedia.org/wiki/Hybrid_Benchmark"
+    builder.wiki_fetcher = FakeFetcher({url: ("Hybrid", synthetic_article(args.paragraphs))})
+    session_id = str(builder.build_rag_session(url).session_id)
+    service = ChatService(session_id, embedding_service=embedding_service, s3_client=s3_client)
+    chunk_store = service.chunk_store
+
+    rng = random.Random(0)
+    questions = []
+    while len(questions) < args.queries:
+        position = rng.randrange(len(chunk_store))
+        sentences = re.findall(r"([A-Za-z ]+) in (\d{4})\.", chunk_store.text(position))
+        if not sentences:
+            continue
+        words, year = rng.choice(sentences)
+        topic = rng.choice(words.split()).lower()
+        question = f"What happened to the {topic} in {year}?"
+        questions.append((question, chunk_store.vector_id(position)))
+
+    for mode in RETRIEVAL_MODES:
+        hits, latencies = 0, []
+        for question, expected in questions:
+            vectors = [None] if mode == "lexical" else service._embed_queries([question])
+            start = time.perf_counter()
+            retrieved = service._retrieve([question], vectors, args.top_k, mode)[0]
+            latencies.append((time.perf_counter() - start) * 1000)
+            hits += expected in [vector_id for vector_id, _ in retrieved]
+        emit({
+            "benchmark": "hybrid_retrieval",
+            "mode": mode,
+            "chunks": len(chunk_store),
+            "top_k": args.top_k,
+            "recall_at_k": round(hits / len(questions), 3),
+            "retrieval_ms_mean": round(statistics.mean(latencies), 3),
+            "retrieval_ms_p99": round(sorted(latencies)[int(0.99 * (len(latencies) - 1))], 3),
+        })
+
+    emit({
+        "benchmark": "hybrid_retrieval",
+        "case": "artifact_size",
+        "lexical_bytes": os.path.getsize(service.lexical_index.path),
+        "index_bytes": os.path.getsize(os.path.join(service.tmp_dir, "index.faiss")),
+        "chunks_bytes": os.path.getsize(chunk_store.path),
+    })
+    service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Benchmark comparing the exported index types of VectorStoreService.
+
+For each chunk count, random clustered vectors are indexed as every type
+in services.index_factory. Reports the written file size, build time,
+mean single-query search latency and recall@3 against exact flat search.
+
+Usage:
+    python scripts/benchmarks/bench_index_types.py --chunks 2000 20000 50000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from common import emit
+
+from services.index_factory import INDEX_TYPES, choose_index_type, resolve_index_spec
+from services.vector_store import VectorStoreService
+
+DIMENSION = 384
+QUERIES = 200
+TOP_K = 3
+
+
+def clustered_vectors(count: int, rng: np.random.Generator) -> np.ndarray:
+    """Unit vectors around a few hundred centres, roughly like article chunks."""
+    centres = rng.standard_normal((max(1, count // 50), DIMENSION)).astype("float32")
+    vectors = centres[rng.integers(0, len(centres), count)]
+    vectors += 0.3 * rng.standard_normal((count, DIMENSION)).astype("float32")
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chunks", type=int, nargs="+", default=[2000, 20000, 50000])
+    parser.add_argument("--types", nargs="+", default=list(INDEX_TYPES), choices=INDEX_TYPES)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for count in args.chunks:
+        vectors = clustered_vectors(count, rng)
+        queries = vectors[rng.integers(0, count, QUERIES)] + 0.05 * rng.standard_normal(
+            (QUERIES, DIMENSION)
+        ).astype("float32")
+
+        store = VectorStoreService(DIMENSION)
+        store.add_vectors(vectors)
+        _, exact = store.index.search(queries, TOP_K)
+
+        with tempfile.TemporaryDirectory() as directory:
+            for index_type in args.types:
+                spec = resolve_index_spec(index_type, count, DIMENSION)
+                start = time.perf_counter()
+                path = store.save_local(directory, index_type, spec)
+                build_ms = (time.perf_counter() - start) * 1000
+
+                reader = VectorStoreService(DIMENSION)
+                reader.load_local(path)
+                found = []
+                start = time.perf_counter()
+                for query in queries:
+                    found.append(reader.search(query, top_k=TOP_K)[1])
+                search_us = (time.perf_counter() - start) * 1e6 / QUERIES
+                recall = np.mean([
+                    len(set(ids) & set(truth)) / TOP_K for ids, truth in zip(found, exact.tolist())
+                ])
+
+                emit({
+                    "benchmark": "index_types",
+                    "chunks": count,
+                    "requested": index_type,
+                    "index_type": spec.index_type,
+                    "default": choose_index_type(count) == index_type,
+                    "params": spec.params,
+                    "file_mb": round(os.path.getsize(path) / (1024 * 1024), 3),
+                    "build_ms": round(build_ms, 1),
+                    "search_us": round(search_us, 1),
+                    "recall_at_3": round(float(recall), 3),
+                })
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
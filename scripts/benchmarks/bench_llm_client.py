@@ -0,0 +1,94 @@
+"""
+Benchmark for LLMService's HTTP client against a local mock Ollama.
+
+Compares one connection per query (the previous requests.post calls)
+with the pooled keep-alive session, measures how long a hung Ollama
+holds a query with the read timeout, and runs concurrent generations
+on threads sharing the pooled session, as the streaming app does.
+
+Usage:
+    python scripts/benchmarks/bench_llm_client.py --queries 20 --connect-delay-s 0.05
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from common import emit
+from stand_ins import MockOllamaServer
+
+from src.services.llm_service import LLM_ERROR_PREFIX, LLMService
+
+
+def timed_answers(llm: LLMService, queries: int) -> float:
+    start = time.perf_counter()
+    for n in range(queries):
+        answer = "".join(llm.stream_response(f"question {n}", "context"))
+        assert not answer.startswith(LLM_ERROR_PREFIX), answer
+    return (time.perf_counter() - start) * 1000 / queries
+
+
+def concurrent_answers(llm: LLMService, queries: int) -> float:
+    def answer(n: int) -> str:
+        return "".join(llm.stream_response(f"question {n}", "ctx"))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=queries) as pool:
+        answers = list(pool.map(answer, range(queries)))
+    assert not any(a.startswith(LLM_ERROR_PREFIX) for a in answers)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    llm.close()
+    return elapsed_ms
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--tokens", type=int, default=20)
+    parser.add_argument("--connect-delay-s", type=float, default=0.05)
+    parser.add_argument("--hang-s", type=float, default=5.0)
+    parser.add_argument("--read-timeout-s", type=float, default=1.0)
+    args = parser.parse_args()
+
+    tokens = [f" token{i}" for i in range(args.tokens)]
+    with MockOllamaServer(
+        tokens=tokens, first_token_delay_s=0.0, token_delay_s=0.0,
+        connect_delay_s=args.connect_delay_s
+    ) as ollama:
+        # A new connection per query, as when LLMService called requests.post
+        per_request = LLMService(ollama.base_url)
+        per_request.session = requests
+        mean_ms = timed_answers(per_request, args.queries)
+        emit({"benchmark": "llm_client", "case": "connection_per_query",
+              "mean_query_ms": round(mean_ms, 2), "connections": ollama.connections})
+
+        ollama.connections = 0
+        pooled = LLMService(ollama.base_url)
+        mean_ms = timed_answers(pooled, args.queries)
+        emit({"benchmark": "llm_client", "case": "pooled_session",
+              "mean_query_ms": round(mean_ms, 2), "connections": ollama.connections})
+        pooled.close()
+
+        ollama.connections = 0
+        threaded = LLMService(ollama.base_url, pool_maxsize=args.queries)
+        elapsed_ms = concurrent_answers(threaded, args.queries)
+        emit({"benchmark": "llm_client", "case": "threaded_concurrent",
+              "queries": args.queries, "elapsed_ms": round(elapsed_ms, 2),
+              "connections": ollama.connections})
+
+    with MockOllamaServer(tokens=tokens, first_token_delay_s=args.hang_s) as ollama:
+        llm = LLMService(ollama.base_url, read_timeout_s=args.read_timeout_s)
+        start = time.perf_counter()
+        answer = "".join(llm.stream_response("question", "context"))
+        emit({"benchmark": "llm_client", "case": "hung_server",
+              "hang_s": args.hang_s, "read_timeout_s": args.read_timeout_s,
+              "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+              "errored": answer.startswith(LLM_ERROR_PREFIX)})
+        llm.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Benchmark for LLMDispatcher admission control under a burst of queries.
+
+A local mock Ollama models a host that thrashes once more than
+--parallel generations run at once. A burst of --clients concurrent
+generations is sent straight to LLMService and then through
+LLMDispatcher; latency percentiles of completed generations, rejections
+(429s) and the wall time of the burst are reported.
+
+Usage:
+    python scripts/benchmarks/bench_llm_dispatch.py --clients 24 --parallel 2 --max-queue 8
+"""
+import argparse
+import statistics
+import sys
+import threading
+import time
+
+from common import emit
+from stand_ins import MockOllamaServer
+
+from src.services.llm_dispatcher import LLMDispatcher
+from src.services.llm_service import LLMService
+from src.utils.error_handling import AppError
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def burst(llm, clients: int):
+    latencies, rejected = [], []
+    lock = threading.Lock()
+
+    def client(n: int):
+        start = time.perf_counter()
+        try:
+            "".join(llm.stream_response(f"question {n}", "context"))
+        except AppError:
+            with lock:
+                rejected.append((time.perf_counter() - start) * 1000)
+            return
+        with lock:
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, rejected, (time.perf_counter() - start) * 1000
+
+
+def report(case: str, latencies, rejected, wall_ms: float, **extra):
+    emit({
+        "benchmark": "llm_dispatch",
+        "case": case,
+        "completed": len(latencies),
+        "rejected": len(rejected),
+        "p50_ms": round(statistics.median(latencies), 1) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99), 1) if latencies else None,
+        "max_reject_ms": round(max(rejected), 1) if rejected else None,
+        "wall_ms": round(wall_ms, 1),
+        **extra,
+    })
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=24)
+    parser.add_argument("--parallel", type=int, default=2)
+    parser.add_argument("--tokens", type=int, default=20)
+    parser.add_argument("--token-delay-s", type=float, default=0.01)
+    parser.add_argument("--max-queue", type=int, default=8)
+    parser.add_argument("--queue-timeout-s", type=float, default=5.0)
+    args = parser.parse_args()
+
+    with MockOllamaServer(
+        tokens=[f" token{i}" for i in range(args.tokens)],
+        first_token_delay_s=0.05,
+        token_delay_s=args.token_delay_s,
+        parallel=args.parallel
+    ) as ollama:
+        llm = LLMService(ollama.base_url, pool_maxsize=args.clients)
+        report("direct", *burst(llm, args.clients))
+
+        dispatcher = LLMDispatcher(
+            llm,
+            max_concurrency=args.parallel,
+            max_queue=args.max_queue,
+            queue_timeout_s=args.queue_timeout_s,
+            emit_metrics=False
+        )
+        report("dispatcher", *burst(dispatcher, args.clients),
+               timed_out=dispatcher.timed_out, max_wait_ms=round(dispatcher.max_wait_ms, 1))
+        llm.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
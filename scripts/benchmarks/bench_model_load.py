@@ -0,0 +1,71 @@
+"""
+Cold-start benchmark for the embedding model registry.
+
+Each mode runs in a fresh subprocess that imports chat_handler (the
+Lambda init phase) and then embeds two queries. Reports init time, the
+latency of the first and second embed, and the registry's load stats,
+with the model loaded lazily and preloaded during init.
+
+Usage:
+    python scripts/benchmarks/bench_model_load.py --model-dir /opt/models
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from common import emit
+
+
+def measure(mode: str):
+    """Runs in the child process."""
+    start = time.perf_counter()
+    from src.api.lambda_handlers import chat_handler
+    init_ms = (time.perf_counter() - start) * 1000
+
+    # Model loads are emitted as EMF lines on stdout; keep ours parseable
+    latencies = []
+    for query in ("first query", "second query"):
+        start = time.perf_counter()
+        chat_handler.embedding_service.generate_embeddings([query])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    from services import model_registry
+    emit({
+        "benchmark": "model_load",
+        "mode": mode,
+        "init_ms": round(init_ms, 1),
+        "first_embed_ms": round(latencies[0], 1),
+        "second_embed_ms": round(latencies[1], 1),
+        "load_stats": model_registry.load_stats(),
+    })
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--model-dir", help="Directory of pre-packaged models")
+    parser.add_argument("--child", choices=["lazy", "preload"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        measure(args.child)
+        return 0
+
+    for mode in ("lazy", "preload"):
+        env = dict(os.environ, EMBEDDING_MODEL_PRELOAD=str(mode == "preload").lower())
+        if args.model_dir:
+            env["EMBEDDING_MODEL_DIR"] = args.model_dir
+        result = subprocess.run(
+            [sys.executable, __file__, "--child", mode],
+            env=env, check=True, capture_output=True, text=True
+        )
+        for line in result.stdout.splitlines():
+            if '"benchmark": "model_load"' in line:
+                emit(json.loads(line))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Benchmark for the query embedding and answer caches on the chat path.
+
+Builds one session into an in-memory S3 stand-in and replays a workload
+where a fraction of queries repeat earlier ones (with varied case and
+punctuation), using a slow hash embedding model and a stub LLM with fixed
+latency. Compares no cache, the in-process cache, and a second "container"
+that only shares the DynamoDB level (moto) with the first.
+
+Usage:
+    python scripts/benchmarks/bench_query_cache.py --queries 200 --repeat-fraction 0.5
+"""
+import argparse
+import random
+import sys
+import time
+
+import boto3
+from moto import mock_aws
+
+from common import (
+    StubLLM, emit, hash_embedding_service, memory_s3_client, synthetic_article, FakeFetcher
+)
+
+from services.rag_builder import RagBuilderService
+from src.services.chat_service import ChatService
+from src.services.query_cache import DynamoCacheBackend, QueryCache
+
+TABLE_NAME = "bench-query-cache"
+
+
+def build_session(s3_client, embedding_service, paragraphs: int) -> str:
+    builder = RagBuilderService("bench-bucket", embedding_service=embedding_service)
+    builder.s3_client = s3_client
+    url = "https://en.wikipedia.org/wiki/Cache_Benchmark"
+    builder.wiki_fetcher = FakeFetcher({url: ("Cache Benchmark", synthetic_article(paragraphs))})
+    return str(builder.build_rag_session(url).session_id)
+
+
+def workload(count: int, repeat_fraction: float, seed: int = 0):
+    """Queries where repeat_fraction of them restate an earlier query."""
+    rng = random.Random(seed)
+    seen = []
+    for n in range(count):
+        if seen and rng.random() < repeat_fraction:
+            query = rng.choice(seen)
+            yield rng.choice([query.upper(), query + "?", "  " + query + " "])
+        else:
+            query = f"what does paragraph {n} say about history"
+            seen.append(query)
+            yield query
+
+
+def run(service: ChatService, queries) -> float:
+    start = time.perf_counter()
+    for query in queries:
+        "".join(service.process_query(query))
+    return (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--repeat-fraction", type=float, default=0.5)
+    parser.add_argument("--paragraphs", type=int, default=200)
+    parser.add_argument("--llm-latency-s", type=float, default=0.02)
+    parser.add_argument("--embed-work", type=int, default=5000,
+                        help="Work factor of the hash embedding model for queries")
+    args = parser.parse_args()
+
+    s3_client = memory_s3_client()
+    # Indexing runs without the synthetic cost; only query embeddings pay it
+    session_id = build_session(s3_client, hash_embedding_service(), args.paragraphs)
+    embedding_service = hash_embedding_service(work_factor=args.embed_work)
+    llm = StubLLM(latency_s=args.llm_latency_s)
+    queries = list(workload(args.queries, args.repeat_fraction))
+
+    def load(query_cache=None) -> ChatService:
+        return ChatService(
+            session_id, llm_service=llm, embedding_service=embedding_service,
+            s3_client=s3_client, query_cache=query_cache
+        )
+
+    service = load()
+    emit({"benchmark": "query_cache", "case": "no_cache",
+          "mean_query_ms": round(run(service, queries), 3)})
+    service.close()
+
+    cache = QueryCache()
+    service = load(cache)
+    emit({"benchmark": "query_cache", "case": "in_process",
+          "mean_query_ms": round(run(service, queries), 3), **cache.stats()})
+    service.close()
+
+    with mock_aws():
+        dynamodb = boto3.client("dynamodb", region_name="us-east-1")
+        dynamodb.create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[{"AttributeName": "cache_key", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "cache_key", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        # The first container fills the shared level, the second starts with
+        # an empty in-process cache and reads through to it
+        for container in ("first", "second"):
+            cache = QueryCache(shared=DynamoCacheBackend(TABLE_NAME, client=dynamodb))
+            service = load(cache)
+            emit({"benchmark": "query_cache", "case": f"shared_{container}_container",
+                  "mean_query_ms": round(run(service, queries), 3), **cache.stats()})
+            service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+Benchmark for S3Client transfer throughput against an in-process S3 (moto).
+
+Every S3 request is delayed by --latency-ms to stand in for network round
+trips. Reports single-file upload/download throughput with and without
+multipart concurrency, batch transfers of many small objects, and reading
+an artifact bundle's manifest with a ranged GET versus a full download.
+
+Usage:
+    python scripts/benchmarks/bench_s3_transfer.py --size-mb 64 --files 16 --latency-ms 20
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import boto3
+from moto import mock_aws
+
+from common import emit
+
+from services.artifact_bundle import fetch_manifest, write_bundle
+from utils.s3_client import S3Client
+
+BUCKET = "bench-bucket"
+
+
+class LatencyInjector:
+    """Sleeps on every S3 request the client creates and counts them."""
+
+    def __init__(self, client, latency_s: float):
+        self.latency_s = latency_s
+        self.count = 0
+        self.lock = threading.Lock()
+        client.meta.events.register("request-created.s3", self._on_request)
+
+    def _on_request(self, **kwargs):
+        with self.lock:
+            self.count += 1
+        time.sleep(self.latency_s)
+
+
+def timed(case: str, requests: LatencyInjector, nbytes: int, fn, **extra):
+    before = requests.count
+    start = time.perf_counter()
+    ok = fn()
+    elapsed_s = time.perf_counter() - start
+    if ok is False or (isinstance(ok, dict) and not all(ok.values())):
+        raise RuntimeError(f"{case} failed")
+    emit({
+        "benchmark": "s3_transfer",
+        "case": case,
+        **extra,
+        "mb": round(nbytes / (1024 * 1024), 3),
+        "elapsed_ms": round(elapsed_s * 1000, 2),
+        "mb_per_s": round(nbytes / (1024 * 1024) / elapsed_s, 2),
+        "requests": requests.count - before,
+    })
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--files", type=int, default=16)
+    parser.add_argument("--file-kb", type=int, default=512)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+        os.environ.setdefault(name, "testing")
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+    with mock_aws(), tempfile.TemporaryDirectory() as directory:
+        boto_client = boto3.client("s3")
+        boto_client.create_bucket(Bucket=BUCKET)
+        requests = LatencyInjector(boto_client, args.latency_ms / 1000)
+        serial = S3Client(BUCKET, max_concurrency=1, client=boto_client)
+        tuned = S3Client(BUCKET, client=boto_client)
+
+        large_path = os.path.join(directory, "large.bin")
+        with open(large_path, "wb") as f:
+            f.write(os.urandom(args.size_mb * 1024 * 1024))
+        large_bytes = os.path.getsize(large_path)
+        out_path = os.path.join(directory, "large.out")
+        for label, client in (("serial", serial), ("tuned", tuned)):
+            timed("upload", requests, large_bytes,
+                  lambda: client.upload_file(large_path, f"{label}/large.bin"),
+                  client=label, max_concurrency=client.max_concurrency)
+            timed("download", requests, large_bytes,
+                  lambda: client.download_file(f"{label}/large.bin", out_path),
+                  client=label, max_concurrency=client.max_concurrency)
+
+        small = []
+        for i in range(args.files):
+            path = os.path.join(directory, f"small-{i}.bin")
+            with open(path, "wb") as f:
+                f.write(os.urandom(args.file_kb * 1024))
+            small.append((path, f"small/{i}.bin"))
+        small_bytes = args.files * args.file_kb * 1024
+        timed("upload_many", requests, small_bytes,
+              lambda: all(serial.upload_file(path, key) for path, key in small),
+              client="loop", files=args.files)
+        timed("upload_many", requests, small_bytes, lambda: tuned.upload_files(small),
+              client="batch", files=args.files)
+        targets = [(key, path + ".out") for path, key in small]
+        timed("download_many", requests, small_bytes,
+              lambda: all(serial.download_file(key, path) for key, path in targets),
+              client="loop", files=args.files)
+        timed("download_many", requests, small_bytes, lambda: tuned.download_files(targets),
+              client="batch", files=args.files)
+
+        bundle_path = os.path.join(directory, "bundle.rag")
+        write_bundle(bundle_path, {"index.faiss": large_path}, {"embedding_model": "bench"})
+        tuned.upload_file(bundle_path, "bundle.rag")
+        timed("manifest", requests, os.path.getsize(bundle_path),
+              lambda: tuned.download_file("bundle.rag", out_path), method="full_download")
+        timed("manifest", requests, 64 * 1024,
+              lambda: bool(fetch_manifest(tuned, "bundle.rag")), method="ranged_get")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""
+End-to-end benchmark of time-to-first-token on the chat path.
+
+Builds one session into an in-memory S3 stand-in, serves generation from
+a local mock Ollama that streams tokens with a fixed delay, and compares
+the buffered Lambda handler (the answer arrives only when complete) with
+the SSE endpoint of the ASGI app served by uvicorn on localhost.
+Client-side time to the first chunk event and to the end of the stream
+are reported.
+
+Usage:
+    python scripts/benchmarks/bench_streaming.py --queries 10 --tokens 50 --token-delay-s 0.02
+"""
+import argparse
+import json
+import socket
+import statistics
+import sys
+import threading
+import time
+
+import requests
+import uvicorn
+
+from common import emit, hash_embedding_service, memory_s3_client, synthetic_article, FakeFetcher
+from stand_ins import MockOllamaServer
+
+from services.rag_builder import RagBuilderService
+from src.api import streaming_app
+from src.api.lambda_handlers import chat_handler
+from src.services.chat_service import ChatService
+from src.services.llm_service import LLMService
+
+
+def build_session(s3_client, embedding_service) -> str:
+    builder = RagBuilderService("bench-bucket", embedding_service=embedding_service)
+    builder.s3_client = s3_client
+    url = "https://en.wikipedia.org/wiki/Streaming_Benchmark"
+    builder.wiki_fetcher = FakeFetcher({url: ("Streaming Benchmark", synthetic_article(100))})
+    return str(builder.build_rag_session(url).session_id)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def read_stream(url: str, session_id: str, query: str):
+    """Returns (ttft_ms, total_ms, answer) as seen by an SSE client."""
+    start = time.perf_counter()
+    ttft_ms = None
+    answer = []
+    with requests.post(url, json={"session_id": session_id, "query": query}, stream=True) as r:
+        r.raise_for_status()
+        for line in r.iter_lines(decode_unicode=True):
+            if not line.startswith("data: "):
+                continue
+            data = line[len("data: "):]
+            if data == "[DONE]":
+                break
+            message = json.loads(data)
+            if "content" in message:
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - start) * 1000
+                answer.append(message["content"])
+    return ttft_ms, (time.perf_counter() - start) * 1000, "".join(answer)
+
+
+def summarize(case: str, ttfts, totals):
+    emit({
+        "benchmark": "streaming",
+        "case": case,
+        "ttft_p50_ms": round(statistics.median(ttfts), 1),
+        "total_p50_ms": round(statistics.median(totals), 1),
+    })
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--queries", type=int, default=10)
+    parser.add_argument("--tokens", type=int, default=50)
+    parser.add_argument("--first-token-delay-s", type=float, default=0.2)
+    parser.add_argument("--token-delay-s", type=float, default=0.02)
+    args = parser.parse_args()
+
+    s3_client = memory_s3_client()
+    embedding_service = hash_embedding_service()
+    session_id = build_session(s3_client, embedding_service)
+    ollama = MockOllamaServer(
+        tokens=[f" token{i}" for i in range(args.tokens)],
+        first_token_delay_s=args.first_token_delay_s,
+        token_delay_s=args.token_delay_s
+    ).start()
+    llm_service = LLMService(ollama.base_url)
+    # Both entry points lease sessions from chat_handler's pool
+    chat_handler.chat_pool.factory = lambda sid: ChatService(
+        sid, llm_service=llm_service, embedding_service=embedding_service, s3_client=s3_client
+    )
+    queries = [f"question {n} about the article" for n in range(args.queries)]
+    expected = "".join(ollama.tokens)
+
+    # Buffered: the whole answer is the first thing the client sees
+    totals = []
+    for query in queries:
+        start = time.perf_counter()
+        response = chat_handler.handler({
+            "path": "/chat/query",
+            "httpMethod": "POST",
+            "body": json.dumps({"session_id": session_id, "query": query}),
+        }, None)
+        totals.append((time.perf_counter() - start) * 1000)
+        assert json.loads(response["body"])["response"] == expected
+    summarize("buffered_handler", totals, totals)
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(
+        streaming_app.app, host="127.0.0.1", port=port, log_level="warning"
+    ))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+
+    ttfts, totals = [], []
+    url = f"http://127.0.0.1:{port}/chat/query/stream"
+    for query in queries:
+        ttft_ms, total_ms, answer = read_stream(url, session_id, query)
+        assert answer == expected
+        ttfts.append(ttft_ms)
+        totals.append(total_ms)
+    summarize("sse_stream", ttfts, totals)
+
+    server.should_exit = True
+    thread.join()
+    ollama.stop()
+    chat_handler.chat_pool.clear()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Benchmark for the streaming build pipeline.
+
+Builds articles of increasing size at several batch sizes and reports
+wall time and peak Python heap usage (tracemalloc) for each run, so the
+effect of batch size on build memory can be compared across commits.
+
+Usage:
+    python scripts/benchmarks/bench_streaming_build.py --paragraphs 200 800 --batch-sizes 8 32 128
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+
+from common import (
+    FakeFetcher,
+    emit,
+    hash_embedding_service,
+    recording_s3_client,
+    synthetic_article,
+)
+
+from services.rag_builder import RagBuilderService
+from models.rag_session import RagStatus
+
+URL = "https://en.wikipedia.org/wiki/Benchmark_article"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--paragraphs", type=int, nargs="+", default=[200, 800])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--work-factor", type=int, default=200,
+                        help="Synthetic hashing rounds per chunk to mimic encoder cost")
+    args = parser.parse_args()
+
+    for paragraphs in args.paragraphs:
+        article = synthetic_article(paragraphs)
+        for batch_size in args.batch_sizes:
+            service = RagBuilderService(
+                "bench-bucket",
+                embedding_service=hash_embedding_service(work_factor=args.work_factor),
+                batch_size=batch_size
+            )
+            service.s3_client = recording_s3_client()
+            service.wiki_fetcher = FakeFetcher({URL: ("Benchmark article", article)})
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            session = service.build_rag_session(URL)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            _, peak_bytes = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            if session.status != RagStatus.READY:
+                print(f"FAILURE: {session.metadata.error_message}")
+                return 1
+            emit({
+                "benchmark": "streaming_build",
+                "article_chars": len(article),
+                "batch_size": batch_size,
+                "chunk_count": session.chunk_count,
+                "elapsed_ms": round(elapsed_ms, 2),
+                "peak_heap_mb": round(peak_bytes / (1024 * 1024), 3),
+            })
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
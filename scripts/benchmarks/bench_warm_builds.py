@@ -0,0 +1,87 @@
+"""
+Regression benchmark for builds on a warm container.
+
+Runs N consecutive builds of the same article through a single
+RagBuilderService (as rag_builder_handler does on a warm Lambda) and
+checks that build N costs the same time, memory and index size as
+build 1.
+
+Usage:
+    python scripts/benchmarks/bench_warm_builds.py --builds 10 --paragraphs 200
+"""
+import argparse
+import sys
+import time
+
+from common import (
+    FakeFetcher,
+    current_rss_mb,
+    emit,
+    hash_embedding_service,
+    recording_s3_client,
+    synthetic_article,
+)
+
+from services.rag_builder import RagBuilderService
+from models.rag_session import RagStatus
+
+URL = "https://en.wikipedia.org/wiki/Benchmark_article"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--builds", type=int, default=10)
+    parser.add_argument("--paragraphs", type=int, default=200)
+    parser.add_argument("--real-embeddings", action="store_true",
+                        help="Use the SentenceTransformer model instead of hash embeddings")
+    parser.add_argument("--tolerance", type=float, default=1.5,
+                        help="Allowed ratio between the last and first build time")
+    args = parser.parse_args()
+
+    embedding_service = None if args.real_embeddings else hash_embedding_service()
+    service = RagBuilderService("bench-bucket", embedding_service=embedding_service)
+    service.s3_client = recording_s3_client()
+    article = synthetic_article(args.paragraphs)
+    service.wiki_fetcher = FakeFetcher({URL: ("Benchmark article", article)})
+
+    results = []
+    for n in range(1, args.builds + 1):
+        start = time.perf_counter()
+        session = service.build_rag_session(URL)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if session.status != RagStatus.READY:
+            print(f"FAILURE: build {n} failed: {session.metadata.error_message}")
+            return 1
+
+        index_key = f"indices/{session.session_id}/bundle.rag"
+        result = {
+            "benchmark": "warm_builds",
+            "build": n,
+            "chunk_count": session.chunk_count,
+            "elapsed_ms": round(elapsed_ms, 2),
+            "index_bytes": service.s3_client.uploaded[index_key],
+            "resident_index_bytes": service.vector_store.memory_usage_bytes,
+            "rss_mb": round(current_rss_mb(), 2),
+        }
+        results.append(result)
+        emit(result)
+
+    first, last = results[0], results[-1]
+    failures = []
+    if last["index_bytes"] != first["index_bytes"]:
+        failures.append(f"index grew from {first['index_bytes']} to {last['index_bytes']} bytes")
+    if last["resident_index_bytes"] != 0:
+        failures.append(f"{last['resident_index_bytes']} bytes of vectors left resident")
+    if last["elapsed_ms"] > first["elapsed_ms"] * args.tolerance:
+        failures.append(f"build time went from {first['elapsed_ms']}ms to {last['elapsed_ms']}ms")
+
+    if failures:
+        for failure in failures:
+            print(f"REGRESSION: {failure}")
+        return 1
+    print(f"OK: {args.builds} warm builds with constant index size and time")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
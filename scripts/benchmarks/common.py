@@ -0,0 +1,191 @@
+"""
+Shared helpers for the offline benchmark scripts.
+
+Everything here runs without network access: articles are synthetic,
+Wikipedia and S3 are replaced with local stand-ins, and embeddings can
+be produced by a deterministic hash embedder instead of the real model.
+"""
+import hashlib
+import json
+import os
+import random
+import resource
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+from unittest.mock import MagicMock
+
+import numpy as np
+
+# Add backend to path. Builder modules import as services.*, while the chat
+# side uses package-relative imports and is imported as src.services.*
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../backend/src'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../backend'))
+
+WORDS = (
+    "history science city river empire language music theory war government "
+    "population species energy culture economy religion century university "
+    "mountain island philosophy literature network protein planet algorithm"
+).split()
+
+
+def synthetic_article(
+    num_paragraphs: int, seed: int = 0, sentence_range: Tuple[int, int] = (4, 8)
+) -> str:
+    """
+    Builds a deterministic Wikipedia-like article of roughly
+    num_paragraphs * 600 characters. A higher sentence_range (sentences
+    per paragraph) gives paragraphs longer than a chunk, which the
+    splitter cuts with overlap.
+    """
+    rng = random.Random(seed)
+    paragraphs = []
+    for p in range(num_paragraphs):
+        if p % 8 == 0:
+            paragraphs.append(f"Section {p // 8}")
+        sentences = []
+        for _ in range(rng.randint(*sentence_range)):
+            words = rng.choices(WORDS, k=rng.randint(8, 16))
+            year = rng.randint(1500, 2024)
+            sentences.append(" ".join(words).capitalize() + f" in {year}.")
+        paragraphs.append(" ".join(sentences))
+    return "\n\n".join(paragraphs)
+
+
+class FakeFetcher:
+    """Stand-in for WikipediaFetcher that serves articles from memory."""
+
+    def __init__(self, articles: Dict[str, Tuple[str, str]], latency_s: float = 0.0):
+        self.articles = articles
+        self.latency_s = latency_s
+
+    def fetch_article(self, url: str) -> Tuple[str, str]:
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        if url not in self.articles:
+            raise Exception(f"Page for '{url}' does not exist")
+        return self.articles[url]
+
+
+class HashModel:
+    """
+    Deterministic stand-in for a SentenceTransformer model.
+
+    Vectors are derived from a hash of the text and normalised, so
+    identical texts always map to identical vectors. work_factor adds
+    synthetic CPU cost per text to mimic model inference.
+    """
+
+    def __init__(self, dimension: int = 384, work_factor: int = 0):
+        self.dimension = dimension
+        self.work_factor = work_factor
+
+    def encode(self, texts: List[str], **kwargs) -> np.ndarray:
+        vectors = np.empty((len(texts), self.dimension), dtype='float32')
+        for i, text in enumerate(texts):
+            digest = hashlib.sha256(text.encode('utf-8')).digest()
+            for _ in range(self.work_factor):
+                digest = hashlib.sha256(digest).digest()
+            rng = np.random.default_rng(int.from_bytes(digest[:8], 'little'))
+            vector = rng.standard_normal(self.dimension).astype('float32')
+            vectors[i] = vector / np.linalg.norm(vector)
+        return vectors
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+
+def hash_embedding_service(work_factor: int = 0):
+    """EmbeddingService backed by HashModel instead of the real model."""
+    from services.embedding_service import EmbeddingService
+    return EmbeddingService("hash-embedding", model=HashModel(work_factor=work_factor))
+
+
+def recording_s3_client(bucket_name: str = "bench-bucket") -> MagicMock:
+    """
+    MagicMock S3 client whose upload_file records the size of every
+    uploaded object in its `uploaded` dict (key -> bytes).
+    """
+    client = MagicMock()
+    client.bucket_name = bucket_name
+    client.uploaded = {}
+
+    def upload_file(file_path: str, object_name: Optional[str] = None) -> bool:
+        client.uploaded[object_name or os.path.basename(file_path)] = os.path.getsize(file_path)
+        return True
+
+    client.upload_file.side_effect = upload_file
+    return client
+
+
+def memory_s3_client(bucket_name: str = "bench-bucket") -> MagicMock:
+    """
+    MagicMock S3 client that keeps uploaded objects in its `objects` dict
+    (key -> bytes) and serves them back from download_file.
+    """
+    client = MagicMock()
+    client.bucket_name = bucket_name
+    client.objects = {}
+
+    def upload_file(file_path: str, object_name: Optional[str] = None) -> bool:
+        with open(file_path, "rb") as f:
+            client.objects[object_name or os.path.basename(file_path)] = f.read()
+        return True
+
+    def download_file(object_name: str, file_path: str) -> bool:
+        if object_name not in client.objects:
+            return False
+        with open(file_path, "wb") as f:
+            f.write(client.objects[object_name])
+        return True
+
+    def download_files(objects: List[Tuple[str, str]]) -> Dict[str, bool]:
+        return {key: download_file(key, path) for key, path in objects}
+
+    client.upload_file.side_effect = upload_file
+    client.download_file.side_effect = download_file
+    client.download_files.side_effect = download_files
+    return client
+
+
+class StubLLM:
+    """Stands in for LLMService: streams a fixed answer after a fixed delay."""
+
+    model = "stub-llm"
+
+    def __init__(self, latency_s: float = 0.0, answer: str = "Stub answer."):
+        self.latency_s = latency_s
+        self.answer = answer
+
+    def stream_response(self, query: str, context: str, **kwargs):
+        time.sleep(self.latency_s)
+        for word in self.answer.split(" "):
+            yield word + " "
+        return True
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MB (Linux), 0.0 if unavailable."""
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB."""
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile, e.g. fraction=0.95 for p95."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def emit(record: Dict) -> None:
+    """Prints one machine-readable result line."""
+    print(json.dumps(record, sort_keys=True))
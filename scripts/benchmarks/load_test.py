@@ -0,0 +1,410 @@
+"""
+Load generator and traffic replay for the chat and RAG builder handlers.
+
+Sends API-Gateway-shaped events either in-process, to
+chat_handler.handler and rag_builder_handler.handler, or over HTTP to
+--target (a local server or a deployed stage). Three workloads:
+
+  open    Poisson arrivals at --rate requests/s for --duration seconds,
+          independent of how fast responses come back (open loop).
+          Latency counts from the scheduled arrival, so client-side
+          queueing is not hidden.
+  ramp    Closed loop: --ramp concurrency levels in turn, each held for
+          --step-s seconds, every worker sending its next request as soon
+          as the previous one returns.
+  replay  Re-sends the events in --log with their original spacing
+          (scaled by --speed). Lines may be {"offset_s": ..., "event": ...},
+          bare events, or handler log lines ("Received event: {...}");
+          timing comes from offset_s or requestContext.requestTimeEpoch.
+
+With --stand-ins, in-process handlers talk to local stand-ins instead of
+AWS, Wikipedia and Ollama, with --sessions sessions built up front;
+otherwise they use their usual environment variables, and --session-id
+names existing sessions to query. Throughput, latency percentiles,
+error rate (5xx and exceptions) and rejection rate (429) are reported
+per --window-s window, per ramp step and overall as JSON lines.
+
+Usage:
+    python scripts/benchmarks/load_test.py open --stand-ins --rate 20 --duration 30
+    python scripts/benchmarks/load_test.py ramp --stand-ins --ramp 1 2 4 8 16 --step-s 10
+    python scripts/benchmarks/load_test.py replay --log requests.jsonl --speed 2 \\
+        --target http://localhost:3000
+"""
+import argparse
+import contextlib
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import requests
+
+from common import emit, hash_embedding_service, memory_s3_client, percentile, synthetic_article
+from stand_ins import MockOllamaServer, MockWikipediaServer
+
+TOPICS = ("history", "science", "empire", "river", "music", "economy", "philosophy")
+
+
+class Sample(NamedTuple):
+    # Seconds since the start of the run at which the request was due
+    offset_s: float
+    latency_ms: float
+    status: int
+    route: str
+    # Ramp step (concurrency) the request belonged to, if any
+    step: Optional[int] = None
+
+    @property
+    def completed_s(self) -> float:
+        return self.offset_s + self.latency_ms / 1000
+
+
+def api_event(method: str, path: str, body: Optional[Dict] = None,
+              path_parameters: Optional[Dict] = None) -> Dict[str, Any]:
+    """A REST API (v1) Lambda proxy event, as API Gateway sends it."""
+    return {
+        "resource": path,
+        "path": path,
+        "httpMethod": method,
+        "headers": {"Content-Type": "application/json"},
+        "queryStringParameters": None,
+        "pathParameters": path_parameters,
+        "requestContext": {
+            "requestId": str(uuid.uuid4()),
+            "requestTimeEpoch": int(time.time() * 1000),
+            "stage": "load",
+        },
+        "body": json.dumps(body) if body is not None else None,
+        "isBase64Encoded": False,
+    }
+
+
+class EventFactory:
+    """Builds random requests of each route for the given sessions."""
+
+    def __init__(self, session_ids: List[str], article_urls: List[str], seed: int = 0):
+        self.session_ids = session_ids
+        self.article_urls = article_urls
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def question(self) -> str:
+        return (f"What happened to the {self.rng.choice(TOPICS)} "
+                f"in {self.rng.randint(1500, 2024)}?")
+
+    def make(self, route: str) -> Dict[str, Any]:
+        with self.lock:
+            session_id = self.rng.choice(self.session_ids) if self.session_ids else None
+            if route == "query":
+                return api_event("POST", "/chat/query",
+                                 {"session_id": session_id, "query": self.question()})
+            if route == "batch":
+                return api_event("POST", "/chat/query/batch", {
+                    "session_id": session_id,
+                    "queries": [self.question() for _ in range(self.rng.randint(2, 8))],
+                })
+            if route == "history":
+                return api_event("GET", f"/chat/{session_id}/history",
+                                 path_parameters={"session_id": session_id})
+            if route == "build":
+                return api_event("POST", "/rag/build", {"url": self.rng.choice(self.article_urls)})
+        raise ValueError(f"Unknown route {route!r}")
+
+
+def parse_mix(spec: str) -> List[Tuple[str, float]]:
+    """'query=8,batch=1' -> [('query', 0.888...), ('batch', 0.111...)]."""
+    weights = []
+    for part in spec.split(","):
+        route, _, weight = part.partition("=")
+        weights.append((route.strip(), float(weight or 1)))
+    total = sum(weight for _, weight in weights)
+    return [(route, weight / total) for route, weight in weights if weight > 0]
+
+
+def route_of(event: Dict[str, Any]) -> str:
+    path = event.get("path", "")
+    for suffix, route in (("/query/batch", "batch"), ("/query", "query"),
+                          ("/history", "history"), ("/rag/build/batch", "build_batch"),
+                          ("/rag/build", "build")):
+        if path.endswith(suffix):
+            return route
+    return "other"
+
+
+def in_process_sender() -> Callable[[Dict[str, Any]], int]:
+    """Calls the handlers directly, routing by path like API Gateway does."""
+    from src.api.lambda_handlers import chat_handler, rag_builder_handler
+
+    def send(event: Dict[str, Any]) -> int:
+        handler = chat_handler.handler if event.get("path", "").startswith("/chat") \
+            else rag_builder_handler.handler
+        return handler(event, None)["statusCode"]
+    return send
+
+
+def http_sender(target: str, timeout_s: float) -> Callable[[Dict[str, Any]], int]:
+    session = requests.Session()
+    session.mount("http", requests.adapters.HTTPAdapter(pool_maxsize=256))
+
+    def send(event: Dict[str, Any]) -> int:
+        response = session.request(
+            event["httpMethod"], target.rstrip("/") + event["path"],
+            data=event.get("body"), headers=event.get("headers"), timeout=timeout_s
+        )
+        return response.status_code
+    return send
+
+
+@contextlib.contextmanager
+def stand_ins(num_sessions: int, paragraphs: int, tokens_per_s: float, prefill_s: float):
+    """
+    Points the in-process handlers at local stand-ins and builds sessions.
+
+    Yields:
+        Tuple[List[str], List[str]]: (session ids, article URLs)
+    """
+    from src.api.lambda_handlers import chat_handler, rag_builder_handler
+    from src.services.llm_service import LLMService
+    from services.article_cache import ArticleCache
+    from services.wikipedia_fetcher import WikipediaFetcher
+
+    s3_client = memory_s3_client()
+    embedding_service = hash_embedding_service()
+    ollama = MockOllamaServer(first_token_delay_s=prefill_s, token_delay_s=1 / tokens_per_s)
+    with tempfile.TemporaryDirectory() as cache_dir, MockWikipediaServer() as wiki, ollama:
+        builder = rag_builder_handler.builder_service
+        builder.s3_client = s3_client
+        builder.embedding_service = embedding_service
+        builder.wiki_fetcher = WikipediaFetcher(
+            cache=ArticleCache(os.path.join(cache_dir, "articles.sqlite3"))
+        )
+        wiki.serve(builder.wiki_fetcher)
+        chat_handler.s3_client = s3_client
+        chat_handler.embedding_service = embedding_service
+        chat_handler.llm_dispatcher.llm_service = LLMService(
+            ollama.base_url, num_ctx=chat_handler.context_builder.num_ctx
+        )
+        chat_handler.chat_pool.clear()
+
+        session_ids, urls = [], []
+        for n in range(num_sessions):
+            title = f"Load test {n}"
+            wiki.set_article(title, synthetic_article(paragraphs, seed=n))
+            urls.append(f"https://en.wikipedia.org/wiki/{title.replace(' ', '_')}")
+            session_ids.append(str(builder.build_rag_session(urls[-1]).session_id))
+        yield session_ids, urls
+        chat_handler.llm_dispatcher.llm_service.close()
+
+
+class LoadRunner:
+    def __init__(self, send: Callable[[Dict[str, Any]], int], max_in_flight: int):
+        self.send = send
+        self.max_in_flight = max_in_flight
+        self.samples: List[Sample] = []
+        self.lock = threading.Lock()
+        self.started = 0.0
+
+    def _call(self, event: Dict[str, Any], due: float, step: Optional[int] = None):
+        try:
+            status = self.send(event)
+        except Exception:
+            status = 0  # Transport error or exception escaping the handler
+        latency_ms = (time.perf_counter() - due) * 1000
+        with self.lock:
+            self.samples.append(
+                Sample(due - self.started, latency_ms, status, route_of(event), step)
+            )
+
+    def run_schedule(self, schedule: List[Tuple[float, Dict[str, Any]]]):
+        """Sends each event at its offset (open loop)."""
+        self.started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+            for offset_s, event in schedule:
+                due = self.started + offset_s
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self._call, event, due)
+
+    def run_ramp(self, levels: List[int], step_s: float, next_event: Callable[[], Dict]):
+        """Holds each concurrency level for step_s with closed-loop workers."""
+        self.started = time.perf_counter()
+        for step, concurrency in enumerate(levels):
+            step_end = self.started + (step + 1) * step_s
+
+            def worker():
+                while time.perf_counter() < step_end:
+                    self._call(next_event(), time.perf_counter(), concurrency)
+
+            threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+
+def open_schedule(rate: float, duration_s: float, mix, factory: EventFactory, seed: int):
+    rng = random.Random(seed)
+    schedule, offset = [], 0.0
+    while True:
+        offset += rng.expovariate(rate)
+        if offset >= duration_s:
+            return schedule
+        route = rng.choices([r for r, _ in mix], weights=[w for _, w in mix])[0]
+        schedule.append((offset, factory.make(route)))
+
+
+def replay_schedule(path: str, speed: float, default_rate: float):
+    """
+    Events from a request log with their offsets: offset_s where given,
+    else the requestTimeEpoch relative to the earliest one in the log,
+    else spaced at default_rate.
+    """
+    marker = "Received event: "
+    records = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if marker in line:
+                line = line[line.index(marker) + len(marker):]
+            if line.startswith("{"):
+                records.append(json.loads(line))
+
+    def epoch_ms(event):
+        return (event.get("requestContext") or {}).get("requestTimeEpoch")
+
+    epochs = [epoch_ms(r.get("event", r)) for r in records if "offset_s" not in r]
+    first_epoch = min((e for e in epochs if e), default=None)
+    schedule = []
+    for n, record in enumerate(records):
+        event = record.get("event", record)
+        if "offset_s" in record:
+            offset = float(record["offset_s"])
+        elif epoch_ms(event):
+            offset = (epoch_ms(event) - first_epoch) / 1000
+        else:
+            offset = n / default_rate
+        schedule.append((offset / speed, event))
+    return sorted(schedule, key=lambda item: item[0])
+
+
+def summarize(samples: List[Sample], elapsed_s: float) -> Dict[str, Any]:
+    latencies = [s.latency_ms for s in samples]
+    statuses: Dict[str, int] = {}
+    for s in samples:
+        statuses[str(s.status)] = statuses.get(str(s.status), 0) + 1
+    errors = sum(1 for s in samples if s.status == 0 or s.status >= 500)
+    rejected = sum(1 for s in samples if s.status == 429)
+    return {
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / elapsed_s, 2) if elapsed_s else None,
+        "p50_ms": round(percentile(latencies, 0.50), 1) if latencies else None,
+        "p95_ms": round(percentile(latencies, 0.95), 1) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99), 1) if latencies else None,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "rejected_rate": round(rejected / len(samples), 4) if samples else 0.0,
+        "statuses": statuses,
+    }
+
+
+def report(samples: List[Sample], window_s: float, elapsed_s: float, workload: str):
+    # Windows group requests by when they completed, so throughput is goodput
+    windows = math.ceil(elapsed_s / window_s) if elapsed_s else 0
+    for n in range(windows):
+        start = n * window_s
+        in_window = [s for s in samples if start <= s.completed_s < start + window_s]
+        emit({"benchmark": "load", "workload": workload, "window_start_s": start,
+              **summarize(in_window, min(window_s, elapsed_s - start))})
+    steps = sorted({s.step for s in samples if s.step is not None})
+    for step in steps:
+        in_step = [s for s in samples if s.step == step]
+        span = max(s.offset_s for s in in_step) - min(s.offset_s for s in in_step)
+        emit({"benchmark": "load", "workload": workload, "concurrency": step,
+              **summarize(in_step, span or elapsed_s)})
+    for route in sorted({s.route for s in samples}):
+        emit({"benchmark": "load", "workload": workload, "route": route,
+              **summarize([s for s in samples if s.route == route], elapsed_s)})
+    total = summarize(samples, elapsed_s)
+    emit({"benchmark": "load", "workload": workload, "case": "total",
+          "elapsed_s": round(elapsed_s, 2), **total})
+    return total
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("workload", choices=("open", "ramp", "replay"))
+    parser.add_argument("--target", help="Base URL to send to over HTTP instead of in-process")
+    parser.add_argument("--stand-ins", action="store_true",
+                        help="Run the in-process handlers against local stand-ins")
+    parser.add_argument("--session-id", nargs="*", default=[],
+                        help="Existing sessions to query (without --stand-ins)")
+    parser.add_argument("--article-url", nargs="*", default=[],
+                        help="Articles to build (without --stand-ins)")
+    parser.add_argument("--sessions", type=int, default=3, help="Sessions built with --stand-ins")
+    parser.add_argument("--paragraphs", type=int, default=200)
+    parser.add_argument("--mix", default="query=8,batch=1,history=1",
+                        help="Route weights, from query, batch, history and build")
+    parser.add_argument("--rate", type=float, default=10.0, help="Arrivals/s (open, replay)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds (open)")
+    parser.add_argument("--ramp", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--step-s", type=float, default=10.0)
+    parser.add_argument("--log", help="Request log to replay")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed-up factor")
+    parser.add_argument("--max-in-flight", type=int, default=256)
+    parser.add_argument("--window-s", type=float, default=5.0)
+    parser.add_argument("--timeout-s", type=float, default=60.0, help="HTTP timeout")
+    parser.add_argument("--prefill-s", type=float, default=0.2, help="Mock Ollama prefill")
+    parser.add_argument("--tokens-per-s", type=float, default=50.0, help="Mock Ollama rate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="Keep the handlers' own logs")
+    parser.add_argument("--output", help="Write the total summary JSON here")
+    args = parser.parse_args()
+    if args.workload == "replay" and not args.log:
+        parser.error("replay needs --log")
+    if args.stand_ins and args.target:
+        parser.error("--stand-ins only applies to in-process handlers")
+
+    with contextlib.ExitStack() as stack:
+        session_ids, urls = args.session_id, args.article_url
+        if args.stand_ins:
+            session_ids, urls = stack.enter_context(
+                stand_ins(args.sessions, args.paragraphs, args.tokens_per_s, args.prefill_s)
+            )
+        send = http_sender(args.target, args.timeout_s) if args.target else in_process_sender()
+        factory = EventFactory(session_ids, urls, seed=args.seed)
+        mix = parse_mix(args.mix)
+        runner = LoadRunner(send, args.max_in_flight)
+        rng = random.Random(args.seed)
+
+        # The handlers log every event and metric; keep stdout for results
+        if not args.verbose:
+            stack.enter_context(contextlib.redirect_stdout(open(os.devnull, "w")))
+        if args.workload == "ramp":
+            runner.run_ramp(
+                args.ramp, args.step_s,
+                lambda: factory.make(rng.choices(
+                    [r for r, _ in mix], weights=[w for _, w in mix]
+                )[0])
+            )
+        elif args.workload == "open":
+            runner.run_schedule(open_schedule(args.rate, args.duration, mix, factory, args.seed))
+        else:
+            runner.run_schedule(replay_schedule(args.log, args.speed, args.rate))
+        elapsed_s = time.perf_counter() - runner.started
+
+    total = report(runner.samples, args.window_s, elapsed_s, args.workload)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"workload": args.workload, "params": vars(args), **total}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
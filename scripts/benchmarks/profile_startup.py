@@ -0,0 +1,137 @@
+"""
+Startup profiler for the Lambda handlers' init phase.
+
+Each handler module is imported in a fresh interpreter under
+`python -X importtime`, which is what Lambda does during init. Reports the
+init duration (median of --repeats imports), the import time of each
+top-level package (the sum of its modules' own import times, so nested
+imports are not counted twice) and which heavy dependencies were imported.
+
+Exits 1 if a handler's init takes longer than --budget-ms or, in the
+lazy cold-start mode (COLD_START_MODE=lazy), imports one of the modules
+given with --forbid, so it can run in CI to keep Lambda init in budget.
+
+Usage:
+    python scripts/benchmarks/profile_startup.py --budget-ms 1000
+    python scripts/benchmarks/profile_startup.py --mode eager --top 20
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from common import emit
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../backend'))
+HANDLERS = {
+    "chat": "src.api.lambda_handlers.chat_handler",
+    "rag_builder": "src.api.lambda_handlers.rag_builder_handler",
+}
+# Imported on the code paths that need them rather than during init
+LAZY_MODULES = ("boto3", "langchain_text_splitters", "wikipediaapi", "sentence_transformers",
+                "torch")
+# Runs in the child interpreter; prints one JSON line after the handler's own output
+CHILD = """
+import importlib, json, sys, time
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+init_ms = (time.perf_counter() - start) * 1000
+print(json.dumps({"startup_profile": {"init_ms": init_ms, "modules": sorted(sys.modules)}}))
+"""
+
+
+def parse_importtime(stderr: str) -> dict:
+    """Returns {module: (self_us, cumulative_us)} from -X importtime output."""
+    imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        imports[name.strip()] = (int(self_us), int(cumulative_us))
+    return imports
+
+
+def profile(module: str, mode: str) -> dict:
+    path = [os.path.join(BACKEND, "src"), BACKEND]
+    if os.environ.get("PYTHONPATH"):
+        path.append(os.environ["PYTHONPATH"])
+    env = dict(os.environ, COLD_START_MODE=mode, PYTHONPATH=os.pathsep.join(path))
+    # Without a bucket the handlers skip creating their S3 client
+    env.setdefault("RAG_BUCKET", "profile-bucket")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD, module],
+        env=env, cwd=BACKEND, check=True, capture_output=True, text=True
+    )
+    for line in reversed(result.stdout.splitlines()):
+        if line.startswith('{"startup_profile"'):
+            child = json.loads(line)["startup_profile"]
+            break
+    else:
+        raise RuntimeError(f"No profile from importing {module}:\n{result.stderr[-2000:]}")
+    child["imports"] = parse_importtime(result.stderr)
+    return child
+
+
+def package_times(imports: dict, top: int) -> dict:
+    """Own import time (ms) per top-level package, the slowest first."""
+    totals = defaultdict(int)
+    for name, (self_us, _) in imports.items():
+        totals[name.split(".")[0]] += self_us
+    slowest = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {name: round(us / 1000, 1) for name, us in slowest}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--handlers", nargs="+", choices=sorted(HANDLERS),
+                        default=sorted(HANDLERS))
+    parser.add_argument("--mode", choices=["lazy", "eager", "both"], default="lazy",
+                        help="COLD_START_MODE to profile the handlers in")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="Packages to list per handler")
+    parser.add_argument("--budget-ms", type=float, default=1000.0,
+                        help="Longest init allowed per handler")
+    parser.add_argument("--forbid", nargs="*", default=list(LAZY_MODULES),
+                        help="Modules the lazy mode must not import during init")
+    args = parser.parse_args()
+
+    failures = []
+    modes = ["lazy", "eager"] if args.mode == "both" else [args.mode]
+    for mode in modes:
+        for handler in args.handlers:
+            runs = sorted(
+                (profile(HANDLERS[handler], mode) for _ in range(args.repeats)),
+                key=lambda run: run["init_ms"]
+            )
+            median = runs[len(runs) // 2]
+            loaded = set(median["modules"])
+            heavy = [name for name in LAZY_MODULES if name in loaded]
+            forbidden = [name for name in args.forbid if name in loaded] if mode == "lazy" else []
+            init_ms = round(median["init_ms"], 1)
+            emit({
+                "benchmark": "startup",
+                "handler": handler,
+                "mode": mode,
+                "init_ms": init_ms,
+                "init_ms_stdev": round(statistics.pstdev(run["init_ms"] for run in runs), 1),
+                "modules_imported": len(median["imports"]),
+                "heavy_modules": heavy,
+                "import_ms_by_package": package_times(median["imports"], args.top),
+            })
+            if init_ms > args.budget_ms:
+                failures.append(f"{handler} ({mode}) init took {init_ms} ms")
+            if forbidden:
+                failures.append(f"{handler} ({mode}) imported {', '.join(forbidden)} during init")
+
+    if failures:
+        print(f"OVER BUDGET: {'; '.join(failures)}")
+        return 1
+    print(f"OK: every handler's init is within {args.budget_ms} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""
+Offline end-to-end benchmark suite for builds and queries.
+
+Every external service is replaced by a local stand-in: articles from a
+synthetic corpus of several sizes are served by a MediaWiki API
+stand-in and fetched by the real WikipediaFetcher (through its article
+cache with a TTL of 0, so repeat builds revalidate the revision over
+HTTP), artifacts go to an in-memory S3, and answers are streamed by a
+mock Ollama with a configurable prefill delay and token rate through
+the real LLMService.
+
+For each corpus size it reports build throughput (chunks/s and MB/s of
+article text, median of --build-repeats builds, with stage timings),
+query latency p50/p95/p99 and time-to-first-token, and at the end the
+peak RSS of the process. Results are printed as JSON lines; --output
+writes a summary keyed by metric name, and --baseline compares this run
+against such a summary and exits 1 if a metric regressed by more than
+--tolerance.
+
+Usage:
+    python scripts/benchmarks/run_suite.py --output suite.json
+    python scripts/benchmarks/run_suite.py --baseline suite.json --tolerance 1.25
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import emit, hash_embedding_service, memory_s3_client, peak_rss_mb, percentile, \
+    synthetic_article
+from stand_ins import MockOllamaServer, MockWikipediaServer
+
+from models.rag_session import RagStatus
+from services.article_cache import ArticleCache
+from services.embedding_service import EmbeddingService
+from services.rag_builder import RagBuilderService
+from services.wikipedia_fetcher import WikipediaFetcher
+from src.services.chat_service import ChatService, latency_metrics
+from src.services.llm_service import LLMService
+from src.utils.metrics import StageTimer
+
+# Paragraphs per article (about 600 characters each) for each corpus size
+CORPUS_SIZES = {"small": 25, "medium": 250, "large": 2000}
+# Metrics where a higher value is better; every other metric is a cost
+HIGHER_IS_BETTER = ("chunks_per_s", "mb_per_s")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_builds(builder: RagBuilderService, url: str, repeats: int):
+    """Builds the article repeats times; returns the session of the median build."""
+    sessions = []
+    for _ in range(repeats):
+        session = builder.build_rag_session(url)
+        if session.status != RagStatus.READY:
+            raise RuntimeError(f"Build of {url} failed: {session.metadata.error_message}")
+        sessions.append(session)
+    sessions.sort(key=lambda s: s.metadata.processing_time_ms)
+    return sessions[len(sessions) // 2]
+
+
+def run_queries(service: ChatService, queries: int):
+    totals, ttfts, stages = [], [], []
+    for n in range(queries):
+        timer = StageTimer()
+        "".join(service.process_query(f"What happened to the empire in {1500 + n}?", timer=timer))
+        latency = latency_metrics(timer)
+        totals.append(timer.total_ms)
+        if latency.time_to_first_token is not None:
+            ttfts.append(latency.time_to_first_token)
+        stages.append(latency)
+    return totals, ttfts, stages
+
+
+def compare(metrics: dict, baseline: dict, tolerance: float) -> list:
+    """Emits one line per metric shared with the baseline; returns the regressions."""
+    regressions = []
+    for name, value in sorted(metrics.items()):
+        before = baseline.get(name)
+        if not before or value is None:
+            continue
+        ratio = value / before
+        # Express every change as a cost ratio, so > tolerance is a regression
+        cost_ratio = 1 / ratio if name.endswith(HIGHER_IS_BETTER) else ratio
+        regressed = cost_ratio > tolerance
+        emit({
+            "benchmark": "suite_compare",
+            "metric": name,
+            "baseline": before,
+            "current": value,
+            "ratio": round(ratio, 3),
+            "regressed": regressed,
+        })
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", nargs="+", choices=sorted(CORPUS_SIZES),
+                        default=["small", "medium", "large"])
+    parser.add_argument("--build-repeats", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=30, help="Queries per corpus size")
+    parser.add_argument("--prefill-s", type=float, default=0.05,
+                        help="Mock Ollama delay before the first token")
+    parser.add_argument("--tokens-per-s", type=float, default=200.0,
+                        help="Mock Ollama decoding rate")
+    parser.add_argument("--answer-tokens", type=int, default=20)
+    parser.add_argument("--real-model", action="store_true",
+                        help="Use the configured SentenceTransformer instead of hash embeddings")
+    parser.add_argument("--output", help="Write the summary JSON here")
+    parser.add_argument("--baseline", help="Summary JSON of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.25,
+                        help="Allowed cost ratio against the baseline before failing")
+    args = parser.parse_args()
+
+    embedding_service = EmbeddingService() if args.real_model else hash_embedding_service()
+    s3_client = memory_s3_client()
+    metrics = {}
+
+    ollama = MockOllamaServer(
+        tokens=[f" token{i}" for i in range(args.answer_tokens)],
+        first_token_delay_s=args.prefill_s,
+        token_delay_s=1 / args.tokens_per_s
+    )
+    with tempfile.TemporaryDirectory() as cache_dir, MockWikipediaServer() as wiki, ollama:
+        builder = RagBuilderService(
+            "bench-bucket",
+            embedding_service=embedding_service,
+            wiki_fetcher=WikipediaFetcher(
+                cache=ArticleCache(os.path.join(cache_dir, "articles.sqlite3")),
+                cache_ttl_s=0
+            )
+        )
+        wiki.serve(builder.wiki_fetcher)
+        builder.s3_client = s3_client
+        llm = LLMService(ollama.base_url)
+
+        for size in args.sizes:
+            title = f"Suite {size}"
+            wiki.set_article(title, synthetic_article(CORPUS_SIZES[size], seed=len(size)))
+            url = f"https://en.wikipedia.org/wiki/{title.replace(' ', '_')}"
+
+            session = run_builds(builder, url, args.build_repeats)
+            build_s = session.metadata.processing_time_ms / 1000
+            build = {
+                "chunks": session.chunk_count,
+                "content_mb": round(session.metadata.content_size / 1e6, 3),
+                "build_ms": session.metadata.processing_time_ms,
+                "chunks_per_s": round(session.chunk_count / build_s, 1),
+                "mb_per_s": round(session.metadata.content_size / 1e6 / build_s, 3),
+            }
+            emit({
+                "benchmark": "suite_build", "size": size, **build,
+                "stages_ms": session.metadata.stage_timings_ms,
+            })
+
+            load_start = time.perf_counter()
+            service = ChatService(
+                str(session.session_id), llm_service=llm,
+                embedding_service=embedding_service, s3_client=s3_client
+            )
+            load_ms = (time.perf_counter() - load_start) * 1000
+            totals, ttfts, stages = run_queries(service, args.queries)
+            service.close()
+            query = {
+                "load_ms": round(load_ms, 1),
+                "p50_ms": round(percentile(totals, 0.50), 1),
+                "p95_ms": round(percentile(totals, 0.95), 1),
+                "p99_ms": round(percentile(totals, 0.99), 1),
+                "ttft_p50_ms": percentile(ttfts, 0.50) if ttfts else None,
+                "ttft_p95_ms": percentile(ttfts, 0.95) if ttfts else None,
+                "retrieval_mean_ms": round(statistics.mean(s.retrieval for s in stages), 1),
+            }
+            emit({"benchmark": "suite_query", "size": size, "queries": args.queries, **query})
+
+            metrics.update({f"build.{size}.{k}": v for k, v in build.items()
+                            if k not in ("chunks", "content_mb")})
+            metrics.update({f"query.{size}.{k}": v for k, v in query.items()})
+        llm.close()
+
+    metrics["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    summary = {
+        "commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "params": vars(args),
+        "metrics": metrics,
+    }
+    emit({"benchmark": "suite_summary", **summary})
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(metrics, baseline["metrics"], args.tolerance)
+        if regressions:
+            print(f"REGRESSION against {baseline.get('commit')}: {', '.join(regressions)}")
+            return 1
+        print(f"OK: no metric regressed by more than {args.tolerance}x against "
+              f"{baseline.get('commit')}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
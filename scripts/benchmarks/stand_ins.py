@@ -0,0 +1,258 @@
+"""
+Local HTTP stand-ins for the external services the backend talks to.
+
+Each server runs on a background thread on 127.0.0.1 and an ephemeral
+port, so benchmarks can point the real service code at it.
+"""
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from requests.adapters import HTTPAdapter
+
+
+class _StandInServer:
+    handler_class = BaseHTTPRequestHandler
+
+    def __init__(self):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self.handler_class)
+        self.httpd.stand_in = self
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}"
+
+    def start(self) -> "_StandInServer":
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+class _WikipediaHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        wiki = self.server.stand_in
+        url = urlparse(self.path)
+        if url.path != "/w/api.php":
+            self.send_error(404)
+            return
+
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        title = params.get("titles", "").replace("_", " ")
+        props = params.get("prop", "").split("|")
+        query = {}
+        if params.get("redirects") and title in wiki.redirects:
+            query["redirects"] = [{"from": title, "to": wiki.redirects[title]}]
+            title = wiki.redirects[title]
+        article = wiki.articles.get(title)
+
+        with wiki.lock:
+            wiki.requests[params.get("prop", "")] = wiki.requests.get(params.get("prop", ""), 0) + 1
+
+        if article is None:
+            page = {"title": title, "missing": True}
+        else:
+            page = {"title": title, "pageid": article["pageid"], "lastrevid": article["revision"]}
+            if "extracts" in props:
+                page["extract"] = article["content"]
+
+        if params.get("formatversion") == "2":
+            query["pages"] = [page]
+        else:
+            # Version 1, which wikipediaapi reads: pages by id, -1 if missing
+            query["pages"] = {str(page.get("pageid", -1)): page}
+        body = json.dumps({"batchcomplete": True, "query": query}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _RerouteAdapter(HTTPAdapter):
+    """Sends every request to base_url, keeping its path and query."""
+
+    def __init__(self, base_url: str):
+        super().__init__()
+        self.base_url = base_url
+
+    def send(self, request, **kwargs):
+        url = urlparse(request.url)
+        request.url = f"{self.base_url}{url.path}?{url.query}"
+        return super().send(request, **kwargs)
+
+
+class MockWikipediaServer(_StandInServer):
+    """
+    Serves the subset of the MediaWiki query API used by WikipediaFetcher:
+    prop=info for revision checks and redirect targets, and prop=extracts
+    for the text the wikipediaapi client reads. Request counts per prop
+    value are kept in `requests`.
+    """
+
+    handler_class = _WikipediaHandler
+
+    def __init__(self):
+        super().__init__()
+        self.articles: Dict[str, Dict] = {}
+        # redirect title -> target title
+        self.redirects: Dict[str, str] = {}
+        self.requests: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    @property
+    def api_url(self) -> str:
+        return f"{self.base_url}/w/api.php"
+
+    def serve(self, fetcher) -> "MockWikipediaServer":
+        """
+        Points a WikipediaFetcher at this server: its MediaWiki queries
+        through api_url, and the requests of its wikipediaapi client, which
+        always go to en.wikipedia.org, by rerouting that client's session.
+        """
+        fetcher.api_url = self.api_url
+        fetcher.wiki._session.mount("https://", _RerouteAdapter(self.base_url))
+        return self
+
+    def set_article(self, title: str, content: str):
+        """Creates the article or publishes a new revision of it."""
+        with self.lock:
+            existing = self.articles.get(title)
+            self.articles[title] = {
+                "pageid": existing["pageid"] if existing else len(self.articles) + 1,
+                "revision": existing["revision"] + 1 if existing else 1000,
+                "content": content,
+            }
+
+
+class _OllamaHandler(BaseHTTPRequestHandler):
+    # Chunked transfer needs HTTP/1.1
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        # Like Go's net/http, which Ollama uses; otherwise Nagle's algorithm
+        # delays the small token chunks on reused connections
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        ollama = self.server.stand_in
+        with ollama.lock:
+            ollama.connections += 1
+        # Stands in for TCP/TLS setup to a remote host, paid once per connection
+        time.sleep(ollama.connect_delay_s)
+
+    def handle(self):
+        # Clients drop idle keep-alive connections whenever they like
+        try:
+            super().handle()
+        except ConnectionError:
+            pass
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        ollama = self.server.stand_in
+        if self.path != "/api/tags":
+            self.send_error(404)
+            return
+        body = json.dumps({"models": [{"name": ollama.model}]}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        ollama = self.server.stand_in
+        if self.path != "/api/generate":
+            self.send_error(404)
+            return
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        with ollama.lock:
+            ollama.requests.append(payload)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        with ollama.lock:
+            ollama.active += 1
+        try:
+            time.sleep(ollama.first_token_delay_s)
+            for i, token in enumerate(ollama.tokens):
+                if i:
+                    time.sleep(ollama.current_token_delay_s())
+                line = {"model": payload.get("model"), "response": token, "done": False}
+                self._write_chunk(json.dumps(line).encode("utf-8") + b"\n")
+        finally:
+            with ollama.lock:
+                ollama.active -= 1
+        done = {"model": payload.get("model"), "response": "", "done": True}
+        self._write_chunk(json.dumps(done).encode("utf-8") + b"\n")
+        self._write_chunk(b"")
+
+
+class MockOllamaServer(_StandInServer):
+    """
+    Serves Ollama's /api/generate as a chunked NDJSON stream, one line per
+    token, plus /api/tags for health checks.
+
+    first_token_delay_s stands in for prompt evaluation, token_delay_s for
+    decoding and connect_delay_s for connection setup. Request payloads
+    are kept in `requests` and accepted connections counted in
+    `connections`.
+
+    With `parallel` set, the host is modelled as thrashing once more than
+    that many generations run at once: the token delay grows with the
+    square of the overload, so total throughput drops.
+    """
+
+    handler_class = _OllamaHandler
+
+    def __init__(
+        self,
+        tokens: Optional[List[str]] = None,
+        first_token_delay_s: float = 0.2,
+        token_delay_s: float = 0.02,
+        connect_delay_s: float = 0.0,
+        parallel: Optional[int] = None,
+        model: str = "llama3.2:3b-instruct"
+    ):
+        super().__init__()
+        self.tokens = tokens or [f" token{i}" for i in range(50)]
+        self.first_token_delay_s = first_token_delay_s
+        self.token_delay_s = token_delay_s
+        self.connect_delay_s = connect_delay_s
+        self.parallel = parallel
+        self.model = model
+        self.active = 0
+        self.connections = 0
+        self.requests: List[Dict] = []
+        self.lock = threading.Lock()
+
+    def current_token_delay_s(self) -> float:
+        if self.parallel is None or self.active <= self.parallel:
+            return self.token_delay_s
+        return self.token_delay_s * (self.active / self.parallel) ** 2
@@ -8,6 +8,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '../backend/src'))
 
 from services.rag_builder import RagBuilderService
 from models.rag_session import RagStatus
+from utils.metrics import StageTimer
 
 def test_rag_pipeline():
     print("Starting local RAG pipeline test...")
@@ -47,5 +48,25 @@ def test_rag_pipeline():
         print(f"FAILURE: RAG Session failed with error: {session.metadata.error_message}")
         sys.exit(1)
 
+def test_trailing_separator():
+    print("Checking that a trailing blank line does not change the chunks...")
+    paragraphs = [f"Paragraph {i} of the article. " * 12 for i in range(40)]
+    text = "\n\n".join(paragraphs)
+
+    # Small batches, so the article is split in several segments
+    service = RagBuilderService(None, batch_size=4)
+    chunks = [
+        [chunk for batch in service._iter_chunk_batches(content, StageTimer()) for chunk in batch]
+        for content in (text, text + "\n\n")
+    ]
+    print(f"Chunks: {len(chunks[0])} without, {len(chunks[1])} with trailing separator")
+
+    if chunks[0] == chunks[1]:
+        print("SUCCESS: Both contents split into the same chunks.")
+    else:
+        print("FAILURE: A trailing separator changed the chunks.")
+        sys.exit(1)
+
 if __name__ == "__main__":
+    test_trailing_separator()
     test_rag_pipeline()